@@ -15,10 +15,12 @@
 
 import auto_mod
 import buttons
+import channel_cache
 import config_reader as config
 import hikari
 import lightbulb
 import member_managment
+import message_pipeline
 
 plugin = plugin = lightbulb.Plugin("automod_events", "Handles events")
 
@@ -32,7 +34,7 @@ async def on_guild_msg_delete(event: hikari.GuildMessageDeleteEvent):
     msg = event.old_message
 
     if msg is None:
-        channel = await event.app.rest.fetch_channel(event.channel_id)
+        channel = await channel_cache.resolver.fetch(event.app, event.channel_id)
         from bot import logger
 
         logger.info(f"Message deleted in {channel.mention}.")
@@ -99,85 +101,95 @@ async def handle_dm(event: hikari.MessageCreateEvent):
     # )
 
 
-async def handle_guild_text(event: hikari.MessageCreateEvent, nsfw: bool):
-    """Handles messages in guild text channels."""
+async def send_report(
+    event: hikari.MessageCreateEvent, report_embed: hikari.Embed
+) -> hikari.Message:
+    """Sends the violation report to the designated channel."""
+    view = buttons.Report()
+    message = await event.app.rest.create_message(
+        channel=config.Bot.report_channel, embed=report_embed, components=view
+    )
+    return message
 
-    async def send_report(
-        event: hikari.MessageCreateEvent, report_embed: hikari.Embed
-    ) -> hikari.Message:
-        """Sends the violation report to the designated channel."""
-        view = buttons.Report()
-        message = await event.app.rest.create_message(
-            channel=config.Bot.report_channel, embed=report_embed, components=view
-        )
-        return message
 
-    try:
-        if event.message.guild_id != config.Bot.server:
-            return
+async def moderate(context: message_pipeline.MessageContext):
+    """Moderates messages in the server's text channels."""
+    event = context.event
 
-        if event.author.is_bot or event.author.is_system:
+    if context.is_dm:
+        await handle_dm(event)
+        return
+
+    if not context.is_guild_text or not context.in_server:
+        return
+
+    attachments = context.message.attachments
+
+    if attachments:
+        problematic_file = await auto_mod.check_attachments(attachments)
+        if problematic_file:
+            allowed_files = config.AutoMod.allowed_files
+            supported_files = ", ".join(allowed_files)
+            await event.message.respond(
+                f"Your file '{problematic_file}' is not allowed. Supported file types are: {supported_files}"
+            )
+            await event.message.delete()
+            context.stop(deleted=True)
             return
 
-        attachments = event.message.attachments
-
-        if attachments:
-            problematic_file = await auto_mod.check_attachments(attachments)
-            if problematic_file:
-                allowed_files = config.AutoMod.allowed_files
-                supported_files = ", ".join(allowed_files)
-                await event.message.respond(
-                    f"Your file '{problematic_file}' is not allowed. Supported file types are: {supported_files}"
-                )
-                await event.message.delete()
-
-        if event.message.content:
-            violations, flagged_strings = await auto_mod.check_message(
-                content=event.message.content, nsfw=nsfw
+    if context.content:
+        violations, flagged_strings = await auto_mod.check_message(
+            content=event.message.content, nsfw=context.nsfw, urls=context.urls
+        )
+
+        if violations:
+            report_embed = await auto_mod.handle_violations(
+                event, violations, flagged_strings
             )
+            await send_report(event, report_embed)
+            await auto_mod.update_report_data(
+                event.author_id, event.message.id, violations
+            )
+            await event.message.delete()
+            context.stop(deleted=True)
 
-            if violations:
-                report_embed = await auto_mod.handle_violations(
-                    event, violations, flagged_strings
-                )
-                await send_report(event, report_embed)
-                auto_mod.update_report_data(
-                    event.author_id, event.message.id, violations
-                )
-                await event.message.delete()
-                return
 
+async def count_message(context: message_pipeline.MessageContext):
+    """Counts messages in the server's text channels towards the user stats."""
+    if context.is_guild_text and context.in_server:
         await member_managment.update_user_stats(
-            user_id=int(event.author_id), msg=True, cmd=False, rep=False
+            user_id=int(context.event.author_id), msg=True, cmd=False, rep=False
         )
-    except Exception as e:
-        from bot import logger
-
-        logger.error(f"Error during handle_guild_text: {e}")
 
 
 @plugin.listener(hikari.MessageCreateEvent)
 async def message(event: hikari.MessageCreateEvent):
     """Gets called whenever a message is sent."""
     try:
-        channel = await plugin.bot.application.app.rest.fetch_channel(
-            event.message.channel_id
-        )
-        channel_type = str(channel.type)
-
-        if channel_type == "DM":
-            await handle_dm(event)
-        elif channel_type == "GUILD_TEXT":
-            await handle_guild_text(event, nsfw=channel.is_nsfw)
+        await message_pipeline.pipeline.process(event)
     except Exception as e:
         from bot import logger
 
         logger.error(f"An error occurred while handling a message: {e}")
 
 
+@plugin.listener(hikari.GuildChannelUpdateEvent)
+async def on_channel_update(event: hikari.GuildChannelUpdateEvent):
+    channel_cache.resolver.invalidate(event.channel_id)
+
+
+@plugin.listener(hikari.GuildChannelDeleteEvent)
+async def on_channel_delete(event: hikari.GuildChannelDeleteEvent):
+    channel_cache.resolver.invalidate(event.channel_id)
+
+
 def load(bot):
+    message_pipeline.pipeline.register("moderate", "automod", moderate)
+    message_pipeline.pipeline.register("stats", "user_stats", count_message)
     bot.add_plugin(plugin)
 
 
 def unload(bot):
+    message_pipeline.pipeline.unregister("automod")
+    message_pipeline.pipeline.unregister("user_stats")
     bot.remove(plugin)
@@ -13,19 +13,36 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see https://www.gnu.org/licenses/.
 
+import asyncio
+import io
 import os
 import random
 import string
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Tuple
 
-import bot_utils as utils
 import config_reader as config
 import hikari
 from captcha.image import ImageCaptcha
 from PIL import Image
 
+"""
+Image captchas are pre-rendered into a pool in worker threads, so a captcha
+can be sent instantly even when a lot of people join at once.
+"""
 
-async def get_all_file_paths(folder: str) -> list:
+CAPTCHA_WIDTH = 400
+CAPTCHA_HEIGHT = 220
+FONT_SIZES = (40, 70, 100, 60, 80, 90)
+
+# How many rendered captchas are kept ready
+POOL_SIZE = 20
+
+
+def get_all_file_paths(folder: str) -> list:
     """
     Gets all files paths within a given folder
 
@@ -44,7 +61,7 @@ async def get_all_file_paths(folder: str) -> list:
     return file_paths
 
 
-async def generate_random_string(length: int) -> str:
+def generate_random_string(length: int) -> str:
     """
     Generates a random string of uppercase letters and digits.
 
@@ -58,66 +75,188 @@ async def generate_random_string(length: int) -> str:
     return "".join(random.choice(characters) for _ in range(length)).replace("0", "O")
 
 
-async def overlay_texture(image_path: str) -> str:
-    # Choose a random texture file from the specified folder
-    texture_path = await utils.choose_random_file(
-        os.path.join(config.Paths.assets_folder, "Captcha Textures")
-    )
+class CaptchaRenderer:
+    """
+    Renders image captchas.
+    The fonts and textures are loaded once and kept in memory.
+    """
 
-    # Open the image and texture files
-    image = Image.open(image_path).convert("RGBA")
-    texture = Image.open(texture_path).convert("RGBA")
+    def __init__(self, fonts_folder: str, textures_folder: str) -> None:
+        self.fonts_folder = fonts_folder
+        self.textures_folder = textures_folder
 
-    # Ensure the texture has the same resolution as the image
-    texture = texture.resize(image.size)
+        self._lock = threading.Lock()
+        self._captcha = None
+        self._textures = None
 
-    # Randomize the opacity of the texture
-    opacity = random.randint(20, 63)
-    texture = texture.copy()
-    texture.putalpha(opacity)
+    def _load(self) -> None:
+        with self._lock:
+            if self._captcha is not None:
+                return
 
-    # Overlay the texture onto the image
-    combined = Image.alpha_composite(image, texture)
+            captcha = ImageCaptcha(
+                width=CAPTCHA_WIDTH,
+                height=CAPTCHA_HEIGHT,
+                fonts=get_all_file_paths(self.fonts_folder),
+                font_sizes=FONT_SIZES,
+            )
+            # Load the fonts now instead of during the first render
+            captcha.truefonts
 
-    # Save the result
-    # output_path = os.path.splitext(image_path)[0] + "_with_texture.png"
-    combined.save(image_path)
+            textures = []
+            for path in get_all_file_paths(self.textures_folder):
+                with Image.open(path) as texture:
+                    # Ensure the texture has the same resolution as the image
+                    textures.append(
+                        texture.convert("RGBA").resize((CAPTCHA_WIDTH, CAPTCHA_HEIGHT))
+                    )
 
-    return image_path
+            self._textures = textures
+            self._captcha = captcha
 
+    def overlay_texture(self, image: Image.Image) -> Image.Image:
+        image = image.convert("RGBA")
 
-async def make_embed(embed: hikari.Embed, image) -> hikari.Embed:
+        if not self._textures:
+            return image
 
-    embed.set_image(hikari.File(image))
+        # Choose a random texture and randomize its opacity
+        texture = random.choice(self._textures).copy()
+        texture.putalpha(random.randint(20, 63))
 
-    # Edit this
-    task = "Below is an image of letters. **Please send me the letters.**"
+        return Image.alpha_composite(image, texture)
 
-    embed.add_field("Task:", task, inline=True)
-    return embed
+    def render(self) -> Tuple[bytes, str]:
+        """
+        Renders a captcha
 
+        Returns:
+            tuple: The captcha as png bytes, the solution
+        """
+        if self._captcha is None:
+            self._load()
 
-async def generate(embed: hikari.Embed, captcha_id: str) -> Tuple[hikari.Embed, str]:
+        text = generate_random_string(6)
 
-    fonts = await get_all_file_paths(
-        "C:/Users/paul/OneDrive/Desktop/Coding/Discord Bots/DarkylAssistant/Assets/Fonts/captcha fonts"
-    )
+        image = self.overlay_texture(self._captcha.generate_image(text))
 
-    text = await generate_random_string(6)
+        output = io.BytesIO()
+        image.save(output, format="PNG")
+        return output.getvalue(), text
 
-    captcha: ImageCaptcha = ImageCaptcha(
-        width=400, height=220, fonts=fonts, font_sizes=(40, 70, 100, 60, 80, 90)
-    )
 
-    captcha_path = os.path.join(
-        config.Paths.data_folder, "Generated Captchas", f"{captcha_id}.png"
+class CaptchaPool:
+    """
+    Keeps rendered captchas ready and refills itself in the background
+    """
+
+    def __init__(
+        self, renderer: CaptchaRenderer, size: int = POOL_SIZE, workers: int = 2
+    ) -> None:
+        """
+        Args:
+            renderer (CaptchaRenderer): The renderer used to fill the pool
+            size (int): How many captchas are kept ready
+            workers (int): How many captchas are rendered at the same time
+        """
+        self.renderer = renderer
+        self.size = size
+        self.workers = workers
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="captcha"
+        )
+        self._ready = deque()
+        self._refill_task = None
+
+        self.served_from_pool = 0
+        self.rendered_on_demand = 0
+        self.rendered = 0
+        self._render_time = 0.0
+
+    async def _render(self) -> Tuple[bytes, str]:
+        start = time.perf_counter()
+        result = await asyncio.get_running_loop().run_in_executor(
+            self._executor, self.renderer.render
+        )
+        self._render_time += time.perf_counter() - start
+        self.rendered += 1
+        return result
+
+    async def _refill(self) -> None:
+        try:
+            while len(self._ready) < self.size:
+                count = min(self.workers, self.size - len(self._ready))
+                self._ready.extend(
+                    await asyncio.gather(*(self._render() for _ in range(count)))
+                )
+        except Exception as e:
+            from bot import logger
+
+            logger.error(f"Error while refilling the captcha pool: {e}")
+
+    def refill(self) -> asyncio.Task:
+        """
+        Starts refilling the pool in the background, unless that is already happening
+        """
+        if self._refill_task is None or self._refill_task.done():
+            self._refill_task = asyncio.create_task(self._refill())
+        return self._refill_task
+
+    async def get(self) -> Tuple[bytes, str]:
+        """
+        Gets a captcha, rendering one right away if the pool is empty
+
+        Returns:
+            tuple: The captcha as png bytes, the solution
+        """
+        if self._ready:
+            captcha = self._ready.popleft()
+            self.served_from_pool += 1
+        else:
+            captcha = await self._render()
+            self.rendered_on_demand += 1
+
+        self.refill()
+        return captcha
+
+    def stats(self) -> dict:
+        """
+        Returns the pool depth and render metrics
+        """
+        return {
+            "depth": len(self._ready),
+            "size": self.size,
+            "served_from_pool": self.served_from_pool,
+            "rendered_on_demand": self.rendered_on_demand,
+            "average_render_ms": (
+                self._render_time / self.rendered * 1000 if self.rendered else 0.0
+            ),
+        }
+
+
+pool = CaptchaPool(
+    CaptchaRenderer(
+        os.path.join(config.Paths.assets_folder, "Fonts", "captcha fonts"),
+        os.path.join(config.Paths.assets_folder, "Captcha Textures"),
     )
+)
+
+
+async def make_embed(embed: hikari.Embed, image) -> hikari.Embed:
+
+    embed.set_image(image)
 
-    captcha.write(chars=text, output=captcha_path)
+    # Edit this
+    task = "Below is an image of letters. **Please send me the letters.**"
 
-    await overlay_texture(captcha_path)
+    embed.add_field("Task:", task, inline=True)
+    return embed
+
+
+async def generate(embed: hikari.Embed, captcha_id: str) -> Tuple[hikari.Embed, str]:
 
-    solution = text
+    image, solution = await pool.get()
 
-    embed = await make_embed(embed, captcha_path)
+    embed = await make_embed(embed, hikari.Bytes(image, f"{captcha_id}.png"))
     return embed, str(solution)
@@ -16,12 +16,189 @@
 import asyncio
 import json
 import os
+import time
+from collections import OrderedDict
 
-import aiofiles
 import config_reader as config
+import database_interaction
 
+# Old JSON database, its entries are imported once
 DB_PATH = os.path.join(config.Paths.data_folder, "Database", "verification.json")
 
+# How many seconds a captcha stays valid
+CAPTCHA_TTL = 30 * 60
+
+
+class CaptchaStore:
+    """
+    Keeps the pending captchas in memory, indexed by captcha ID and by user ID.
+
+    Every change is written to the captchas table in its own transaction,
+    so the store survives restarts and concurrent handlers can't overwrite each other.
+    Captchas expire automatically after the TTL.
+    """
+
+    def __init__(self, ttl: float = CAPTCHA_TTL) -> None:
+        self.ttl = ttl
+
+        # {captcha_id: [user_id, captcha_type, value, message_id, created_at]}, oldest first
+        self._captchas = OrderedDict()
+        # {user_id: [captcha_id, ...]}, oldest first
+        self._by_user = {}
+
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+
+    def _add(self, id: str, user_id, captcha_type, value, message_id, created_at):
+        user_id = int(user_id)
+        self._captchas[id] = [user_id, captcha_type, str(value), message_id, created_at]
+        self._by_user.setdefault(user_id, []).append(id)
+
+    def _remove(self, id: str) -> None:
+        entry = self._captchas.pop(id, None)
+        if entry is None:
+            return
+
+        ids = self._by_user.get(entry[0])
+        if ids is not None:
+            ids.remove(id)
+            if not ids:
+                del self._by_user[entry[0]]
+
+    async def _load(self) -> None:
+        """
+        Loads the pending captchas from the database and imports the old JSON database
+        """
+
+        def query(connection):
+            with connection:
+                if os.path.exists(DB_PATH) and os.path.getsize(DB_PATH) > 0:
+                    with open(DB_PATH, "r") as file:
+                        old_captchas = json.load(file)
+                    now = time.time()
+                    connection.executemany(
+                        """
+                        INSERT OR IGNORE INTO captchas (id, user_id, captcha_type, value, message_id, created_at)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        """,
+                        [
+                            (
+                                id,
+                                int(user_id),
+                                captcha_type,
+                                str(value),
+                                message_id,
+                                now,
+                            )
+                            for id, (
+                                user_id,
+                                captcha_type,
+                                value,
+                                message_id,
+                            ) in old_captchas.items()
+                        ],
+                    )
+                    with open(DB_PATH, "w") as file:
+                        json.dump({}, file)
+
+                connection.execute(
+                    "DELETE FROM captchas WHERE created_at < ?",
+                    (time.time() - self.ttl,),
+                )
+                return connection.execute(
+                    "SELECT id, user_id, captcha_type, value, message_id, created_at FROM captchas ORDER BY created_at"
+                ).fetchall()
+
+        async with self._load_lock:
+            if self._loaded:
+                return
+
+            for row in await database_interaction.database.run(query):
+                self._add(*row)
+            self._loaded = True
+
+    async def _prepare(self) -> None:
+        """
+        Makes sure the store is loaded and drops expired captchas
+        """
+        if not self._loaded:
+            await self._load()
+
+        deadline = time.time() - self.ttl
+        expired = []
+        # The captchas are ordered by age, so only the front has to be checked
+        for id, entry in self._captchas.items():
+            if entry[4] >= deadline:
+                break
+            expired.append(id)
+
+        if expired:
+            for id in expired:
+                self._remove(id)
+            await self._delete(expired)
+
+    async def _delete(self, ids: list) -> None:
+        def query(connection):
+            with connection:
+                connection.executemany(
+                    "DELETE FROM captchas WHERE id = ?", [(id,) for id in ids]
+                )
+
+        await database_interaction.database.run(query)
+
+    async def register(
+        self, id: str, user_id: int, captcha_type: int, value, message_id
+    ):
+        await self._prepare()
+
+        created_at = time.time()
+        self._remove(id)
+        self._add(id, user_id, captcha_type, value, message_id, created_at)
+
+        entry = (id, int(user_id), captcha_type, str(value), message_id, created_at)
+
+        def query(connection):
+            with connection:
+                connection.execute(
+                    """
+                    INSERT OR REPLACE INTO captchas (id, user_id, captcha_type, value, message_id, created_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    entry,
+                )
+
+        await database_interaction.database.run(query)
+
+    async def get(self, id: str):
+        await self._prepare()
+        entry = self._captchas.get(id)
+        return entry[:4] if entry else None
+
+    async def get_all(self) -> dict:
+        await self._prepare()
+        return {id: entry[:4] for id, entry in self._captchas.items()}
+
+    async def get_from_user(self, user_id: int):
+        await self._prepare()
+        ids = self._by_user.get(int(user_id))
+        if not ids:
+            return None
+        return ids[0], self._captchas[ids[0]]
+
+    async def delete_user(self, user_id: int) -> bool:
+        await self._prepare()
+        ids = list(self._by_user.get(int(user_id), []))
+        if not ids:
+            return False
+
+        for id in ids:
+            self._remove(id)
+        await self._delete(ids)
+        return True
+
+
+store = CaptchaStore()
+
 
 async def read_db(id: str = None):
     """
@@ -33,21 +210,16 @@ async def read_db(id: str = None):
         dict: A dictionary of entries
         None: An error occurred
     """
-    if os.path.exists(DB_PATH):
-        try:
-            async with aiofiles.open(DB_PATH, "r") as file:
-                data = json.loads(await file.read())
-                if id is None:
-                    return data
-                else:
-                    return data.get(id, None)
-        except Exception as e:
-            from bot import logger
-
-            logger.error(f"Error while reading verification Database: {e}")
-            return None
-    else:
-        return {}
+    try:
+        if id is None:
+            return await store.get_all()
+        else:
+            return await store.get(id)
+    except Exception as e:
+        from bot import logger
+
+        logger.error(f"Error while reading verification Database: {e}")
+        return None
 
 
 async def register_captcha(
@@ -63,13 +235,8 @@ async def register_captcha(
         value (str): The solutuon to the captcha
         message_id (int): The ID to the message
     """
-    captchas = await read_db() or {}
-
-    captchas[id] = [user_id, captcha_type, str(value), message_id]
-
     try:
-        async with aiofiles.open(DB_PATH, "w") as file:
-            await file.write(json.dumps(captchas, indent=4))
+        await store.register(id, user_id, captcha_type, value, message_id)
     except Exception as e:
         from bot import logger
 
@@ -84,23 +251,14 @@ async def get_id_from_user(user_id: int):
         captcha_id (str): The captcha ID
         None: Not found / Error
     """
-    data = await read_db()
-
-    if data is None:
-        from bot import logger
-
-        logger.error(f"Error in get_message_id_from_user(): read_db() returned 'None'")
-        return None
-
     try:
-        for captcha_id, (stored_user_id, _, __, ___) in data.items():
-            if stored_user_id == user_id:
-                return captcha_id
-        return None
+        result = await store.get_from_user(user_id)
+        return result[0] if result else None
     except Exception as e:
         from bot import logger
 
         logger.error(f"Error while getting captcha id from user id: {e}")
+        return None
 
 
 async def delete_entries_from_user_id(user_id: int):
@@ -112,22 +270,8 @@ async def delete_entries_from_user_id(user_id: int):
     Returns:
         bool: True if entries were deleted, False otherwise
     """
-    data = await read_db()
-    if data is None:
-        return False
-
     try:
-        # Filter out entries with the given user ID
-        updated_data = {
-            captcha_id: details
-            for captcha_id, details in data.items()
-            if details[0] != user_id
-        }
-
-        async with aiofiles.open(DB_PATH, "w") as file:
-            await file.write(json.dumps(updated_data, indent=4))
-
-        return len(updated_data) != len(data)  # True if any entries were deleted
+        return await store.delete_user(user_id)
     except Exception as e:
         from bot import logger
 
@@ -146,17 +290,9 @@ async def get_message_id_from_user(user_id: int):
         message_id (int): The message ID
         None: Not found / Error
     """
-    data = await read_db()
-    if data is None:
-        from bot import logger
-
-        logger.error(f"Error in get_message_id_from_user(): read_db() returned 'None'")
-        return None
     try:
-        for captcha_id, (stored_user_id, _, __, message_id) in data.items():
-            if stored_user_id == user_id:
-                return message_id
-        return None
+        result = await store.get_from_user(user_id)
+        return result[1][3] if result else None
     except Exception as e:
         from bot import logger
 
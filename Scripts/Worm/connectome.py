@@ -0,0 +1,187 @@
+# Copyright (C) 2024  Darkyl
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see https://www.gnu.org/licenses/.
+
+import functools
+import os
+import re
+import typing as t
+
+import numpy as np
+from scipy import sparse
+
+"""
+The C. elegans connectome as a sparse weight matrix.
+
+The synapses are read from worm-sim/connectome.js (the GoPiGo connectome ported
+to Javascript), so there is only one copy of the wiring. Every neuron is a
+position in a vector, and one step of the simulation adds the weights of all
+neurons that fire at once with a single sparse matrix product.
+"""
+
+CONNECTOME_PATH = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), "worm-sim", "connectome.js"
+)
+
+# Accumulated value a neuron has to exceed to fire
+FIRE_THRESHOLD = 30
+
+# Muscles can't fire
+MUSCLE_PREFIXES = ("MVU", "MVL", "MDL", "MVR", "MDR")
+
+# Body muscles 07-23 drive the worm. MDL21 and MVL21 are listed on both
+# sides in the original, like there, they only count for the left one.
+LEFT_MUSCLES = [f"M{side}L{number:02}" for side in "DV" for number in range(7, 24)]
+RIGHT_MUSCLES = [
+    f"M{side}R{number:02}" for side in "DV" for number in range(7, 24) if number != 21
+]
+
+HUNGER_NEURONS = ["RIML", "RIMR", "RICL", "RICR"]
+NOSE_TOUCH_NEURONS = [
+    "FLPR",
+    "FLPL",
+    "ASHL",
+    "ASHR",
+    "IL1VL",
+    "IL1VR",
+    "OLQDL",
+    "OLQDR",
+    "OLQVR",
+    "OLQVL",
+]
+FOOD_SENSE_NEURONS = ["ADFL", "ADFR", "ASGR", "ASGL", "ASIL", "ASIR", "ASJR", "ASJL"]
+
+# How many random neurons are excited when a brain is created
+RANDOM_EXCITATIONS = 40
+
+
+class Connectome(t.NamedTuple):
+    neurons: tuple  # Names, in the order of the state vectors
+    index: dict  # {name: position}
+    weights: sparse.csr_matrix  # [postsynaptic, presynaptic]
+    presynaptic: np.ndarray  # Positions of the neurons that have synapses
+    can_fire: np.ndarray  # bool mask
+    left_muscles: np.ndarray
+    right_muscles: np.ndarray
+
+
+@functools.lru_cache(maxsize=None)
+def load(path: str = CONNECTOME_PATH) -> Connectome:
+    """
+    Parses the connectome once per process
+
+    Returns:
+        Connectome: The weight matrix and the positions of the neuron groups
+    """
+    with open(path, "r") as file:
+        source = file.read()
+
+    neurons = tuple(re.findall(r"BRAIN\.postSynaptic\['(\w+)'\] = \[0,0\]", source))
+    index = {name: position for position, name in enumerate(neurons)}
+
+    rows, columns, values = [], [], []
+    blocks = re.split(r'BRAIN\.connectome\["(\w+)"\] = function\(\) \{', source)
+    for presynaptic, body in zip(blocks[1::2], blocks[2::2]):
+        for postsynaptic, weight in re.findall(
+            r"BRAIN\.postSynaptic\['(\w+)'\]\[BRAIN\.nextState\] \+= (-?\d+)", body
+        ):
+            rows.append(index[postsynaptic])
+            columns.append(index[presynaptic])
+            values.append(float(weight))
+
+    # Duplicate synapses are summed, like the repeated += in the source
+    weights = sparse.csr_matrix(
+        (values, (rows, columns)), shape=(len(neurons), len(neurons))
+    )
+
+    presynaptic = np.array(sorted(set(columns)), dtype=np.intp)
+    can_fire = np.zeros(len(neurons), dtype=bool)
+    can_fire[presynaptic] = True
+    for position, name in enumerate(neurons):
+        if name.startswith(MUSCLE_PREFIXES):
+            can_fire[position] = False
+
+    return Connectome(
+        neurons,
+        index,
+        weights,
+        presynaptic,
+        can_fire,
+        np.array([index[name] for name in LEFT_MUSCLES], dtype=np.intp),
+        np.array([index[name] for name in RIGHT_MUSCLES], dtype=np.intp),
+    )
+
+
+class Brain:
+    def __init__(self, connectome: Connectome, rng: np.random.Generator) -> None:
+        """
+        Args:
+            connectome (Connectome): The wiring, shared between all brains
+            rng (np.random.Generator): Makes every simulation slightly different
+        """
+        self.connectome = connectome
+
+        size = len(connectome.neurons)
+        self.current = np.zeros(size)
+        self.next = np.zeros(size)
+
+        self.accum_left = 0.0
+        self.accum_right = 0.0
+
+        self._hunger = self._stimulus(HUNGER_NEURONS)
+        self._nose_touch = self._stimulus(NOSE_TOUCH_NEURONS)
+        self._food_sense = self._stimulus(FOOD_SENSE_NEURONS)
+
+        excited = rng.choice(connectome.presynaptic, RANDOM_EXCITATIONS)
+        self.next += connectome.weights @ np.bincount(excited, minlength=size)
+
+    def _stimulus(self, names: list) -> np.ndarray:
+        """
+        Returns what stimulating a group of neurons adds to the next state
+        """
+        stimulated = np.zeros(len(self.connectome.neurons))
+        stimulated[[self.connectome.index[name] for name in names]] = 1
+        return self.connectome.weights @ stimulated
+
+    def step(self) -> None:
+        """
+        Fires every neuron above the threshold and reads the muscles
+        """
+        connectome = self.connectome
+
+        fired = connectome.can_fire & (self.current > FIRE_THRESHOLD)
+        self.next += connectome.weights @ fired
+        self.next[fired] = 0
+
+        self.accum_left = self.next[connectome.left_muscles].sum()
+        self.accum_right = self.next[connectome.right_muscles].sum()
+        self.next[connectome.left_muscles] = 0
+        self.next[connectome.right_muscles] = 0
+
+        self.current = self.next.copy()
+
+    def update(
+        self, hunger: bool = True, nose_touch: bool = False, food_sense: bool = False
+    ) -> None:
+        """
+        Stimulates the sensory neurons and runs a step after each group
+        """
+        for stimulate, stimulus in (
+            (hunger, self._hunger),
+            (nose_touch, self._nose_touch),
+            (food_sense, self._food_sense),
+        ):
+            if stimulate:
+                self.next += stimulus
+                self.step()
@@ -13,92 +13,260 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see https://www.gnu.org/licenses/.
 
+import asyncio
+import io
+import math
 import os
-import random
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-from PIL import Image
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.action_chains import ActionChains
-from selenium.webdriver.common.by import By
+import config_reader as config
+import numpy as np
+from PIL import Image, ImageDraw
+from Worm import connectome
 
-stop_worm = False
+"""
+Simulates the worm of worm-sim/main.js without a browser.
 
+The brain is the connectome in Worm/connectome.py, the body is a chain of
+segments pulled along by its head. Frames are rendered with Pillow into memory
+on a worker thread, so several sessions can run without blocking the bot.
+"""
 
-async def run_worm_simulator():
-    global stop_worm
+WIDTH = 400
+HEIGHT = 400
 
-    stop_worm = False  # Just to be safe...
+# Simulation steps per second, like the 60 fps of the browser version
+TICKS_PER_SECOND = 60
 
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--window-size=400,400")
+# The brain is updated every BRAIN_INTERVAL ticks (500ms)
+BRAIN_INTERVAL = 30
 
-    driver = webdriver.Chrome(options=chrome_options)
+# A new piece of food appears every FOOD_INTERVAL ticks (5s)
+FOOD_INTERVAL = 5 * TICKS_PER_SECOND
 
-    file_path = os.path.abspath(
-        os.path.join(
-            os.path.dirname(
-                os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
-            ),
-            "Scripts",
-            "Worm",
-            "worm-sim",
-            "index.html",
+# The sensory neurons are stimulated for the first ticks, to get the worm going
+WARMUP_TICKS = 2 * TICKS_PER_SECOND
+
+SEGMENTS = 50
+SEGMENT_LENGTH = 4.0
+
+SMELL_DISTANCE = 50
+EAT_DISTANCE = 20
+
+BACKGROUND = (0, 0, 0)
+WORM_COLOR = (255, 255, 255)
+WORM_WIDTH = 20
+FOOD_COLOR = (251, 192, 45)
+FOOD_RADIUS = 10
+
+# Simulates and renders the frames of all sessions
+_pool = ThreadPoolExecutor(
+    max_workers=min(2, os.cpu_count() or 1), thread_name_prefix="worm"
+)
+
+_sessions = set()
+
+
+class WormSession:
+    def __init__(
+        self,
+        user_id: int,
+        frame_interval: float = config.Worm.frame_interval,
+        width: int = WIDTH,
+        height: int = HEIGHT,
+        seed: int = None,
+    ) -> None:
+        """
+        Args:
+            user_id (int): The user that started the session
+            frame_interval (float): Seconds between two frames, also the simulated time per frame
+            width (int): The width of the frames
+            height (int): The height of the frames
+            seed (int): Seed of the random numbers, for reproducible worms
+        """
+        self.user_id = user_id
+        self.message_id = None
+        self.frame_interval = frame_interval
+        self.width = width
+        self.height = height
+        self.stopped = False
+
+        self._rng = np.random.default_rng(seed)
+        # Created on the worker, parsing the connectome takes a moment
+        self._brain = None
+
+        self._tick = 0
+        self._x = width / 2
+        self._y = height / 2
+        self._facing = 0.0
+        self._target_facing = 0.0
+        self._speed = 0.0
+        self._speed_change = 0.0
+        self._touching = False
+        self._smelling = False
+        self._food = []  # [(x, y)]
+
+        # Starts straight, pointing to the left
+        self._chain = [
+            [self._x - i * SEGMENT_LENGTH, self._y] for i in range(SEGMENTS + 1)
+        ]
+
+    def _update_brain(self) -> None:
+        warmup = self._tick < WARMUP_TICKS
+        self._brain.update(
+            nose_touch=self._touching or warmup,
+            food_sense=self._smelling or warmup,
         )
-    )
-
-    driver.get(f"file://{file_path}")
-
-    def take_screenshot():
-        timestamp = int(time.time())
-        path = os.path.abspath(
-            os.path.join(
-                os.path.dirname(
-                    os.path.dirname(os.path.dirname(os.path.realpath(__file__)))
-                ),
-                "Scripts",
-                "Worm",
-                "Screenshots",
-                f"screenshot_{timestamp}.png",
-            )
+        self._touching = False
+        self._smelling = False
+
+        scaling_factor = 20
+        new_dir = (self._brain.accum_left - self._brain.accum_right) / scaling_factor
+        self._target_facing = self._facing + new_dir * math.pi
+        target_speed = (abs(self._brain.accum_left) + abs(self._brain.accum_right)) / (
+            scaling_factor * 5
         )
-        driver.save_screenshot(path)
+        self._speed_change = (target_speed - self._speed) / (scaling_factor * 1.5)
+
+    def _move(self) -> None:
+        self._speed += self._speed_change
 
-        return path
+        if self._facing > self._target_facing:
+            self._facing -= 0.1
+        elif self._facing < self._target_facing:
+            self._facing += 0.1
 
-    def image_to_ascii(image_path, max_chars=3000):
-        img = Image.open(image_path)
+        x = self._x + math.cos(self._facing) * self._speed
+        y = self._y - math.sin(self._facing) * self._speed
 
-        max_width = int((max_chars / 1.8) ** 0.5)
-        aspect_ratio = img.height / img.width
-        new_width = min(max_width, img.width) - 1
-        new_height = int(new_width * aspect_ratio * 0.55)
+        # Running into a wall touches the nose
+        self._x = min(max(x, 0), self.width)
+        self._y = min(max(y, 0), self.height)
+        if self._x != x or self._y != y:
+            self._touching = True
 
-        img = img.resize((new_width, new_height))
+        remaining = []
+        for food_x, food_y in self._food:
+            distance = math.hypot(self._x - food_x, self._y - food_y)
+            if distance <= SMELL_DISTANCE:
+                self._smelling = True
+            if distance > EAT_DISTANCE:
+                remaining.append((food_x, food_y))
+        self._food = remaining
+
+        # Every segment follows the one in front of it
+        chain = self._chain
+        chain[0][0] = self._x
+        chain[0][1] = self._y
+        for i in range(SEGMENTS):
+            head = chain[i]
+            tail = chain[i + 1]
+            dx = head[0] - tail[0]
+            dy = head[1] - tail[1]
+            distance = math.hypot(dx, dy)
+            if distance == 0:
+                continue
+            force = (0.5 - SEGMENT_LENGTH / distance * 0.5) * 0.99 * 0.998 * 2
+            tail[0] += force * dx
+            tail[1] += force * dy
+
+    def _simulate(self, ticks: int) -> None:
+        if self._brain is None:
+            self._brain = connectome.Brain(connectome.load(), self._rng)
+
+        for _ in range(ticks):
+            if self._tick % BRAIN_INTERVAL == 0:
+                self._update_brain()
+            if self._tick % FOOD_INTERVAL == FOOD_INTERVAL - 1:
+                self._food.append(
+                    (
+                        self._rng.uniform(0, self.width),
+                        self._rng.uniform(0, self.height),
+                    )
+                )
+            self._move()
+            self._tick += 1
+
+    def _render(self) -> io.BytesIO:
+        image = Image.new("RGB", (self.width, self.height), BACKGROUND)
+        draw = ImageDraw.Draw(image)
+
+        for x, y in self._food:
+            draw.ellipse(
+                (x - FOOD_RADIUS, y - FOOD_RADIUS, x + FOOD_RADIUS, y + FOOD_RADIUS),
+                fill=FOOD_COLOR,
+            )
+
+        points = [tuple(point) for point in self._chain]
+        draw.line(points, fill=WORM_COLOR, width=WORM_WIDTH, joint="curve")
+        # Round ends
+        radius = WORM_WIDTH / 2
+        for x, y in (points[0], points[-1]):
+            draw.ellipse(
+                (x - radius, y - radius, x + radius, y + radius), fill=WORM_COLOR
+            )
+
+        frame = io.BytesIO()
+        image.save(frame, format="PNG")
+        frame.seek(0)
+        return frame
+
+    def _next_frame(self) -> io.BytesIO:
+        self._simulate(round(self.frame_interval * TICKS_PER_SECOND))
+        return self._render()
+
+    async def frames(self):
+        """
+        Simulates the worm and yields a png frame every frame_interval seconds until the session is stopped
+
+        Yields:
+            io.BytesIO: The frame
+        """
+        loop = asyncio.get_running_loop()
+        while not self.stopped:
+            start = time.monotonic()
+            frame = await loop.run_in_executor(_pool, self._next_frame)
+            if self.stopped:
+                return
+            yield frame
+
+            # Never faster than one frame per interval, however long the upload took
+            await asyncio.sleep(
+                max(self.frame_interval - (time.monotonic() - start), 0)
+            )
 
-        img = img.convert("L")
+    def stop(self) -> None:
+        self.stopped = True
 
-        ascii_chars = "@%#*+=-:. "
 
-        ascii_art = ""
-        for pixel_value in img.getdata():
-            pixel_index = min(pixel_value // 10, len(ascii_chars) - 1)
-            ascii_art += ascii_chars[pixel_index]
+def open_session(user_id: int, max_sessions: int = config.Worm.max_sessions):
+    """
+    Starts a session if there are less than max_sessions running
 
-            if len(ascii_art) % new_width == 0:
-                ascii_art += "\n"
+    Returns:
+        WormSession: The session
+        None: If too many sessions are running
+    """
+    if len(_sessions) >= max_sessions:
+        return None
+    session = WormSession(user_id)
+    _sessions.add(session)
+    return session
 
-        return ascii_art
 
-    while not stop_worm:
-        image = take_screenshot()
-        # text = image_to_ascii(image_path=image)
-        yield image
-        time.sleep(1)
+def close_session(session: WormSession) -> None:
+    session.stop()
+    _sessions.discard(session)
 
 
-async def stop_the_worm():
-    global stop_worm
-    stop_worm = True
+def get_session(message_id: int = None, user_id: int = None):
+    """
+    Returns the running session shown in a message or started by a user, None if there is none
+    """
+    for session in _sessions:
+        if message_id is not None and session.message_id == message_id:
+            return session
+        if user_id is not None and session.user_id == user_id:
+            return session
+    return None
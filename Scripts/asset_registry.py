@@ -0,0 +1,234 @@
+# Copyright (C) 2024  Darkyl
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see https://www.gnu.org/licenses/.
+
+import asyncio
+import mimetypes
+import os
+import random
+import threading
+import time
+import typing as t
+from collections import OrderedDict
+
+import hikari
+
+"""
+An index of the files in the asset folders.
+
+Every folder is scanned once into a tuple of its files, with their sizes and
+MIME types, so picking a random file is a single random.choice instead of a
+directory listing. A folder is rescanned when its modification time changes,
+which is checked at most every CHECK_INTERVAL seconds.
+
+Small files are kept in memory after their first use and sent as hikari.Bytes.
+Overwriting a file doesn't change the modification time of its folder, so the
+kept data is checked against the size and modification time of the file itself.
+"""
+
+# Seconds between two checks whether a folder changed
+CHECK_INTERVAL = 10
+
+# Files up to this size are kept in memory
+MAX_PRELOAD_SIZE = 2 * 1024 * 1024
+
+# How many bytes are kept in memory in total
+PRELOAD_BUDGET = 64 * 1024 * 1024
+
+
+class Asset(t.NamedTuple):
+    path: str
+    name: str
+    size: int  # When the folder was scanned, files changed in place keep the old size
+    mime_type: str
+
+
+class CachedData(t.NamedTuple):
+    size: int
+    mtime_ns: int
+    data: bytes
+
+
+class AssetFolder(t.NamedTuple):
+    assets: tuple
+    mtime_ns: int
+    checked_at: float
+
+
+class AssetRegistry:
+    def __init__(
+        self,
+        check_interval: float = CHECK_INTERVAL,
+        max_preload_size: int = MAX_PRELOAD_SIZE,
+        preload_budget: int = PRELOAD_BUDGET,
+    ) -> None:
+        """
+        Args:
+            check_interval (float): Seconds between two checks whether a folder changed
+            max_preload_size (int): Files up to this size are kept in memory
+            preload_budget (int): How many bytes are kept in memory in total
+        """
+        self.check_interval = check_interval
+        self.max_preload_size = max_preload_size
+        self.preload_budget = preload_budget
+
+        self._folders = {}  # {folder: AssetFolder}
+        self._lock = threading.Lock()
+
+        self._data = OrderedDict()  # {path: CachedData}, least recently used first
+        self._data_size = 0
+
+    @staticmethod
+    def _scan(folder: str) -> AssetFolder:
+        mtime_ns = os.stat(folder).st_mtime_ns
+
+        assets = []
+        with os.scandir(folder) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                mime_type = mimetypes.guess_type(entry.name)[0]
+                assets.append(
+                    Asset(
+                        entry.path,
+                        entry.name,
+                        entry.stat().st_size,
+                        mime_type or "application/octet-stream",
+                    )
+                )
+
+        # Sorted, so picks don't depend on the order of the file system
+        assets.sort()
+        return AssetFolder(tuple(assets), mtime_ns, time.monotonic())
+
+    def get(self, folder: str) -> tuple:
+        """
+        Returns the files in a folder, scanning it if it is new or changed
+
+        Args:
+            folder (str): The folder
+        Returns:
+            tuple: The assets, sorted by path
+        Raises:
+            NotADirectoryError: If the folder doesn't exist
+        """
+        folder = os.path.abspath(folder)
+        cached = self._folders.get(folder)
+        now = time.monotonic()
+
+        if cached is not None and now - cached.checked_at < self.check_interval:
+            return cached.assets
+
+        if not os.path.isdir(folder):
+            raise NotADirectoryError(f"{folder} is not a directory")
+
+        if cached is not None and os.stat(folder).st_mtime_ns == cached.mtime_ns:
+            self._folders[folder] = cached._replace(checked_at=now)
+            return cached.assets
+
+        scanned = self._scan(folder)
+        self._folders[folder] = scanned
+
+        if cached is not None:
+            # Drop the data of files that changed or were removed
+            with self._lock:
+                for asset in set(cached.assets) - set(scanned.assets):
+                    self._forget(asset.path)
+
+        return scanned.assets
+
+    def choose(self, folder: str) -> Asset:
+        """
+        Picks a random file from a folder
+
+        Raises:
+            NotADirectoryError: If the folder doesn't exist
+            IndexError: If the folder is empty
+        """
+        assets = self.get(folder)
+        if not assets:
+            raise IndexError(f"{folder} is empty")
+        return random.choice(assets)
+
+    def scan_tree(self, root: str) -> int:
+        """
+        Scans every folder below a root folder, so the first picks don't have to
+
+        Returns:
+            int: The number of files found
+        """
+        count = 0
+        for folder, _, files in os.walk(root):
+            if files:
+                count += len(self.get(folder))
+        return count
+
+    def _forget(self, path: str) -> None:
+        cached = self._data.pop(path, None)
+        if cached is not None:
+            self._data_size -= len(cached.data)
+
+    def _read(self, asset: Asset, stat: os.stat_result) -> bytes:
+        with self._lock:
+            cached = self._data.get(asset.path)
+            if cached is not None and (cached.size, cached.mtime_ns) == (
+                stat.st_size,
+                stat.st_mtime_ns,
+            ):
+                self._data.move_to_end(asset.path)
+                return cached.data
+
+        with open(asset.path, "rb") as file:
+            data = file.read()
+
+        with self._lock:
+            self._forget(asset.path)
+            if len(data) <= self.max_preload_size:
+                self._data[asset.path] = CachedData(
+                    stat.st_size, stat.st_mtime_ns, data
+                )
+                self._data_size += len(data)
+                while self._data_size > self.preload_budget:
+                    _, dropped = self._data.popitem(last=False)
+                    self._data_size -= len(dropped.data)
+
+        return data
+
+    def read(self, asset: Asset) -> bytes:
+        """
+        Reads a file, from memory if it was read before, hasn't changed since and is small enough to be kept
+        """
+        return self._read(asset, os.stat(asset.path))
+
+    def _read_small(self, asset: Asset):
+        """
+        Reads a file if it is small enough to be kept in memory, returns None otherwise
+        """
+        stat = os.stat(asset.path)
+        if stat.st_size > self.max_preload_size:
+            return None
+        return self._read(asset, stat)
+
+    async def attachment(self, asset: Asset) -> hikari.Resource:
+        """
+        Returns an asset as an attachment.
+        Small files are sent from memory, large ones are streamed from disk.
+        """
+        data = await asyncio.to_thread(self._read_small, asset)
+        if data is None:
+            return hikari.File(asset.path, asset.name)
+        return hikari.Bytes(data, asset.name, mimetype=asset.mime_type)
+
+
+registry = AssetRegistry()
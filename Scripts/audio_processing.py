@@ -0,0 +1,152 @@
+# Copyright (C) 2024  Darkyl
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see https://www.gnu.org/licenses/.
+
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import soundfile as sf
+from scipy.fft import irfft
+
+"""
+Audio processing that runs in a separate worker process,
+so long files don't block the bot or hold the GIL.
+"""
+
+# Discord's upload limit, the rotated file has to fit into it
+MAX_OUTPUT_SIZE = 25 * 1024 * 1024
+
+# Bytes per sample of the written 32 bit float WAV files
+SAMPLE_SIZE = 4
+
+
+class AudioError(Exception):
+    """
+    An error that can be shown to the user
+    """
+
+
+def rotate_signal(signal: np.ndarray, flip: bool) -> np.ndarray:
+    """
+    Rotates a signal in the spectral domain
+
+    The signal is used as the positive half of a real, even spectrum. The inverse
+    real FFT of that spectrum gives the same result as mirroring the signal and
+    running a full complex IFFT, at half the cost.
+
+    Args:
+        signal (np.ndarray): The samples, shaped (frames,) or (frames, channels)
+        flip (bool): Flip the signal before rotation
+    Returns:
+        np.ndarray: The rotated signal with the same shape and dtype
+    """
+    if flip:
+        signal = signal[::-1]
+
+    frames = signal.shape[0]
+    rotated = irfft(signal, n=2 * frames - 1, axis=0)[:frames]
+
+    # Keep the energy of every channel the same as before the rotation
+    signal_energy = np.sum(np.square(signal), axis=0, dtype=np.float64)
+    rotated_energy = np.sum(np.square(rotated), axis=0, dtype=np.float64)
+    energy_ratio = np.sqrt(
+        np.divide(
+            signal_energy,
+            rotated_energy,
+            out=np.zeros_like(signal_energy),
+            where=rotated_energy > 0,
+        )
+    )
+    rotated *= energy_ratio.astype(rotated.dtype)
+
+    return rotated
+
+
+def rotate_file(
+    input_path: str, output_path: str, flip: bool, max_output_size=MAX_OUTPUT_SIZE
+) -> None:
+    """
+    Rotates an audio file and writes the result as a 32 bit float WAV file
+
+    The size of the result is checked before anything is decoded, so the memory
+    used stays bounded by the upload limit.
+
+    Args:
+        input_path (str): The WAV or FLAC file to rotate
+        output_path (str): Where the rotated file is written
+        flip (bool): Flip the signal before rotation
+        max_output_size (int): The maximum size of the rotated file in bytes
+    Raises:
+        AudioError: If the file can't be read, has too many channels or the result is too large
+    """
+    try:
+        file = sf.SoundFile(input_path)
+    except Exception as e:
+        raise AudioError(f"Error while reading the audio file: {e}")
+
+    with file:
+        if file.channels not in (1, 2):
+            raise AudioError("Only mono and stereo audio files are supported.")
+
+        if file.frames * file.channels * SAMPLE_SIZE > max_output_size:
+            raise AudioError("The rotated audio file is too large to send.")
+
+        sample_rate = file.samplerate
+
+        # Decode straight into a float32 buffer, both channels are rotated in one call
+        signal = np.empty((file.frames, file.channels), dtype=np.float32)
+        file.read(out=signal)
+
+    rotated = rotate_signal(signal, flip)
+    del signal
+
+    sf.write(output_path, rotated, sample_rate, format="WAV", subtype="FLOAT")
+
+
+# A single long-lived worker, started on first use.
+# The worker is spawned instead of forked, because the bot process runs threads.
+_executor = None
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+
+async def rotate_file_async(input_path: str, output_path: str, flip: bool) -> None:
+    """
+    Runs rotate_file in the worker process
+
+    Raises:
+        AudioError: See rotate_file
+    """
+    global _executor
+
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(
+            _get_executor(), rotate_file, input_path, output_path, flip
+        )
+    except BrokenProcessPool:
+        # The worker died (for example out of memory), start a new one next time
+        _executor = None
+        raise
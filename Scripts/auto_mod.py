@@ -13,8 +13,6 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see https://www.gnu.org/licenses/.
 
-import asyncio
-import json
 import os
 import re
 from urllib.parse import urlparse
@@ -22,7 +20,10 @@ from urllib.parse import urlparse
 import bot_utils as utils
 import buttons
 import config_reader as config
+import document_store
 import hikari
+from domain_policy import DomainAllowList
+from word_filter import WordFilter
 
 
 async def check_attachments(attachments) -> str:
@@ -39,13 +40,14 @@ async def check_attachments(attachments) -> str:
     return False
 
 
-async def check_message(content: str, nsfw: bool) -> list[str]:
+async def check_message(content: str, nsfw: bool, urls: list = None) -> list[str]:
     """
     A function that performs various checks on a message to moderate it.
 
     Args:
         content (str): The content of the message
         nsfw (bool): Was the message sent in a channel marked as nsfw?
+        urls (list): The host names in the message, if they were already extracted
     Returns:
         list(str): List of violations
     """
@@ -59,7 +61,7 @@ async def check_message(content: str, nsfw: bool) -> list[str]:
                     violations.append(f"NSFW language")
                     flagged_strings.append(flagged_word)
 
-            url_status, flagged_url = await check_url(content)
+            url_status, flagged_url = await check_url(content, urls)
             if url_status:
                 violations.append(f"Disallowed URL")
                 flagged_strings.append(flagged_url)
@@ -72,41 +74,47 @@ async def check_message(content: str, nsfw: bool) -> list[str]:
     return violations, flagged_strings
 
 
-async def extract_urls(content: str) -> list:
+URL_PATTERN = re.compile(
+    r"https?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+|www\.[a-zA-Z0-9-]+(?:\.[a-zA-Z]{2,})+"
+)
+
+allowed_domains = DomainAllowList(
+    os.path.join(config.Paths.data_folder, "whitelisted_sites.txt")
+)
+
+
+def parse_hostnames(content: str) -> list:
     """
-    Takes in a string and extracts domains.
+    Takes in a string and extracts the host names.
 
     Example:
         Input: "I love this video: https://www.youtube.com/watch?v=JqZRB4WtqZI, and this website: https://darkylmusic.com/discord-bot/"
-        Return: ["youtube.com", "darkylmusic.com"]
+        Return: ["www.youtube.com", "darkylmusic.com"]
     """
-    try:
-        url_pattern = re.compile(
-            r"https?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+|www\.[a-zA-Z0-9-]+(?:\.[a-zA-Z]{2,})+"
-        )
-        matches = url_pattern.findall(content)
+    matches = URL_PATTERN.findall(content)
 
-        domains = set()
-        for match in matches:
-            if match.startswith("www."):
-                match = "http://" + match
+    domains = set()
+    for match in matches:
+        if match.startswith("www."):
+            match = "http://" + match
 
-            parsed_url = urlparse(match)
-            domain = parsed_url.netloc or parsed_url.path
+        try:
+            domain = urlparse(match).hostname
+        except ValueError:
+            continue
 
-            domain = domain.split("/")[0]
+        if domain and len(domain.split(".")) > 1:
+            domains.add(domain)
 
-            domain = domain.split(":")[0]
+    return list(domains)
 
-            domain_parts = domain.split(".")
-            if len(domain_parts) > 2:
-                domain = ".".join(domain_parts[-2:])
-
-            if len(domain.split(".")) > 1:
-                domains.add(domain)
-
-        return list(domains)
 
+async def extract_urls(content: str) -> list:
+    """
+    Takes in a string and extracts the host names, see parse_hostnames
+    """
+    try:
+        return parse_hostnames(content)
     except Exception as e:
         from bot import logger
 
@@ -114,12 +122,13 @@ async def extract_urls(content: str) -> list:
         return []
 
 
-async def check_url(content: str):
+async def check_url(content: str, urls: list = None):
     """
     Checks if any contained links are on the allow list.
 
     Args:
         content (str): The content of the message
+        urls (list): The host names in the message, if they were already extracted
     Returns:
         True: If the URL is disallowed
         False: If the URL is allowed
@@ -128,18 +137,11 @@ async def check_url(content: str):
     flagged_url = ""
 
     try:
-
-        allow_list_path = os.path.join(
-            config.Paths.data_folder, "whitelisted_sites.txt"
-        )
-
-        with open(allow_list_path, "r") as file:
-            allowed_domains = {line.strip() for line in file if line.strip()}
-
-        urls = await extract_urls(content)
+        if urls is None:
+            urls = await extract_urls(content)
 
         for url in urls:
-            if url not in allowed_domains:
+            if not allowed_domains.is_allowed(url):
                 status = True
                 flagged_url = url
                 break
@@ -152,6 +154,13 @@ async def check_url(content: str):
     return status, flagged_url
 
 
+nsfw_words = WordFilter(
+    os.path.join(config.Paths.data_folder, "Banned Content", "Words", "NSFW Words"),
+    whole_words=config.AutoMod.nsfw_words_whole_words,
+    leetspeak=config.AutoMod.nsfw_words_leetspeak,
+)
+
+
 async def check_for_nswf(content: str) -> bool:
     """
     A function that checks if the message contains a banned word.
@@ -160,26 +169,17 @@ async def check_for_nswf(content: str) -> bool:
         content (str): The content of the message
     Returns:
         bool: True if the message contains a banned word, False otherwise.
+        flagged_word (str): All banned words found in the message
     """
 
     flagged_word = ""
 
     # Check for NSFW words
     try:
-        banned_words_folder = os.path.join(
-            config.Paths.data_folder, "Banned Content", "Words", "NSFW Words"
-        )
-        nsfw_words_files = os.listdir(banned_words_folder)
-
-        for filename in nsfw_words_files:
-            with open(
-                os.path.join(banned_words_folder, filename), "r", encoding="utf-8"
-            ) as file:
-                nsfw_words = file.read().splitlines()
-                for word in nsfw_words:
-                    if word.lower() in content.lower():
-                        flagged_word = word
-                        return True, flagged_word
+        flagged_words = nsfw_words.find_all(content)
+        if flagged_words:
+            flagged_word = ", ".join(flagged_words)
+            return True, flagged_word
     except Exception as e:
         from bot import logger
 
@@ -229,33 +229,20 @@ def create_report_embed(
         logger.error(f"Error during create_report_embed(): {e}")
 
 
-def update_report_data(user_id, message_id: int, violations: list[str]):
+async def update_report_data(user_id, message_id: int, violations: list[str]):
     """Updates the report data."""
     try:
-        database_path = os.path.join(
-            config.Paths.data_folder, "Database", "reports.json"
-        )
-        report_data = {}
-
-        if os.path.exists(database_path) and os.path.getsize(database_path) > 0:
-            with open(database_path, "r") as file:
-                try:
-                    report_data = json.load(file)
-                except json.JSONDecodeError:
-                    pass
-
-        user_id = str(user_id)
-        if user_id not in report_data:
-            report_data[user_id] = {"reasons": {}}
-
-        reason = f"Message contains the following violations:\n{', '.join(violations)} {asyncio.run(utils.generate_id())}"
-        report_data[user_id]["reasons"][reason] = {
-            "reporter": "AutoMod",
-            "report_message": message_id,
-        }
-
-        with open(database_path, "w") as file:
-            json.dump(report_data, file, indent=4)
+        reason = f"Message contains the following violations:\n{', '.join(violations)} {await utils.generate_id()}"
+
+        def add_report(report):
+            report = report or {"reasons": {}}
+            report["reasons"][reason] = {
+                "reporter": "AutoMod",
+                "report_message": message_id,
+            }
+            return report
+
+        await document_store.reports.update(user_id, add_report)
     except Exception as e:
         from bot import logger
 
@@ -13,6 +13,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see https://www.gnu.org/licenses/.
 
+import asyncio
 import datetime
 import math
 import os
@@ -22,11 +23,13 @@ import tempfile
 import typing as t
 from io import BytesIO
 
-import aiohttp
+import asset_registry
+import channel_cache
 import config_reader as config
 import database_interaction
 import hikari
 import hikari.errors
+import http_client
 import lightbulb
 import member_managment
 import segno
@@ -71,22 +74,13 @@ async def choose_random_file(folder_path: str):
     """
     Takes in a path and returns the path to a random file in that directory
     """
-    if not os.path.isdir(folder_path):
+    try:
+        return asset_registry.registry.choose(folder_path).path
+    except NotADirectoryError:
         return "Error: The provided path is not a directory."
-
-    files = [
-        f
-        for f in os.listdir(folder_path)
-        if os.path.isfile(os.path.join(folder_path, f))
-    ]
-
-    if not files:
+    except IndexError:
         return "Error: The directory is empty."
 
-    random_file = random.choice(files)
-
-    return str(os.path.join(folder_path, random_file))
-
 
 async def validate_command(
     ctx: lightbulb.Context,
@@ -134,7 +128,7 @@ async def validate_command(
         if nsfw or ctx.command.nsfw:
             try:
                 # Check if it's an nsfw channel
-                channel = await ctx.app.rest.fetch_channel(ctx.channel_id)
+                channel = await channel_cache.resolver.fetch(ctx.app, ctx.channel_id)
                 if not channel.is_nsfw:
                     await ctx.respond(
                         "This command can only be run in a channel marked as NSFW.",
@@ -220,7 +214,7 @@ async def validate_command(
                 options_str = "No options."
 
             if not nsfw or ctx.command.nsfw:
-                database_interaction.Commands.create_command_entry(
+                await database_interaction.Commands.create_command_entry(
                     ctx.author.id, ctx.command.name, options_str
                 )
 
@@ -526,24 +520,24 @@ async def coding_joke() -> str:
     try:
         from bot import logger
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data.get("error"):
-                        return ""
-                    if data["type"] == "twopart":
-                        return f"{data['setup']}\n||{data['delivery']}||"
-                    elif data["type"] == "single":
-                        return data["joke"]
-                else:
-                    logger.error(
-                        f"Failed to fetch joke during error_fun: {response.status}"
-                    )
+        response = await http_client.fetch(url, params=params)
+        if response.status == 200:
+            data = response.data
+            if data.get("error"):
+                return ""
+            if data["type"] == "twopart":
+                return f"{data['setup']}\n||{data['delivery']}||"
+            elif data["type"] == "single":
+                return data["joke"]
+        else:
+            logger.error(f"Failed to fetch joke during error_fun: {response.status}")
         return ""
-    except aiohttp.ServerTimeoutError:
+    except asyncio.TimeoutError:
         logger.error(f"Failed to fetch coding joke: API timed out.")
         return ""
+    except http_client.CircuitOpenError as e:
+        logger.error(f"Failed to fetch coding joke: {e}")
+        return ""
     except Exception as e:
         logger.error(f"Error during error_fun in coding_joke(): {e}")
         return ""
@@ -638,6 +632,35 @@ def iso_8601_to_discord_timestamp(time: str) -> str:
     return formatted_date
 
 
+def parse_duration(duration: str) -> int:
+    """
+    Parses a duration string (e.g., '1y2d3h29m2s') and returns the total duration in seconds.
+
+    Args:
+        duration (str): The duration string to parse.
+
+    Returns:
+        int: The total duration in seconds.
+    """
+    time_units = {
+        "y": 31536000,  # years
+        "d": 86400,  # days
+        "h": 3600,  # hours
+        "m": 60,  # minutes
+        "s": 1,  # seconds
+    }
+
+    total_seconds = 0
+    matches = re.findall(r"(\d+)([ydhms])", duration)
+    for value, unit in matches:
+        if unit in time_units:
+            total_seconds += int(value) * time_units[unit]
+        else:
+            return None
+
+    return total_seconds if total_seconds > 0 else None
+
+
 BADGE_MAPPING = {
     hikari.UserFlag.BUG_HUNTER_LEVEL_1: "<:badge_bug_hunter_level_1:1265030107639316672>",
     hikari.UserFlag.BUG_HUNTER_LEVEL_2: "<:badge_bug_hunter_level_2:1265030128145272925>",
@@ -687,7 +710,9 @@ async def nsfw_blacklisted(user_id: int) -> bool:
         False: User isn't blacklisted
     """
 
-    entry = database_interaction.Users.get_user_entry(user_id, values=["nsfw_opt_out"])
+    entry = await database_interaction.Users.get_user_entry(
+        user_id, values=["nsfw_opt_out"]
+    )
     if entry is None:
         return False
 
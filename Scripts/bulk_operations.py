@@ -0,0 +1,218 @@
+# Copyright (C) 2024  Darkyl
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see https://www.gnu.org/licenses/.
+
+import asyncio
+import json
+import os
+import time
+
+import hikari
+
+"""
+Runs large batches of REST calls (like the ones of a lockdown) concurrently.
+
+A job is a list of operations. Every operation is a JSON-serializable dict with:
+    key: A unique name for the operation
+    action: The name of the handler that performs it
+    bucket: The resource it touches, operations with the same bucket run one after another
+    Anything else the handler needs
+
+hikari already waits on Discord's rate limit buckets. The executor keeps the
+number of requests in flight bounded, so a job doesn't pile thousands of requests
+into hikari's queues, and retries requests that were rate limited for too long
+or failed with a server error.
+
+The job is checkpointed to a file while it runs, so an interrupted job can be
+resumed without repeating the operations that already succeeded.
+"""
+
+
+class BulkJob:
+    def __init__(self, path: str, name: str, operations: list = None) -> None:
+        """
+        Args:
+            path (str): The checkpoint file
+            name (str): What the job does, for example "lockdown"
+            operations (list): The operations of the job
+        """
+        self.path = path
+        self.name = name
+        self.operations = operations or []
+        self.done = set()
+        self.failed = {}  # {key: error}
+        self.results = {}  # {key: result of the handler}
+        self.data = {}  # Anything else that has to survive a restart
+
+    @classmethod
+    def load(cls, path: str):
+        """
+        Loads a job from its checkpoint file
+
+        Returns:
+            BulkJob: The job
+            None: If there is no checkpoint
+        """
+        try:
+            with open(path, "r") as file:
+                checkpoint = json.load(file)
+        except FileNotFoundError:
+            return None
+
+        job = cls(path, checkpoint["name"], checkpoint["operations"])
+        job.done = set(checkpoint["done"])
+        job.failed = checkpoint["failed"]
+        job.results = checkpoint["results"]
+        job.data = checkpoint.get("data", {})
+        return job
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as file:
+            json.dump(
+                {
+                    "name": self.name,
+                    "operations": self.operations,
+                    "done": sorted(self.done),
+                    "failed": self.failed,
+                    "results": self.results,
+                    "data": self.data,
+                },
+                file,
+            )
+        os.replace(temp_path, self.path)
+
+    def delete(self) -> None:
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    @property
+    def pending(self) -> list:
+        """
+        The operations that haven't succeeded yet, including failed ones
+        """
+        return [
+            operation
+            for operation in self.operations
+            if operation["key"] not in self.done
+        ]
+
+    @property
+    def total(self) -> int:
+        return len(self.operations)
+
+
+class BulkExecutor:
+    def __init__(
+        self,
+        handlers: dict,
+        concurrency: int = 10,
+        max_retries: int = 3,
+        checkpoint_interval: float = 2.0,
+        progress_interval: float = 2.0,
+    ) -> None:
+        """
+        Args:
+            handlers (dict): {action: async function that takes the operation and returns a JSON-serializable result}
+            concurrency (int): How many requests are in flight at most
+            max_retries (int): How often a rate limited or failed request is retried
+            checkpoint_interval (float): Seconds between two checkpoints
+            progress_interval (float): Seconds between two progress reports
+        """
+        self.handlers = handlers
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.checkpoint_interval = checkpoint_interval
+        self.progress_interval = progress_interval
+
+    async def _perform(self, operation: dict):
+        handler = self.handlers[operation["action"]]
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await handler(operation)
+            except (hikari.RateLimitTooLongError, hikari.RateLimitedError) as e:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(e.retry_after)
+            except hikari.InternalServerError:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(2**attempt)
+
+    async def run(self, job: BulkJob, on_progress=None) -> BulkJob:
+        """
+        Runs the pending operations of a job and checkpoints it
+
+        Args:
+            job (BulkJob): The job
+            on_progress: An optional async function called with (done, failed, total) while the job runs
+        Returns:
+            BulkJob: The job, failed operations are in job.failed
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+        last_checkpoint = time.monotonic()
+        last_progress = 0.0
+
+        # Operations on the same resource run in order, one after another
+        buckets = {}
+        for operation in job.pending:
+            buckets.setdefault(operation.get("bucket"), []).append(operation)
+
+        async def report(force: bool = False) -> None:
+            nonlocal last_progress
+            if on_progress is None:
+                return
+            if not force and time.monotonic() - last_progress < self.progress_interval:
+                return
+            last_progress = time.monotonic()
+            try:
+                await on_progress(len(job.done), len(job.failed), job.total)
+            except Exception as e:
+                from bot import logger
+
+                logger.error(f"Error while reporting progress of {job.name}: {e}")
+
+        async def run_bucket(operations: list) -> None:
+            nonlocal last_checkpoint
+            for operation in operations:
+                key = operation["key"]
+                async with semaphore:
+                    try:
+                        result = await self._perform(operation)
+                    except Exception as e:
+                        job.failed[key] = str(e)
+                    else:
+                        job.done.add(key)
+                        job.failed.pop(key, None)
+                        if result is not None:
+                            job.results[key] = result
+
+                if time.monotonic() - last_checkpoint >= self.checkpoint_interval:
+                    last_checkpoint = time.monotonic()
+                    job.save()
+                await report()
+
+        job.save()
+        try:
+            await asyncio.gather(
+                *(run_bucket(operations) for operations in buckets.values())
+            )
+        finally:
+            job.save()
+        await report(force=True)
+
+        return job
@@ -14,7 +14,6 @@
 # along with this program.  If not, see https://www.gnu.org/licenses/.
 
 import datetime
-import json
 import os
 import random
 from collections import defaultdict
@@ -22,6 +21,7 @@ from collections import defaultdict
 import bot_utils as utils
 import config_reader as config
 import database_interaction
+import document_store
 import hikari
 import hikari.errors
 import lightbulb
@@ -30,7 +30,6 @@ import miru
 import miru.text_input
 import miru.view
 import modals
-import vars
 from voice_cache import created_channels, locked_channels, voice_state_cache
 
 
@@ -339,15 +338,14 @@ class ReactionRoles:
 
 
 class Report(miru.View):
-    reports_path = os.path.join(config.Paths.data_folder, "Database", "reports.json")
-
     def __init__(self) -> None:
         super().__init__(timeout=None)
 
     async def find_key_by_report_message(report_message: int, return_reporter=False):
-        with open(Report.reports_path, "r") as file:
-            json_data = json.load(file)
-        for main_key, values in json_data.items():
+        # The index leads to the reported user, only their reports are checked
+        for main_key, values in await document_store.reports.find(
+            "report_message", report_message
+        ):
             for reason_key, reason_value in values["reasons"].items():
                 if reason_value["report_message"] == report_message:
                     if return_reporter:
@@ -367,25 +365,11 @@ class Report(miru.View):
             else:
                 user_id, reason, reporter = key
 
-            database_path = os.path.join(
-                config.Paths.data_folder, "Database", "warnings.json"
+            warnings = await document_store.warnings.update(
+                user_id, lambda reasons: (reasons or []) + [reason]
             )
-            if os.path.exists(database_path) and os.path.getsize(database_path) > 0:
-                with open(database_path, "r") as file:
-                    try:
-                        data = json.load(file)
-                    except json.JSONDecodeError:
-                        data = {}
-            else:
-                data = {}
-
-            # Check if user already exists in the data dictionary
-            if user_id in data:
-                data[user_id].append(reason)
-            else:
-                data[user_id] = [reason]
 
-            if len(data.get(user_id, [])) > 2 and len(data.get(user_id, [])) < 4:
+            if len(warnings) > 2 and len(warnings) < 4:
                 await ctx.client.app.rest.kick_user(
                     ctx.guild_id, user_id, reason="Too many warnings."
                 )
@@ -395,7 +379,7 @@ class Report(miru.View):
                 await ctx.respond(
                     f"Warned <@{user_id}> for '{reason}'.\n\n(User was kicked for too many warnings)"
                 )
-            elif len(data.get(user_id, [])) > 4:
+            elif len(warnings) > 4:
                 await ctx.client.app.rest.ban_user(
                     ctx.guild_id, user_id, reason="Too many warnings."
                 )
@@ -495,24 +479,16 @@ class Report(miru.View):
         if ctx.author.is_bot or ctx.author.is_system:
             return
 
-        message_id = ctx.message.id
+        key = await Report.find_key_by_report_message(ctx.message.id)
 
-        database_path = os.path.join(
-            config.Paths.data_folder, "Database", "reports.json"
-        )
-
-        with open(database_path, "r") as file:
-            warnings_data = json.load(file)
+        if key is not None:
+            user_id, reason = key
 
-        for user_id, user_data in warnings_data.items():
-            for reason, reason_data in user_data["reasons"].items():
-                if reason_data["report_message"] == message_id:
-                    del warnings_data[user_id]["reasons"][reason]
-                    break
+            def remove_report(report):
+                report["reasons"].pop(reason, None)
+                return report
 
-        # Write the updated data back to warnings.json
-        with open(database_path, "w") as file:
-            json.dump(warnings_data, file, indent=4)
+            await document_store.reports.update(user_id, remove_report)
 
         await ctx.respond("Report has been ignored.")
 
@@ -531,20 +507,19 @@ class Worm(miru.View):
         if ctx.author.is_bot or ctx.author.is_system:
             return
 
-        if not vars.worm_is_running:
+        from Worm import worm_simulator
+
+        session = worm_simulator.get_session(message_id=ctx.message.id)
+        if session is None:
             await ctx.respond("There is no worm running...")
             return
 
-        from Worm.worm_simulator import stop_the_worm
-
-        await stop_the_worm()
+        worm_simulator.close_session(session)
 
         await ctx.message.edit(
             content="Worm stopped.", embeds=[], attachments=[], components=[]
         )
 
-        vars.worm_is_running = False
-
 
 class Rules(miru.View):
     tos = miru.LinkButton(url="https://discord.com/terms", label="📰Terms of Service")
@@ -753,21 +728,7 @@ class ModMenu(miru.View):
 
         user_id = str(ctx.message.content)[2:-1]
 
-        database_path = os.path.join(
-            config.Paths.data_folder, "Database", "warnings.json"
-        )
-        if os.path.exists(database_path) and os.path.getsize(database_path) > 0:
-            with open(database_path, "r") as file:
-                try:
-                    data = json.load(file)
-                except json.JSONDecodeError:
-                    data = {}
-
-        if user_id in data:
-            del data[user_id]
-
-        with open(database_path, "w") as file:
-            json.dump(data, file, indent=4)
+        await document_store.warnings.delete(user_id)
 
         await ctx.respond(
             f"Successfully removed all warnings.", flags=hikari.MessageFlag.EPHEMERAL
@@ -812,7 +773,7 @@ class NSFWOptOut(miru.View):
     ) -> None:
         user_id = ctx.author.id
 
-        if database_interaction.Users.update_nsfw_status(user_id, True):
+        if await database_interaction.Users.update_nsfw_status(user_id, True):
             await ctx.respond(
                 "Successfully opted out!", flags=hikari.MessageFlag.EPHEMERAL
             )
@@ -835,7 +796,7 @@ class NSFWOptIn(miru.View):
     ) -> None:
         user_id = ctx.author.id
 
-        if database_interaction.Users.update_nsfw_status(user_id, False):
+        if await database_interaction.Users.update_nsfw_status(user_id, False):
             await ctx.respond(
                 "Successfully opted in!", flags=hikari.MessageFlag.EPHEMERAL
             )
@@ -1033,31 +994,13 @@ class Confess(miru.View):
         super().__init__(timeout=None)
 
     async def delete_confession_by_message_id(message_id: int):
-        db_path = os.path.join(config.Paths.data_folder, "Database", "confessions.json")
-
-        # Load existing confessions
-        if os.path.exists(db_path):
-            try:
-                with open(db_path, "r") as file:
-                    confessions = json.load(file)
-            except json.JSONDecodeError:
-                return
-        else:
-            return
-
         # Find and delete the confession with the given message ID
-        confession_to_delete = None
-        for confession_id, data in confessions.items():
-            if data[1] == message_id:
-                confession_to_delete = confession_id
-                break
-
-        if confession_to_delete:
-            del confessions[confession_to_delete]
-            # Save the updated confessions back to the file
-            with open(db_path, "w") as file:
-                json.dump(confessions, file, indent=4)
+        confessions = await document_store.confessions.find("message_id", message_id)
+
+        for confession_id, _ in confessions:
+            await document_store.confessions.delete(confession_id)
 
+        if confessions:
             return True
 
     @miru.button(
@@ -1078,17 +1021,10 @@ class Confess(miru.View):
 
         id = ctx.message.id
 
-        db_path = os.path.join(config.Paths.data_folder, "Database", "confessions.json")
-
-        with open(db_path, "r") as file:
-            confessions = json.load(file)
-
-        for key, value in confessions.items():
-            if value[1] == id:
-                entry_id = value
-                text, message_id, image_path = value
-                confession_id = key
-                break
+        for key, value in await document_store.confessions.find("message_id", id):
+            text, message_id, image_path = value
+            confession_id = key
+            break
         else:
             await ctx.respond(
                 "Confession not found in database.", flags=hikari.MessageFlag.EPHEMERAL
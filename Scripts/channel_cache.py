@@ -0,0 +1,109 @@
+# Copyright (C) 2024  Darkyl
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see https://www.gnu.org/licenses/.
+
+import time
+
+import hikari
+
+"""
+Resolves channels without a REST call whenever possible.
+
+Lookups are served from hikari's gateway cache first, then from a small local
+cache with a TTL (for channels the gateway doesn't cache, like DMs), and only
+fetched over REST on a miss.
+"""
+
+
+class ChannelResolver:
+    def __init__(self, ttl: float = 300, max_size: int = 1024) -> None:
+        """
+        Args:
+            ttl (float): How many seconds a channel fetched over REST is kept
+            max_size (int): How many channels fetched over REST are kept at most
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+
+        self._channels = {}  # {channel_id: (expires_at, channel)}
+
+        self.gateway_hits = 0
+        self.local_hits = 0
+        self.misses = 0
+
+    def _from_gateway(self, app, channel_id: int):
+        cache = getattr(app, "cache", None)
+        if cache is None:
+            return None
+        return cache.get_guild_channel(channel_id) or cache.get_thread(channel_id)
+
+    async def fetch(self, app, channel_id: int) -> hikari.PartialChannel:
+        """
+        Gets a channel, preferring the caches over a REST call
+
+        Args:
+            app: The bot or any object with a rest client (and optionally a cache)
+            channel_id (int): The ID of the channel
+        Returns:
+            channel: The channel
+        Raises:
+            hikari.errors.ForbiddenError, hikari.errors.NotFoundError: If the REST fallback fails
+        """
+        channel_id = int(channel_id)
+
+        channel = self._from_gateway(app, channel_id)
+        if channel is not None:
+            self.gateway_hits += 1
+            return channel
+
+        cached = self._channels.get(channel_id)
+        if cached is not None:
+            expires_at, channel = cached
+            if expires_at > time.monotonic():
+                self.local_hits += 1
+                return channel
+            del self._channels[channel_id]
+
+        self.misses += 1
+        channel = await app.rest.fetch_channel(channel_id)
+
+        if len(self._channels) >= self.max_size:
+            # Drop the oldest entry
+            self._channels.pop(next(iter(self._channels)))
+        self._channels[channel_id] = (time.monotonic() + self.ttl, channel)
+
+        return channel
+
+    def invalidate(self, channel_id: int) -> None:
+        """
+        Removes a channel from the local cache, for example after it was updated or deleted
+        """
+        self._channels.pop(int(channel_id), None)
+
+    def stats(self) -> dict:
+        """
+        Returns the hit and miss counters
+        """
+        lookups = self.gateway_hits + self.local_hits + self.misses
+        return {
+            "gateway_hits": self.gateway_hits,
+            "local_hits": self.local_hits,
+            "misses": self.misses,
+            "hit_rate": (
+                (self.gateway_hits + self.local_hits) / lookups if lookups else 0.0
+            ),
+        }
+
+
+resolver = ChannelResolver()
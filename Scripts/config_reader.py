@@ -159,6 +159,8 @@ class HelpMessage:
 
 class AutoMod:
     filter_nsfw_language = config["Moderation"]["filter_nsfw_words"]
+    nsfw_words_whole_words = config["Moderation"]["nsfw_words_whole_words"]
+    nsfw_words_leetspeak = config["Moderation"]["nsfw_words_leetspeak"]
     allowed_files = config["Moderation"]["allowed_files"]
     kick_threshold = config["Moderation"]["Warnings"]["kick_threshold"]
     ban_threshold = config["Moderation"]["Warnings"]["ban_threshold"]
@@ -177,6 +179,27 @@ class Verification:
     disable_captcha = config["Moderation"]["disable_captcha"]
 
 
+class MessageLog:
+    retention_days = config["Message Log"]["retention_days"]
+    max_versions = config["Message Log"]["max_versions"]
+    channel_retention_days = config["Message Log"]["channel_retention_days"] or {}
+    archive = config["Message Log"]["archive"]
+    archive_folder = os.path.join(Paths.data_folder, "Database", "Archive")
+
+
+class DatabaseBackups:
+    enabled = config["Database Backups"]["enabled"]
+    interval_hours = config["Database Backups"]["interval_hours"]
+    keep = config["Database Backups"]["keep"]
+    compress = config["Database Backups"]["compress"]
+    folder = os.path.join(Paths.data_folder, "Database", "Backups")
+
+
+class Worm:
+    max_sessions = config["Worm Simulator"]["max_sessions"]
+    frame_interval = config["Worm Simulator"]["frame_interval"]
+
+
 class Dev:
     key = secret["Secret API secret keying api key secret Secret Key"]
 
@@ -239,6 +262,8 @@ def validate(startup: bool = False):
         "Level System.level_xp_mapping": dict,
         "Moderation.allowed_files": list,
         "Moderation.filter_nsfw_words": bool,
+        "Moderation.nsfw_words_whole_words": bool,
+        "Moderation.nsfw_words_leetspeak": bool,
         "Moderation.roast_api_censored_words": list,
         "Moderation.Warnings.kick_threshold": int,
         "Moderation.Warnings.ban_threshold": int,
@@ -255,6 +280,16 @@ def validate(startup: bool = False):
         "Moderation.force_captcha": bool,
         "Moderation.disable_captcha": bool,
         "Channels.verify": int,
+        "Message Log.retention_days": int,
+        "Message Log.max_versions": int,
+        "Message Log.channel_retention_days": (dict, type(None)),
+        "Message Log.archive": bool,
+        "Database Backups.enabled": bool,
+        "Database Backups.interval_hours": (int, float),
+        "Database Backups.keep": int,
+        "Database Backups.compress": bool,
+        "Worm Simulator.max_sessions": int,
+        "Worm Simulator.frame_interval": (int, float),
     }
 
     def get_nested_key(d, keys):
@@ -302,6 +337,19 @@ def validate(startup: bool = False):
         raise InvalidConfigError(
             f"'disable_captcha' and 'force_captcha' cannot be enabled at the same time."
         )
+
+    if MessageLog.max_versions < 1:
+        raise InvalidConfigError(
+            "'max_versions' in 'Message Log' has to be at least 1."
+        )
+
+    if DatabaseBackups.keep < 1:
+        raise InvalidConfigError("'keep' in 'Database Backups' has to be at least 1.")
+
+    if Worm.frame_interval < 1:
+        raise InvalidConfigError(
+            "'frame_interval' in 'Worm Simulator' has to be at least 1 second."
+        )
     # from Verification.captcha_enabling import update_captcha_status
     # asyncio.run(update_captcha_status())
 
@@ -310,10 +358,7 @@ def validate(startup: bool = False):
     required_database_files = [
         "users.db",
         "bans.json",
-        "confessions.json",
-        "reports.json",
         "verification.json",
-        "warnings.json",
     ]
 
     def check_and_create_files(files, path):
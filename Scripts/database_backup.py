@@ -0,0 +1,200 @@
+# Copyright (C) 2024  Darkyl
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see https://www.gnu.org/licenses/.
+
+import asyncio
+import gzip
+import os
+import shutil
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import config_reader as config
+
+"""
+Snapshots of the user database, made with SQLite's online backup API.
+
+The backup runs on its own thread and its own connection. That connection
+holds a read transaction for the whole backup, so the snapshot is consistent
+and, because the database is in WAL mode, writers are never blocked.
+Pages are copied in small steps instead of copying the whole file at once.
+"""
+
+# How many pages are copied per backup step
+PAGES_PER_STEP = 1024
+
+# How many bytes are compressed at once
+COMPRESS_CHUNK_SIZE = 1024 * 1024
+
+FILE_PREFIX = "users-"
+
+
+class BackupError(Exception):
+    pass
+
+
+class BackupService:
+    def __init__(
+        self,
+        db_path: str,
+        backup_folder: str = config.DatabaseBackups.folder,
+        keep: int = config.DatabaseBackups.keep,
+        compress: bool = config.DatabaseBackups.compress,
+        interval: float = config.DatabaseBackups.interval_hours * 60 * 60,
+    ) -> None:
+        """
+        Args:
+            db_path (str): The database to back up
+            backup_folder (str): Where the snapshots are saved
+            keep (int): How many snapshots are kept, older ones are deleted
+            compress (bool): Whether snapshots are compressed with gzip
+            interval (float): Seconds between scheduled snapshots
+        """
+        self.db_path = db_path
+        self.backup_folder = backup_folder
+        self.keep = keep
+        self.compress = compress
+        self.interval = interval
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="backup")
+        self._lock = asyncio.Lock()
+
+        self.last_backup = None
+        self.last_duration = 0.0
+        self.last_size = 0
+
+    def _snapshots(self) -> list:
+        """
+        Returns the paths of the existing snapshots, oldest first
+        """
+        if not os.path.isdir(self.backup_folder):
+            return []
+        return sorted(
+            os.path.join(self.backup_folder, name)
+            for name in os.listdir(self.backup_folder)
+            if name.startswith(FILE_PREFIX)
+            and (name.endswith(".db") or name.endswith(".db.gz"))
+        )
+
+    def _copy(self, target_path: str) -> None:
+        source = sqlite3.connect(self.db_path, isolation_level=None)
+        try:
+            # Pin one version of the database for the whole backup. Without it,
+            # every write made by the bot in between would restart the backup.
+            source.execute("BEGIN")
+            source.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+
+            target = sqlite3.connect(target_path)
+            try:
+                source.backup(target, pages=PAGES_PER_STEP)
+
+                result = target.execute("PRAGMA integrity_check").fetchone()[0]
+                if result != "ok":
+                    raise BackupError(f"Integrity check failed: {result}")
+
+                # The snapshot doesn't need a WAL file next to it
+                target.execute("PRAGMA journal_mode=DELETE")
+            finally:
+                target.close()
+
+            source.execute("COMMIT")
+        finally:
+            source.close()
+
+    def _compress(self, path: str) -> str:
+        compressed_path = path + ".gz"
+        with open(path, "rb") as source, gzip.open(
+            compressed_path, "wb", compresslevel=6
+        ) as target:
+            shutil.copyfileobj(source, target, COMPRESS_CHUNK_SIZE)
+        os.remove(path)
+        return compressed_path
+
+    def _rotate(self) -> None:
+        snapshots = self._snapshots()
+        for path in snapshots[: max(len(snapshots) - self.keep, 0)]:
+            os.remove(path)
+
+    def _snapshot(self) -> str:
+        os.makedirs(self.backup_folder, exist_ok=True)
+
+        name = f"{FILE_PREFIX}{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.db"
+        path = os.path.join(self.backup_folder, name)
+        temp_path = os.path.join(self.backup_folder, f"{name}.tmp")
+
+        try:
+            self._copy(temp_path)
+            if self.compress:
+                temp_path = self._compress(temp_path)
+                path += ".gz"
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        self._rotate()
+        return path
+
+    async def snapshot(self) -> str:
+        """
+        Makes a snapshot of the database, checks its integrity and deletes the oldest snapshots
+
+        Returns:
+            str: The path of the snapshot
+        Raises:
+            BackupError: If the integrity check of the snapshot failed
+            sqlite3.Error: If the backup failed
+        """
+        async with self._lock:
+            start = time.perf_counter()
+
+            loop = asyncio.get_running_loop()
+            path = await loop.run_in_executor(self._executor, self._snapshot)
+
+            self.last_backup = datetime.now(timezone.utc)
+            self.last_duration = time.perf_counter() - start
+            self.last_size = os.path.getsize(path)
+            return path
+
+    def _next_delay(self) -> float:
+        """
+        Returns the seconds until the next snapshot is due, based on the newest existing one
+        """
+        snapshots = self._snapshots()
+        if not snapshots:
+            return 0
+        age = time.time() - os.path.getmtime(snapshots[-1])
+        return max(self.interval - age, 0)
+
+    async def run(self) -> None:
+        """
+        Makes a snapshot every interval
+        """
+        while True:
+            await asyncio.sleep(self._next_delay())
+
+            from bot import logger
+
+            try:
+                path = await self.snapshot()
+                logger.info(
+                    f"Backed up the database to {os.path.basename(path)} in {self.last_duration:.1f}s"
+                )
+            except Exception as e:
+                logger.error(f"Error during database backup: {e}")
+                # Don't retry right away
+                await asyncio.sleep(self.interval)
@@ -13,61 +13,128 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see https://www.gnu.org/licenses/.
 
+import asyncio
 import os
-import shutil
 import sqlite3
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from typing import Optional, Tuple
 
 import config_reader as config
+import database_backup
+import database_schema
 
 DB_PATH = os.path.join(config.Paths.data_folder, "Database", "users.db")
 
 
-async def backup_database(db_path: str):
-    try:
+async def backup_database(db_path: str = DB_PATH):
+    """
+    Makes a snapshot of the database with the online backup API
 
-        from bot import logger
+    Args:
+        db_path (str): The database to back up
+    Returns:
+        str: The path of the snapshot
+        None: If there was an error
+    """
+    from bot import logger
 
+    try:
         logger.info("Attempting to back up database")
 
-        from bot_utils import generate_id
-
-        backup_path = os.path.join(
-            os.path.dirname(DB_PATH), f"users_backup_{await generate_id()}"
+        service = (
+            backup if db_path == DB_PATH else database_backup.BackupService(db_path)
         )
-
-        # Copy the database file to a backup location
-        shutil.copy2(db_path, backup_path)
-        logger.info("Backup successful.")
+        path = await service.snapshot()
+        logger.info(f"Backup successful: {os.path.basename(path)}")
+        return path
     except Exception as e:
         logger.error(f"Error during backup: {e}")
+        return None
 
 
-def get_database_connection():
-    try:
-        return sqlite3.connect(DB_PATH)
-    except FileNotFoundError as e:
-        from bot import logger
+class Database:
+    """
+    A long-lived connection to the user database.
 
-        logger.error(f"Couldn't find path to database: {e}")
-        return None
-    except sqlite3.Error as e:
-        from bot import logger
+    Every query runs on a single dedicated worker thread, so the event loop never
+    waits on disk I/O and the connection is only ever touched by one thread.
+    The connection stays open for the lifetime of the bot, which lets sqlite
+    reuse its prepared statements instead of recompiling them for every call.
+    """
 
-        logger.error(f"SQLite error occurred while trying to connect to database: {e}")
-        return None
-    except Exception as e:
-        from bot import logger
+    def __init__(self, path: str, cached_statements: int = 256) -> None:
+        self.path = path
+        self.cached_statements = cached_statements
+        self._connection: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="database"
+        )
 
-        logger.error(
-            f"An unexpected error occurred while trying to connect to database: {e}"
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.path,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
         )
-        return None
+        database_schema.configure(connection)
+        database_schema.migrate(connection)
+        return connection
+
+    def _call(self, query, *args):
+        if self._connection is None:
+            self._connection = self._connect()
+        return query(self._connection, *args)
+
+    async def run(self, query, *args):
+        """
+        Runs a query on the database thread.
+
+        Args:
+            query: A function that takes the connection (and args) and performs the query
+            args: Additional arguments passed on to the query
+        Returns:
+            The return value of the query
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, query, *args)
+
+    def _close(self) -> None:
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    async def open(self) -> None:
+        """
+        Opens the connection and migrates the database to the current schema.
+        Otherwise this happens on the first query.
+        """
+        await self.run(lambda connection: None)
+
+    async def close(self) -> None:
+        """
+        Closes the connection. The next query will reopen it.
+        """
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self._close)
+
+
+database = Database(DB_PATH)
+backup = database_backup.BackupService(DB_PATH)
+
+
+def _insert_user(cursor: sqlite3.Cursor, new_user: tuple) -> None:
+    cursor.execute(
+        """
+        INSERT INTO users (id, msg_count, xp, level, cmds_used, reported, been_reported, nsfw_opt_out) 
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        new_user,
+    )
 
 
 class Users:
-    def create_entry(
+    async def create_entry(
         user_id,
         message_count,
         xp,
@@ -77,31 +144,24 @@ class Users:
         been_reported,
         nsfw_opt_out,
     ):
-        nsfw_opt_out = int(nsfw_opt_out)
+        new_user = (
+            user_id,
+            message_count,
+            xp,
+            level,
+            commands_used,
+            reported,
+            been_reported,
+            int(nsfw_opt_out),
+        )
+
+        def query(connection):
+            with connection:
+                _insert_user(connection.cursor(), new_user)
+                return new_user
+
         try:
-            connection = get_database_connection()
-            if connection:
-                with connection:
-                    cursor = connection.cursor()
-                    new_user = (
-                        user_id,
-                        message_count,
-                        xp,
-                        level,
-                        commands_used,
-                        reported,
-                        been_reported,
-                        nsfw_opt_out,
-                    )
-                    cursor.execute(
-                        """
-                        INSERT INTO users (id, msg_count, xp, level, cmds_used, reported, been_reported, nsfw_opt_out) 
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                        """,
-                        new_user,
-                    )
-                    connection.commit()
-                    return new_user
+            return await database.run(query)
         except sqlite3.IntegrityError as e:
             from bot import logger
 
@@ -126,7 +186,7 @@ class Users:
             )
         return None
 
-    def get_user_entry(user_id: int, values=None):
+    async def get_user_entry(user_id: int, values=None):
         """
         A function for getting a user entry from the database
 
@@ -138,20 +198,22 @@ class Users:
             user_data (tuple): The database entry with the specified values
             None: If the user wasn't found or there was an error
         """
+
+        def query(connection):
+            with connection:
+                cursor = connection.cursor()
+                if values:
+                    columns = ", ".join(values)
+                    cursor.execute(
+                        f"SELECT {columns} FROM users WHERE id = ?", (user_id,)
+                    )
+                else:
+                    cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
+                user_data = cursor.fetchone()
+                return tuple(user_data) if user_data else None
+
         try:
-            connection = get_database_connection()
-            if connection:
-                with connection:
-                    cursor = connection.cursor()
-                    if values:
-                        columns = ", ".join(values)
-                        cursor.execute(
-                            f"SELECT {columns} FROM users WHERE id = ?", (user_id,)
-                        )
-                    else:
-                        cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-                    user_data = cursor.fetchone()
-                    return tuple(user_data) if user_data else None
+            return await database.run(query)
         except sqlite3.OperationalError as error:
             from bot import logger
 
@@ -166,7 +228,7 @@ class Users:
             logger.error(f"An unexpected error occurred while reading user entry: {e}")
         return None
 
-    def update_user_entry(
+    async def update_user_entry(
         user_id: int,
         increment: bool = True,
         msg_count: int = 0,
@@ -194,57 +256,58 @@ class Users:
             True: Success
             False: Error
         """
-        try:
-            connection = get_database_connection()
-            if connection:
-                with connection:
-                    cursor = connection.cursor()
-
-                    if increment:
-                        # Increment the values
-                        sql = """
-                            UPDATE users 
-                            SET msg_count = msg_count + ?, xp = xp + ?, level = level + ?, cmds_used = cmds_used + ?, 
-                                reported = reported + ?, been_reported = been_reported + ?
-                        """
-                        params = [
-                            msg_count,
-                            xp,
-                            level,
-                            cmds_used,
-                            reported,
-                            been_reported,
-                        ]
-                        if nsfw_opt_out is not None:
-                            sql += ", nsfw_opt_out = ?"
-                            params.append(nsfw_opt_out)
-                        sql += " WHERE id = ?"
-                        params.append(int(user_id))
-                        cursor.execute(sql, params)
-                    else:
-                        # Replace the values
-                        sql = """
-                            UPDATE users 
-                            SET msg_count = ?, xp = ?, level = ?, cmds_used = ?, reported = ?, been_reported = ?
-                        """
-                        params = [
-                            msg_count,
-                            xp,
-                            level,
-                            cmds_used,
-                            reported,
-                            been_reported,
-                        ]
-                        if nsfw_opt_out is not None:
-                            sql += ", nsfw_opt_out = ?"
-                            params.append(nsfw_opt_out)
-                        sql += " WHERE id = ?"
-                        params.append(int(user_id))
-                        cursor.execute(sql, params)
-
-                    if cursor.rowcount == 0:
-                        # No rows were updated, user does not exist, create user entry
-                        Users.create_entry(
+
+        def query(connection):
+            with connection:
+                cursor = connection.cursor()
+
+                if increment:
+                    # Increment the values
+                    sql = """
+                        UPDATE users 
+                        SET msg_count = msg_count + ?, xp = xp + ?, level = level + ?, cmds_used = cmds_used + ?, 
+                            reported = reported + ?, been_reported = been_reported + ?
+                    """
+                    params = [
+                        msg_count,
+                        xp,
+                        level,
+                        cmds_used,
+                        reported,
+                        been_reported,
+                    ]
+                    if nsfw_opt_out is not None:
+                        sql += ", nsfw_opt_out = ?"
+                        params.append(nsfw_opt_out)
+                    sql += " WHERE id = ?"
+                    params.append(int(user_id))
+                    cursor.execute(sql, params)
+                else:
+                    # Replace the values
+                    sql = """
+                        UPDATE users 
+                        SET msg_count = ?, xp = ?, level = ?, cmds_used = ?, reported = ?, been_reported = ?
+                    """
+                    params = [
+                        msg_count,
+                        xp,
+                        level,
+                        cmds_used,
+                        reported,
+                        been_reported,
+                    ]
+                    if nsfw_opt_out is not None:
+                        sql += ", nsfw_opt_out = ?"
+                        params.append(nsfw_opt_out)
+                    sql += " WHERE id = ?"
+                    params.append(int(user_id))
+                    cursor.execute(sql, params)
+
+                if cursor.rowcount == 0:
+                    # No rows were updated, user does not exist, create user entry
+                    _insert_user(
+                        cursor,
+                        (
                             user_id,
                             msg_count,
                             xp,
@@ -252,13 +315,16 @@ class Users:
                             cmds_used,
                             reported,
                             been_reported,
-                            nsfw_opt_out,
-                        )
+                            int(nsfw_opt_out or 0),
+                        ),
+                    )
 
-                    # Commit the transaction
-                    connection.commit()
-                    return True
+                # Commit the transaction
+                connection.commit()
+                return True
 
+        try:
+            return await database.run(query)
         except sqlite3.IntegrityError as e:
             from bot import logger
 
@@ -281,24 +347,118 @@ class Users:
             logger.error(f"An unexpected error occurred while updating user entry: {e}")
         return False
 
-    def update_nsfw_status(user_id: int, nsfw_opt_out: bool) -> bool:
-        nsfw_opt_out = int(nsfw_opt_out)
+    async def apply_stat_increments(increments: list, level_from_xp):
+        """
+        A function that adds a batch of stat increments in a single transaction and recalculates the levels.
+        Entries are created for users that don't exist yet.
 
-        try:
-            connection = get_database_connection()
-            if connection:
-                with connection:
-                    cursor = connection.cursor()
-                    cursor.execute(
-                        """
-                        UPDATE users 
-                        SET nsfw_opt_out = ? 
-                        WHERE id = ?
+        Args:
+            increments (list of tuples): (user_id, msg_count, xp, cmds_used, reported) that should be added
+            level_from_xp: A function that takes the total xp of a user and returns their level
+        Returns:
+            level_ups (list of tuples): (user_id, level) for every user that reached a new level
+            None: If there was an error
+        """
+
+        def query(connection):
+            with connection:
+                cursor = connection.cursor()
+                # An UPDATE followed by an INSERT of the missing users instead of an UPSERT,
+                # databases that were created by hand have no unique constraint on users.id
+                cursor.executemany(
+                    """
+                    UPDATE users SET
+                        msg_count = msg_count + ?,
+                        xp = xp + ?,
+                        cmds_used = cmds_used + ?,
+                        reported = reported + ?
+                    WHERE id = ?
                     """,
-                        (nsfw_opt_out, int(user_id)),
+                    [(*increment[1:], increment[0]) for increment in increments],
+                )
+
+                user_ids = [increment[0] for increment in increments]
+                rows = []
+                # Stay below sqlite's limit for the number of parameters
+                for start in range(0, len(user_ids), 500):
+                    chunk = user_ids[start : start + 500]
+                    placeholders = ", ".join("?" * len(chunk))
+                    cursor.execute(
+                        f"SELECT id, xp, level FROM users WHERE id IN ({placeholders})",
+                        chunk,
                     )
-                    connection.commit()
-                    return True
+                    rows.extend(cursor.fetchall())
+
+                existing = {row[0] for row in rows}
+                new_users = [
+                    increment
+                    for increment in increments
+                    if increment[0] not in existing
+                ]
+                cursor.executemany(
+                    """
+                    INSERT INTO users (id, msg_count, xp, level, cmds_used, reported, been_reported, nsfw_opt_out)
+                    VALUES (?, ?, ?, 0, ?, ?, 0, 0)
+                    """,
+                    new_users,
+                )
+                rows.extend((increment[0], increment[2], 0) for increment in new_users)
+
+                level_changes = []
+                level_ups = []
+                for user_id, xp, level in rows:
+                    new_level = level_from_xp(xp)
+                    if new_level != level:
+                        level_changes.append((new_level, user_id))
+                        if new_level > level:
+                            level_ups.append((user_id, new_level))
+
+                cursor.executemany(
+                    "UPDATE users SET level = ? WHERE id = ?", level_changes
+                )
+                return level_ups
+
+        try:
+            return await database.run(query)
+        except sqlite3.IntegrityError as e:
+            from bot import logger
+
+            logger.error(f"Integrity error while applying stat increments: {e}")
+        except sqlite3.OperationalError as e:
+            from bot import logger
+
+            logger.error(f"Operational error while applying stat increments: {e}")
+        except sqlite3.Error as e:
+            from bot import logger
+
+            logger.error(f"SQLite error while applying stat increments: {e}")
+        except Exception as e:
+            from bot import logger
+
+            logger.error(
+                f"An unexpected error occurred while applying stat increments: {e}"
+            )
+        return None
+
+    async def update_nsfw_status(user_id: int, nsfw_opt_out: bool) -> bool:
+        nsfw_opt_out = int(nsfw_opt_out)
+
+        def query(connection):
+            with connection:
+                cursor = connection.cursor()
+                cursor.execute(
+                    """
+                    UPDATE users 
+                    SET nsfw_opt_out = ? 
+                    WHERE id = ?
+                """,
+                    (nsfw_opt_out, int(user_id)),
+                )
+                connection.commit()
+                return True
+
+        try:
+            return await database.run(query)
         except sqlite3.OperationalError as e:
             from bot import logger
 
@@ -319,7 +479,7 @@ class Users:
             )
         return False
 
-    def delete_user_entry(user_id: int) -> bool:
+    async def delete_user_entry(user_id: int) -> bool:
         """
         A function to delete a user entry from the database
 
@@ -329,14 +489,16 @@ class Users:
         Returns:
             bool: True if the user was successfully deleted, False otherwise
         """
+
+        def query(connection):
+            with connection:
+                cursor = connection.cursor()
+                cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
+                connection.commit()
+                return cursor.rowcount > 0
+
         try:
-            connection = get_database_connection()
-            if connection:
-                with connection:
-                    cursor = connection.cursor()
-                    cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
-                    connection.commit()
-                    return cursor.rowcount > 0
+            return await database.run(query)
         except sqlite3.OperationalError as e:
             from bot import logger
 
@@ -355,7 +517,7 @@ class Users:
 class Messages:
 
     @staticmethod
-    def create_message_entry(
+    async def create_message_entry(
         msg_id: int,
         content: str,
         channel_id: int,
@@ -382,29 +544,30 @@ class Messages:
         attachments = int(attachments)
         created_at = created_at or datetime.now(timezone.utc).isoformat()
 
+        def query(connection):
+            with connection:
+                cursor = connection.cursor()
+                new_message = (
+                    msg_id,
+                    content,
+                    channel_id,
+                    attachments,
+                    author_id,
+                    edited,
+                    created_at,
+                )
+                cursor.execute(
+                    """
+                    INSERT INTO messages (msg_id, content, channel_id, attachments, author, edited, created_at) 
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    new_message,
+                )
+                connection.commit()
+                return new_message
+
         try:
-            connection = get_database_connection()
-            if connection:
-                with connection:
-                    cursor = connection.cursor()
-                    new_message = (
-                        msg_id,
-                        content,
-                        channel_id,
-                        attachments,
-                        author_id,
-                        edited,
-                        created_at,
-                    )
-                    cursor.execute(
-                        """
-                        INSERT INTO messages (msg_id, content, channel_id, attachments, author, edited, created_at) 
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                        """,
-                        new_message,
-                    )
-                    connection.commit()
-                    return new_message
+            return await database.run(query)
         except sqlite3.IntegrityError as e:
             from bot import logger
 
@@ -430,7 +593,7 @@ class Messages:
         return None
 
     @staticmethod
-    def create_message_edit_entry(
+    async def create_message_edit_entry(
         msg_id: int,
         content: str,
         channel_id: int,
@@ -452,40 +615,41 @@ class Messages:
         """
         attachments = int(attachments)
 
+        def query(connection):
+            with connection:
+                cursor = connection.cursor()
+                cursor.execute(
+                    "SELECT MAX(edited) FROM messages WHERE msg_id = ?", (msg_id,)
+                )
+                max_edited = cursor.fetchone()[0]
+                # If no edits exist, set edited to 0, otherwise increment
+                edited = 0 if max_edited is None else max_edited + 1
+
+                created_at = datetime.now(
+                    timezone.utc
+                ).isoformat()  # Use current time for created_at
+
+                new_message = (
+                    msg_id,
+                    content,
+                    channel_id,
+                    attachments,
+                    author_id,
+                    edited,
+                    created_at,
+                )
+                cursor.execute(
+                    """
+                    INSERT INTO messages (msg_id, content, channel_id, attachments, author, edited, created_at) 
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    new_message,
+                )
+                connection.commit()
+                return new_message
+
         try:
-            connection = get_database_connection()
-            if connection:
-                with connection:
-                    cursor = connection.cursor()
-                    cursor.execute(
-                        "SELECT MAX(edited) FROM messages WHERE msg_id = ?", (msg_id,)
-                    )
-                    max_edited = cursor.fetchone()[0]
-                    # If no edits exist, set edited to 0, otherwise increment
-                    edited = 0 if max_edited is None else max_edited + 1
-
-                    created_at = datetime.now(
-                        timezone.utc
-                    ).isoformat()  # Use current time for created_at
-
-                    new_message = (
-                        msg_id,
-                        content,
-                        channel_id,
-                        attachments,
-                        author_id,
-                        edited,
-                        created_at,
-                    )
-                    cursor.execute(
-                        """
-                        INSERT INTO messages (msg_id, content, channel_id, attachments, author, edited, created_at) 
-                        VALUES (?, ?, ?, ?, ?, ?, ?)
-                        """,
-                        new_message,
-                    )
-                    connection.commit()
-                    return new_message
+            return await database.run(query)
         except sqlite3.IntegrityError as e:
             from bot import logger
 
@@ -511,7 +675,7 @@ class Messages:
         return None
 
     @staticmethod
-    def get_message_entry(msg_id: int):
+    async def get_message_entry(msg_id: int):
         """
         A function for getting a message entry or entries from the database
 
@@ -521,22 +685,24 @@ class Messages:
             message_data (dict or list of dicts): The database entry or entries of the message
             None: If the message wasn't found or there was an error
         """
+
+        def query(connection):
+            with connection:
+                cursor = connection.cursor()
+                cursor.execute(
+                    "SELECT * FROM messages WHERE msg_id = ? ORDER BY edited ASC",
+                    (msg_id,),
+                )
+                rows = cursor.fetchall()
+                if rows:
+                    # Define the column names based on the messages table structure
+                    columns = [desc[0] for desc in cursor.description]
+                    messages = [dict(zip(columns, row)) for row in rows]
+                    # Return a list of dictionaries if there are multiple entries, else return a single dictionary
+                    return messages if len(messages) > 1 else messages[0]
+
         try:
-            connection = get_database_connection()
-            if connection:
-                with connection:
-                    cursor = connection.cursor()
-                    cursor.execute(
-                        "SELECT * FROM messages WHERE msg_id = ? ORDER BY edited ASC",
-                        (msg_id,),
-                    )
-                    rows = cursor.fetchall()
-                    if rows:
-                        # Define the column names based on the messages table structure
-                        columns = [desc[0] for desc in cursor.description]
-                        messages = [dict(zip(columns, row)) for row in rows]
-                        # Return a list of dictionaries if there are multiple entries, else return a single dictionary
-                        return messages if len(messages) > 1 else messages[0]
+            return await database.run(query)
         except sqlite3.OperationalError as error:
             from bot import logger
 
@@ -554,7 +720,7 @@ class Messages:
         return None
 
     @staticmethod
-    def get_messages_by_author(author_id: int):
+    async def get_messages_by_author(author_id: int):
         """
         A function for getting all message entries from the database that share the same author
 
@@ -564,21 +730,23 @@ class Messages:
             messages (list of dicts): A list of message entries by the author
             None: If no messages were found or there was an error
         """
+
+        def query(connection):
+            with connection:
+                cursor = connection.cursor()
+                cursor.execute(
+                    "SELECT * FROM messages WHERE author = ? ORDER BY msg_id, edited",
+                    (author_id,),
+                )
+                rows = cursor.fetchall()
+                if rows:
+                    # Define the column names based on the messages table structure
+                    columns = [desc[0] for desc in cursor.description]
+                    messages = [dict(zip(columns, row)) for row in rows]
+                    return messages
+
         try:
-            connection = get_database_connection()
-            if connection:
-                with connection:
-                    cursor = connection.cursor()
-                    cursor.execute(
-                        "SELECT * FROM messages WHERE author = ? ORDER BY msg_id, edited",
-                        (author_id,),
-                    )
-                    rows = cursor.fetchall()
-                    if rows:
-                        # Define the column names based on the messages table structure
-                        columns = [desc[0] for desc in cursor.description]
-                        messages = [dict(zip(columns, row)) for row in rows]
-                        return messages
+            return await database.run(query)
         except sqlite3.OperationalError as error:
             from bot import logger
 
@@ -596,7 +764,7 @@ class Messages:
         return None
 
     @staticmethod
-    def delete_message_entry(msg_id: int) -> bool:
+    async def delete_message_entry(msg_id: int) -> bool:
         """
         A function to delete a message entry from the database
 
@@ -606,14 +774,16 @@ class Messages:
         Returns:
             bool: True if the message was successfully deleted, False otherwise
         """
+
+        def query(connection):
+            with connection:
+                cursor = connection.cursor()
+                cursor.execute("DELETE FROM messages WHERE msg_id = ?", (msg_id,))
+                connection.commit()
+                return cursor.rowcount > 0
+
         try:
-            connection = get_database_connection()
-            if connection:
-                with connection:
-                    cursor = connection.cursor()
-                    cursor.execute("DELETE FROM messages WHERE msg_id = ?", (msg_id,))
-                    connection.commit()
-                    return cursor.rowcount > 0
+            return await database.run(query)
         except sqlite3.OperationalError as e:
             from bot import logger
 
@@ -631,7 +801,7 @@ class Messages:
         return False
 
     @staticmethod
-    def delete_messages_by_author(author_id: int) -> bool:
+    async def delete_messages_by_author(author_id: int) -> bool:
         """
         A function to delete all message entries from the database that share the same author
 
@@ -641,16 +811,16 @@ class Messages:
         Returns:
             bool: True if the messages were successfully deleted, False otherwise
         """
+
+        def query(connection):
+            with connection:
+                cursor = connection.cursor()
+                cursor.execute("DELETE FROM messages WHERE author = ?", (author_id,))
+                connection.commit()
+                return cursor.rowcount > 0
+
         try:
-            connection = get_database_connection()
-            if connection:
-                with connection:
-                    cursor = connection.cursor()
-                    cursor.execute(
-                        "DELETE FROM messages WHERE author = ?", (author_id,)
-                    )
-                    connection.commit()
-                    return cursor.rowcount > 0
+            return await database.run(query)
         except sqlite3.OperationalError as e:
             from bot import logger
 
@@ -671,7 +841,7 @@ class Messages:
 class Commands:
 
     @staticmethod
-    def create_command_entry(
+    async def create_command_entry(
         user_id: int,
         command_name: str,
         options: str,
@@ -692,21 +862,22 @@ class Commands:
         # Set current timestamp if not provided
         used_at = used_at or datetime.now(timezone.utc).isoformat()
 
+        def query(connection):
+            with connection:
+                cursor = connection.cursor()
+                entry = (user_id, command_name, used_at, options)
+                cursor.execute(
+                    """
+                    INSERT INTO commands (user_id, cmd_name, used_at, options) 
+                    VALUES (?, ?, ?, ?)
+                    """,
+                    entry,
+                )
+                connection.commit()
+                return True
+
         try:
-            connection = get_database_connection()
-            if connection:
-                with connection:
-                    cursor = connection.cursor()
-                    entry = (user_id, command_name, used_at, options)
-                    cursor.execute(
-                        """
-                        INSERT INTO commands (user_id, cmd_name, used_at, options) 
-                        VALUES (?, ?, ?, ?)
-                        """,
-                        entry,
-                    )
-                    connection.commit()
-                    return True
+            return await database.run(query)
         except sqlite3.IntegrityError as e:
             from bot import logger
 
@@ -732,7 +903,7 @@ class Commands:
         return False
 
     @staticmethod
-    def get_commands_by_user(user_id: int):
+    async def get_commands_by_user(user_id: int):
         """
         A function for getting all command entries from the database that share the same user
 
@@ -742,21 +913,23 @@ class Commands:
             commands (list of dicts): A list of command entries by the user
             None: If no messages were found or there was an error
         """
+
+        def query(connection):
+            with connection:
+                cursor = connection.cursor()
+                cursor.execute(
+                    "SELECT * FROM commands WHERE user_id = ?",
+                    (user_id,),
+                )
+                rows = cursor.fetchall()
+                if rows:
+                    # Define the column names based on the messages table structure
+                    columns = [desc[0] for desc in cursor.description]
+                    messages = [dict(zip(columns, row)) for row in rows]
+                    return messages
+
         try:
-            connection = get_database_connection()
-            if connection:
-                with connection:
-                    cursor = connection.cursor()
-                    cursor.execute(
-                        "SELECT * FROM commands WHERE user_id = ?",
-                        (user_id,),
-                    )
-                    rows = cursor.fetchall()
-                    if rows:
-                        # Define the column names based on the messages table structure
-                        columns = [desc[0] for desc in cursor.description]
-                        messages = [dict(zip(columns, row)) for row in rows]
-                        return messages
+            return await database.run(query)
         except sqlite3.OperationalError as error:
             from bot import logger
 
@@ -774,7 +947,7 @@ class Commands:
         return None
 
     @staticmethod
-    def delete_commands_by_user(user_id: int) -> bool:
+    async def delete_commands_by_user(user_id: int) -> bool:
         """
         A function to delete all command entries from the database that share the same user
 
@@ -784,14 +957,16 @@ class Commands:
         Returns:
             bool: True if the commands were successfully deleted, False otherwise
         """
+
+        def query(connection):
+            with connection:
+                cursor = connection.cursor()
+                cursor.execute("DELETE FROM commands WHERE user_id = ?", (user_id,))
+                connection.commit()
+                return cursor.rowcount > 0
+
         try:
-            connection = get_database_connection()
-            if connection:
-                with connection:
-                    cursor = connection.cursor()
-                    cursor.execute("DELETE FROM commands WHERE user_id = ?", (user_id,))
-                    connection.commit()
-                    return cursor.rowcount > 0
+            return await database.run(query)
         except sqlite3.OperationalError as e:
             from bot import logger
 
@@ -818,7 +993,7 @@ class Reminders:
     """
 
     @staticmethod
-    def create_entry(
+    async def create_entry(
         id: str,
         user_id: int,
         reminder_time: str,
@@ -832,31 +1007,32 @@ class Reminders:
 
         dm = int(dm)
 
-        try:
-            connection = get_database_connection()
-            if connection:
-                with connection:
-                    cursor = connection.cursor()
-                    entry = (
-                        id,
-                        user_id,
-                        reminder_time,
-                        message,
-                        channel_id,
-                        user_timezone,
-                        status,
-                        dm,
-                    )
+        def query(connection):
+            with connection:
+                cursor = connection.cursor()
+                entry = (
+                    id,
+                    user_id,
+                    reminder_time,
+                    message,
+                    channel_id,
+                    user_timezone,
+                    status,
+                    dm,
+                )
+
+                cursor.execute(
+                    """
+                    INSERT INTO reminders (id, user_id, reminder_time, message, channel_id, timezone, status, dm) 
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    entry,
+                )
+                connection.commit()
+                return True
 
-                    cursor.execute(
-                        """
-                        INSERT INTO reminders (id, user_id, reminder_time, message, channel_id, timezone, status, dm) 
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                        """,
-                        entry,
-                    )
-                    connection.commit()
-                    return True
+        try:
+            return await database.run(query)
         except sqlite3.IntegrityError as e:
             from bot import logger
 
@@ -882,7 +1058,7 @@ class Reminders:
         return False
 
     @staticmethod
-    def read_reminders(
+    async def read_reminders(
         user_id: int = None,
         channel_id: int = None,
         active: bool = None,
@@ -918,23 +1094,24 @@ class Reminders:
                 query += " AND reminder_time >= ?"
             params.append(now)
 
+        def run_query(connection):
+            with connection:
+                cursor = connection.cursor()
+                cursor.execute(query, params)
+                rows = cursor.fetchall()
+                if rows:
+                    columns = [
+                        column[0] for column in cursor.description
+                    ]  # Get column names
+
+                    # Convert rows to list of dictionaries
+                    reminders = [dict(zip(columns, row)) for row in rows]
+                    return reminders
+                else:
+                    return []
+
         try:
-            connection = get_database_connection()
-            if connection:
-                with connection:
-                    cursor = connection.cursor()
-                    cursor.execute(query, params)
-                    rows = cursor.fetchall()
-                    if rows:
-                        columns = [
-                            column[0] for column in cursor.description
-                        ]  # Get column names
-
-                        # Convert rows to list of dictionaries
-                        reminders = [dict(zip(columns, row)) for row in rows]
-                        return reminders
-                    else:
-                        return []
+            return await database.run(run_query)
         except sqlite3.OperationalError as e:
             from bot import logger
 
@@ -955,7 +1132,47 @@ class Reminders:
         return None
 
     @staticmethod
-    def update_reminder(
+    async def read_upcoming(until: str):
+        """
+        Reads the active reminders that are due before a given time, earliest first.
+        Uses the idx_reminders_status_time index, so only the matching rows are read.
+
+        Args:
+            until (str): The UTC time as an ISO 8601 string
+        Returns:
+            list: The reminders as dictionaries
+            None: An error occurred
+        """
+
+        def query(connection):
+            with connection:
+                cursor = connection.execute(
+                    """
+                    SELECT * FROM reminders
+                    WHERE status = 0 AND reminder_time < ?
+                    ORDER BY reminder_time
+                    """,
+                    (until,),
+                )
+                columns = [column[0] for column in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+        try:
+            return await database.run(query)
+        except sqlite3.Error as e:
+            from bot import logger
+
+            logger.error(f"SQLite error while reading upcoming reminders: {e}")
+        except Exception as e:
+            from bot import logger
+
+            logger.error(
+                f"An unexpected error occurred while reading upcoming reminders: {e}"
+            )
+        return None
+
+    @staticmethod
+    async def update_reminder(
         reminder_id: str,
         new_time: str = None,
         new_message: str = None,
@@ -964,26 +1181,27 @@ class Reminders:
         pass
 
     @staticmethod
-    def complete_reminder(reminder_id: str) -> bool:
+    async def complete_reminder(reminder_id: str) -> bool:
+        def query(connection):
+            with connection:
+                cursor = connection.cursor()
+                cursor.execute(
+                    """
+                    UPDATE reminders
+                    SET status = 1
+                    WHERE id = ?
+                    """,
+                    (reminder_id,),
+                )
+                connection.commit()
+                # Check if the update was successful
+                if cursor.rowcount == 0:
+                    # No rows updated, which means the reminder_id was not found
+                    return False
+                return True
+
         try:
-            connection = get_database_connection()
-            if connection:
-                with connection:
-                    cursor = connection.cursor()
-                    cursor.execute(
-                        """
-                        UPDATE reminders
-                        SET status = 1
-                        WHERE id = ?
-                        """,
-                        (reminder_id,),
-                    )
-                    connection.commit()
-                    # Check if the update was successful
-                    if cursor.rowcount == 0:
-                        # No rows updated, which means the reminder_id was not found
-                        return False
-                    return True
+            return await database.run(query)
         except sqlite3.IntegrityError as e:
             from bot import logger
 
@@ -1009,26 +1227,27 @@ class Reminders:
         return False
 
     @staticmethod
-    def cancel_reminder(reminder_id: str) -> bool:
+    async def cancel_reminder(reminder_id: str) -> bool:
+        def query(connection):
+            with connection:
+                cursor = connection.cursor()
+                cursor.execute(
+                    """
+                    UPDATE reminders
+                    SET status = 2
+                    WHERE id = ?
+                    """,
+                    (reminder_id,),
+                )
+                connection.commit()
+                # Check if the update was successful
+                if cursor.rowcount == 0:
+                    # No rows updated, which means the reminder_id was not found
+                    return False
+                return True
+
         try:
-            connection = get_database_connection()
-            if connection:
-                with connection:
-                    cursor = connection.cursor()
-                    cursor.execute(
-                        """
-                        UPDATE reminders
-                        SET status = 2
-                        WHERE id = ?
-                        """,
-                        (reminder_id,),
-                    )
-                    connection.commit()
-                    # Check if the update was successful
-                    if cursor.rowcount == 0:
-                        # No rows updated, which means the reminder_id was not found
-                        return False
-                    return True
+            return await database.run(query)
         except sqlite3.IntegrityError as e:
             from bot import logger
 
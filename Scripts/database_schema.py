@@ -0,0 +1,255 @@
+# Copyright (C) 2024  Darkyl
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see https://www.gnu.org/licenses/.
+
+import sqlite3
+
+"""
+The schema of the user database.
+
+The version of the schema is stored in PRAGMA user_version. Every migration
+in MIGRATIONS brings the database from its index to the next version and runs
+in one transaction, so a database is never left half migrated.
+
+To change the schema, append a migration and never edit an existing one.
+"""
+
+# Connection settings, applied every time the database is opened
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",  # 256 MB
+)
+
+TABLES = {
+    "users": """
+        CREATE TABLE {name} (
+            id INTEGER PRIMARY KEY,
+            msg_count INTEGER NOT NULL DEFAULT 0,
+            xp INTEGER NOT NULL DEFAULT 0,
+            level INTEGER NOT NULL DEFAULT 0,
+            cmds_used INTEGER NOT NULL DEFAULT 0,
+            reported INTEGER NOT NULL DEFAULT 0,
+            been_reported INTEGER NOT NULL DEFAULT 0,
+            nsfw_opt_out INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+    # Every edit of a message is stored as a new version
+    "messages": """
+        CREATE TABLE {name} (
+            msg_id INTEGER NOT NULL,
+            content TEXT,
+            channel_id INTEGER,
+            attachments INTEGER NOT NULL DEFAULT 0,
+            author INTEGER,
+            edited INTEGER NOT NULL DEFAULT 0,
+            created_at TEXT,
+            PRIMARY KEY (msg_id, edited)
+        )
+        """,
+    "commands": """
+        CREATE TABLE {name} (
+            user_id INTEGER NOT NULL,
+            cmd_name TEXT,
+            used_at TEXT,
+            options TEXT
+        )
+        """,
+    "reminders": """
+        CREATE TABLE {name} (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            reminder_time TEXT NOT NULL,
+            message TEXT,
+            channel_id INTEGER,
+            timezone TEXT,
+            status INTEGER NOT NULL DEFAULT 0,
+            dm INTEGER NOT NULL DEFAULT 0
+        )
+        """,
+    "captchas": """
+        CREATE TABLE {name} (
+            id TEXT PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            captcha_type INTEGER NOT NULL,
+            value TEXT NOT NULL,
+            message_id INTEGER NOT NULL,
+            created_at REAL NOT NULL
+        )
+        """,
+}
+
+# The primary key columns each table is expected to have
+PRIMARY_KEYS = {
+    "users": ("id",),
+    "messages": ("msg_id", "edited"),
+    "commands": (),
+    "reminders": ("id",),
+    "captchas": ("id",),
+}
+
+INDEXES = (
+    # Message history of an author (Dev/messages, deleting a user's data)
+    "CREATE INDEX IF NOT EXISTS idx_messages_author ON messages (author, msg_id, edited)",
+    "CREATE INDEX IF NOT EXISTS idx_commands_user_id ON commands (user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_reminders_user_status ON reminders (user_id, status)",
+    # The reminder scheduler reads the due reminders in order
+    "CREATE INDEX IF NOT EXISTS idx_reminders_status_time ON reminders (status, reminder_time)",
+    "CREATE INDEX IF NOT EXISTS idx_reminders_channel_id ON reminders (channel_id)",
+    "CREATE INDEX IF NOT EXISTS idx_captchas_user_id ON captchas (user_id)",
+)
+
+
+def _primary_key(connection: sqlite3.Connection, table: str):
+    """
+    Returns the primary key columns of a table in order, None if the table doesn't exist
+    """
+    columns = connection.execute(f"PRAGMA table_info({table})").fetchall()
+    if not columns:
+        return None
+    # Rows are (cid, name, type, notnull, default, pk), pk is the position in the key
+    return tuple(
+        column[1] for column in sorted(columns, key=lambda c: c[5]) if column[5]
+    )
+
+
+def _create_table(connection: sqlite3.Connection, table: str) -> None:
+    """
+    Creates a table, or rebuilds it if it was created without the right primary key.
+    Databases from before the schema was tracked were created by hand.
+    """
+    primary_key = _primary_key(connection, table)
+    if primary_key is None:
+        connection.execute(TABLES[table].format(name=table))
+        return
+    if primary_key == PRIMARY_KEYS[table]:
+        return
+
+    # ALTER TABLE can't add a primary key, so the rows are copied into a new table.
+    # Duplicates of a key are dropped, the first row is kept.
+    new_table = f"{table}_new"
+    connection.execute(f"DROP TABLE IF EXISTS {new_table}")
+    connection.execute(TABLES[table].format(name=new_table))
+
+    old_columns = {row[1] for row in connection.execute(f"PRAGMA table_info({table})")}
+    columns = ", ".join(
+        row[1]
+        for row in connection.execute(f"PRAGMA table_info({new_table})")
+        if row[1] in old_columns
+    )
+    connection.execute(
+        f"INSERT OR IGNORE INTO {new_table} ({columns}) SELECT {columns} FROM {table} ORDER BY rowid"
+    )
+    connection.execute(f"DROP TABLE {table}")
+    connection.execute(f"ALTER TABLE {new_table} RENAME TO {table}")
+
+
+def _migration_1(connection: sqlite3.Connection) -> None:
+    """
+    Creates the tables with primary keys and the indexes for the frequent lookups
+    """
+    for table in TABLES:
+        _create_table(connection, table)
+
+    for index in INDEXES:
+        connection.execute(index)
+
+
+def _migration_2(connection: sqlite3.Connection) -> None:
+    """
+    Indexes the edited messages, so message retention can find them without a full scan
+    """
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS idx_messages_edited ON messages (msg_id, edited) WHERE edited > 0"
+    )
+
+
+def _migration_3(connection: sqlite3.Connection) -> None:
+    """
+    Creates the table of pending moderation expiries (tempbans, mutes, timeouts)
+    """
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS expiries (
+            kind TEXT NOT NULL,
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            expires_at REAL NOT NULL,
+            data TEXT NOT NULL DEFAULT '{}',
+            PRIMARY KEY (kind, guild_id, user_id)
+        )
+        """)
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS idx_expiries_expires_at ON expiries (expires_at)"
+    )
+
+
+def _migration_4(connection: sqlite3.Connection) -> None:
+    """
+    Creates the table of the document store (warnings, reports, confessions)
+    """
+    connection.execute("""
+        CREATE TABLE IF NOT EXISTS documents (
+            collection TEXT NOT NULL,
+            key TEXT NOT NULL,
+            data TEXT NOT NULL,
+            PRIMARY KEY (collection, key)
+        ) WITHOUT ROWID
+        """)
+
+
+MIGRATIONS = [_migration_1, _migration_2, _migration_3, _migration_4]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_version(connection: sqlite3.Connection) -> int:
+    return connection.execute("PRAGMA user_version").fetchone()[0]
+
+
+def configure(connection: sqlite3.Connection) -> None:
+    """
+    Applies the connection settings
+    """
+    for pragma in PRAGMAS:
+        connection.execute(pragma)
+
+
+def migrate(connection: sqlite3.Connection) -> int:
+    """
+    Brings the database up to the current schema version
+
+    Args:
+        connection (sqlite3.Connection): The connection to migrate
+    Returns:
+        int: The number of migrations that were applied
+    Raises:
+        RuntimeError: If the database was created by a newer version of the bot
+    """
+    version = get_version(connection)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema version {version} is newer than the supported version {SCHEMA_VERSION}"
+        )
+
+    for index in range(version, SCHEMA_VERSION):
+        with connection:
+            # DDL doesn't open a transaction on its own
+            connection.execute("BEGIN")
+            MIGRATIONS[index](connection)
+            # PRAGMA doesn't accept parameters
+            connection.execute(f"PRAGMA user_version = {index + 1}")
+
+    if version < SCHEMA_VERSION:
+        connection.execute("ANALYZE")
+    return SCHEMA_VERSION - version
@@ -0,0 +1,277 @@
+# Copyright (C) 2024  Darkyl
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see https://www.gnu.org/licenses/.
+
+import asyncio
+import copy
+import json
+import os
+
+import config_reader as config
+import database_interaction
+
+"""
+Keyed JSON records (warnings, reports, confessions) in the documents table.
+
+Every record is one row, so changing a record writes only that row, in its own
+transaction. All records are kept in memory after the first access. Changes are
+applied to the memory copy right away, before they are written, so two handlers
+changing the same record one after another both see each other's changes
+instead of overwriting them.
+
+A collection can have secondary indexes, for example the message a confession
+was posted in, so a record can be found without scanning the whole collection.
+
+The old JSON files are imported once and emptied after the import is
+committed. Files that can't be parsed are left alone.
+"""
+
+
+class Collection:
+    def __init__(
+        self, store, name: str, legacy_path: str = None, indexes: dict = None
+    ) -> None:
+        """
+        Args:
+            store (DocumentStore): The store the collection belongs to
+            name (str): The name of the collection
+            legacy_path (str): The old JSON file of the collection, imported once
+            indexes (dict): {index name: function taking (key, record) and returning the indexed values}
+        """
+        self.store = store
+        self.name = name
+        self.legacy_path = legacy_path
+        self.indexes = indexes or {}
+
+        self._records = {}  # {key: record}
+        self._index = {index: {} for index in self.indexes}  # {index: {value: {key}}}
+
+    def _put(self, key: str, record) -> None:
+        """
+        Replaces a record in memory and updates the indexes, None removes it
+        """
+        old = self._records.pop(key, None)
+        for index, function in self.indexes.items():
+            if old is not None:
+                for value in function(key, old):
+                    keys = self._index[index].get(value)
+                    if keys is not None:
+                        keys.discard(key)
+                        if not keys:
+                            del self._index[index][value]
+            if record is not None:
+                for value in function(key, record):
+                    self._index[index].setdefault(value, set()).add(key)
+
+        if record is not None:
+            self._records[key] = record
+
+    async def get(self, key, default=None):
+        """
+        Returns a copy of a record, default if there is none
+        """
+        await self.store._prepare()
+        record = self._records.get(str(key))
+        return copy.deepcopy(record) if record is not None else default
+
+    async def items(self) -> list:
+        """
+        Returns copies of all records as (key, record)
+        """
+        await self.store._prepare()
+        return copy.deepcopy(list(self._records.items()))
+
+    async def find(self, index: str, value) -> list:
+        """
+        Returns copies of the records with a value in a secondary index
+
+        Returns:
+            list: [(key, record)]
+        """
+        await self.store._prepare()
+        return [
+            (key, copy.deepcopy(self._records[key]))
+            for key in sorted(self._index[index].get(value, ()))
+        ]
+
+    async def update(self, key, function):
+        """
+        Changes a record and commits it
+
+        Args:
+            key: The key of the record
+            function: Takes a copy of the record (None if there is none) and returns the new record, None deletes it
+        Returns:
+            A copy of the new record
+        """
+        await self.store._prepare()
+
+        key = str(key)
+        old = self._records.get(key)
+        record = function(copy.deepcopy(old))
+        self._put(key, record)
+
+        try:
+            await self.store._write(self.name, key, record)
+        except BaseException:
+            # Undo the change, unless the record was changed again in the meantime
+            if self._records.get(key) is record:
+                self._put(key, old)
+            raise
+
+        return copy.deepcopy(record)
+
+    async def set(self, key, record):
+        return await self.update(key, lambda _: record)
+
+    async def delete(self, key) -> bool:
+        """
+        Returns:
+            bool: True if the record existed
+        """
+        existed = await self.get(key) is not None
+        if existed:
+            await self.update(key, lambda _: None)
+        return existed
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+class DocumentStore:
+    def __init__(self) -> None:
+        self._collections = {}  # {name: Collection}
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+
+    def collection(
+        self, name: str, legacy_path: str = None, indexes: dict = None
+    ) -> Collection:
+        collection = Collection(self, name, legacy_path, indexes)
+        self._collections[name] = collection
+        return collection
+
+    async def _prepare(self) -> None:
+        if not self._loaded:
+            await self._load()
+
+    async def _load(self) -> None:
+        """
+        Imports the old JSON files and loads all records
+        """
+        legacy_paths = {
+            name: collection.legacy_path
+            for name, collection in self._collections.items()
+            if collection.legacy_path is not None
+        }
+
+        def query(connection):
+            imported = []
+            with connection:
+                for name, path in legacy_paths.items():
+                    if not os.path.exists(path) or os.path.getsize(path) == 0:
+                        continue
+                    with open(path, "r") as file:
+                        try:
+                            records = json.load(file)
+                        except json.JSONDecodeError:
+                            records = None
+                    if not isinstance(records, dict):
+                        # Left as it is, so nothing is lost, and imported once it is fixed
+                        from bot import logger
+
+                        logger.error(f"Couldn't import {path}, it isn't a JSON object")
+                        continue
+                    connection.executemany(
+                        "INSERT OR IGNORE INTO documents (collection, key, data) VALUES (?, ?, ?)",
+                        [
+                            (name, str(key), json.dumps(record))
+                            for key, record in records.items()
+                        ],
+                    )
+                    imported.append(path)
+
+            # Only emptied once the import is committed
+            for path in imported:
+                with open(path, "w") as file:
+                    json.dump({}, file)
+
+            return connection.execute(
+                "SELECT collection, key, data FROM documents"
+            ).fetchall()
+
+        async with self._load_lock:
+            if self._loaded:
+                return
+
+            for name, key, data in await database_interaction.database.run(query):
+                collection = self._collections.get(name)
+                if collection is not None:
+                    collection._put(key, json.loads(data))
+            self._loaded = True
+
+    async def _write(self, collection: str, key: str, record) -> None:
+        data = json.dumps(record) if record is not None else None
+
+        def query(connection):
+            with connection:
+                if data is None:
+                    connection.execute(
+                        "DELETE FROM documents WHERE collection = ? AND key = ?",
+                        (collection, key),
+                    )
+                else:
+                    connection.execute(
+                        """
+                        INSERT INTO documents (collection, key, data) VALUES (?, ?, ?)
+                        ON CONFLICT (collection, key) DO UPDATE SET data = excluded.data
+                        """,
+                        (collection, key, data),
+                    )
+
+        await database_interaction.database.run(query)
+
+    def stats(self) -> dict:
+        """
+        Returns the number of records per collection
+        """
+        return {name: len(collection) for name, collection in self._collections.items()}
+
+
+def _legacy_path(file: str) -> str:
+    return os.path.join(config.Paths.data_folder, "Database", file)
+
+
+store = DocumentStore()
+
+# {user_id: [reason, ...]}
+warnings = store.collection("warnings", _legacy_path("warnings.json"))
+
+# {user_id: {"reasons": {reason: {"reporter": user_id or "AutoMod", "report_message": message_id}}}}
+reports = store.collection(
+    "reports",
+    _legacy_path("reports.json"),
+    indexes={
+        "report_message": lambda key, report: [
+            details["report_message"] for details in report["reasons"].values()
+        ]
+    },
+)
+
+# {confession_id: [text, message_id, image_path]}
+confessions = store.collection(
+    "confessions",
+    _legacy_path("confessions.json"),
+    indexes={"message_id": lambda key, confession: [confession[1]]},
+)
@@ -0,0 +1,118 @@
+# Copyright (C) 2024  Darkyl
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see https://www.gnu.org/licenses/.
+
+import os
+import time
+
+"""
+The domain allow list used by the AutoMod.
+
+The allowed domains are kept in memory as a trie of their labels in reverse
+order (com -> darkylmusic). A host is allowed if it is an allowed domain or a
+subdomain of one, so "abc.net.au" allows "news.abc.net.au" without allowing
+every other "net.au" site.
+"""
+
+# Marks the end of an allowed domain inside the trie (labels never contain a dot)
+_ALLOWED = "."
+
+
+def normalize_domain(domain: str) -> str:
+    """
+    Lowercases a domain and strips surrounding whitespace and the trailing dot
+    """
+    return domain.strip().lower().rstrip(".")
+
+
+class DomainAllowList:
+    def __init__(self, path: str, check_interval: float = 30) -> None:
+        """
+        Args:
+            path (str): The file containing the allowed domains (one domain per line)
+            check_interval (float): How many seconds pass at most before the file is checked for changes
+        """
+        self.path = path
+        self.check_interval = check_interval
+
+        self._mtime = None
+        self._last_check = 0.0
+        self._root = {}
+
+    def _insert(self, domain: str) -> None:
+        domain = normalize_domain(domain)
+        if not domain:
+            return
+
+        node = self._root
+        for label in reversed(domain.split(".")):
+            node = node.setdefault(label, {})
+        node[_ALLOWED] = {}
+
+    def reload(self, force: bool = False) -> None:
+        """
+        Reloads the allow list if the file was modified
+        """
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+
+        if not force and mtime == self._mtime:
+            return
+
+        self._root = {}
+        if mtime is not None:
+            with open(self.path, "r", encoding="utf-8") as file:
+                for line in file:
+                    self._insert(line)
+        self._mtime = mtime
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if not self._last_check or now - self._last_check >= self.check_interval:
+            self.reload()
+            self._last_check = now
+
+    def is_allowed(self, host: str) -> bool:
+        """
+        Checks if a host is an allowed domain or a subdomain of one
+
+        Args:
+            host (str): The host name, for example "www.youtube.com"
+        Returns:
+            bool: True if the host is allowed
+        """
+        self._maybe_reload()
+
+        node = self._root
+        for label in reversed(normalize_domain(host).split(".")):
+            node = node.get(label)
+            if node is None:
+                return False
+            if _ALLOWED in node:
+                return True
+        return False
+
+    def add(self, domain: str) -> None:
+        """
+        Adds a domain to the allow list file and to the loaded allow list
+        """
+        self._maybe_reload()
+
+        with open(self.path, "a", encoding="utf-8") as file:
+            file.write(f"\n{normalize_domain(domain)}")
+
+        self._insert(domain)
+        self._mtime = os.stat(self.path).st_mtime_ns
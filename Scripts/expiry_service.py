@@ -0,0 +1,254 @@
+# Copyright (C) 2024  Darkyl
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see https://www.gnu.org/licenses/.
+
+import asyncio
+import heapq
+import json
+import os
+import time
+
+import config_reader as config
+import database_interaction
+
+"""
+Runs moderation actions when they expire (tempbans, timed mutes, timeouts).
+
+Every pending expiry is a row in the expiries table, keyed by its kind, guild
+and user, so registering or finishing one writes only that row. A single task
+keeps all of them in a min-heap and sleeps until the next one is due.
+
+Plugins register a handler for their kind with register() and schedule
+expiries with schedule().
+"""
+
+# Old JSON database of the tempbans, its entries are imported once
+BANS_PATH = os.path.join(config.Paths.data_folder, "Database", "bans.json")
+
+# Seconds until a failed handler is retried
+RETRY_DELAY = 5 * 60
+
+
+class ExpiryService:
+    def __init__(self, retry_delay: float = RETRY_DELAY) -> None:
+        """
+        Args:
+            retry_delay (float): Seconds until a failed handler is retried
+        """
+        self.retry_delay = retry_delay
+
+        self._handlers = {}  # {kind: handler}
+        self._heap = []  # [(expires_at, (kind, guild_id, user_id))]
+        self._expiries = {}  # {(kind, guild_id, user_id): (expires_at, data)}
+        self._running = set()
+        self._canceled = set()  # Canceled while their handler was running
+        self._loaded = False
+        self._wakeup = asyncio.Event()
+        # Keeps expiries from being scheduled or canceled while they are loaded
+        self._lock = asyncio.Lock()
+
+    def register(self, kind: str, handler) -> None:
+        """
+        Registers the function that runs when an expiry of a kind is due
+
+        Args:
+            kind (str): The kind of expiry, for example "tempban"
+            handler: An async function taking (guild_id, user_id, data)
+        """
+        self._handlers[kind] = handler
+
+    def _push(self, key: tuple, expires_at: float, data: dict) -> None:
+        self._expiries[key] = (expires_at, data)
+        heapq.heappush(self._heap, (expires_at, key))
+
+    async def _load(self) -> None:
+        """
+        Loads the pending expiries and imports the old JSON database of the tempbans
+        """
+
+        def query(connection):
+            with connection:
+                if os.path.exists(BANS_PATH) and os.path.getsize(BANS_PATH) > 0:
+                    with open(BANS_PATH, "r") as file:
+                        try:
+                            old_bans = json.load(file)
+                        except json.JSONDecodeError:
+                            old_bans = {}
+                    connection.executemany(
+                        """
+                        INSERT OR IGNORE INTO expiries (kind, guild_id, user_id, expires_at, data)
+                        VALUES ('tempban', ?, ?, ?, '{}')
+                        """,
+                        [
+                            (int(guild_id), int(user_id), ban_info["unban_time"])
+                            for guild_id, bans in old_bans.items()
+                            for user_id, ban_info in bans.items()
+                        ],
+                    )
+                    with open(BANS_PATH, "w") as file:
+                        json.dump({}, file)
+
+                return connection.execute(
+                    "SELECT kind, guild_id, user_id, expires_at, data FROM expiries"
+                ).fetchall()
+
+        async with self._lock:
+            if self._loaded:
+                return
+
+            for (
+                kind,
+                guild_id,
+                user_id,
+                expires_at,
+                data,
+            ) in await database_interaction.database.run(query):
+                self._push((kind, guild_id, user_id), expires_at, json.loads(data))
+            self._loaded = True
+
+    async def schedule(
+        self, kind: str, guild_id: int, user_id: int, expires_at: float, data=None
+    ) -> None:
+        """
+        Schedules an expiry, replacing the pending one of the same kind for the user
+
+        Args:
+            kind (str): The kind of expiry
+            guild_id (int): The guild
+            user_id (int): The user
+            expires_at (float): When it expires, as a Unix timestamp
+            data (dict): Anything the handler needs, must be JSON-serializable
+        """
+        key = (kind, int(guild_id), int(user_id))
+        data = data or {}
+
+        def query(connection):
+            with connection:
+                connection.execute(
+                    """
+                    INSERT INTO expiries (kind, guild_id, user_id, expires_at, data)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (kind, guild_id, user_id) DO UPDATE SET
+                        expires_at = excluded.expires_at,
+                        data = excluded.data
+                    """,
+                    (*key, expires_at, json.dumps(data)),
+                )
+
+        async with self._lock:
+            await database_interaction.database.run(query)
+            self._push(key, expires_at, data)
+            self._wakeup.set()
+
+    async def _delete(self, key: tuple) -> None:
+        def query(connection):
+            with connection:
+                connection.execute(
+                    "DELETE FROM expiries WHERE kind = ? AND guild_id = ? AND user_id = ?",
+                    key,
+                )
+
+        await database_interaction.database.run(query)
+
+    async def cancel(self, kind: str, guild_id: int, user_id: int) -> bool:
+        """
+        Cancels a pending expiry, its heap entry is skipped when it comes up
+
+        Returns:
+            bool: True if there was a pending expiry
+        """
+        key = (kind, int(guild_id), int(user_id))
+        async with self._lock:
+            await self._delete(key)
+            if key in self._running:
+                self._canceled.add(key)
+            return self._expiries.pop(key, None) is not None
+
+    def get(self, kind: str, guild_id: int, user_id: int):
+        """
+        Returns when a pending expiry is due as a Unix timestamp, None if there is none
+        """
+        entry = self._expiries.get((kind, int(guild_id), int(user_id)))
+        return entry[0] if entry else None
+
+    async def _expire(self, key: tuple, expires_at: float, data: dict) -> None:
+        try:
+            handler = self._handlers.get(key[0])
+            if handler is None:
+                raise KeyError(f"No handler registered for '{key[0]}'")
+
+            await handler(key[1], key[2], data)
+        except Exception as e:
+            from bot import logger
+
+            logger.error(f"Error while running the {key[0]} expiry of {key[2]}: {e}")
+
+            async with self._lock:
+                # Try again later, unless it was rescheduled or canceled in the meantime
+                if key not in self._expiries and key not in self._canceled:
+                    self._push(key, time.time() + self.retry_delay, data)
+                    self._wakeup.set()
+        else:
+            async with self._lock:
+                if key not in self._expiries:
+                    await self._delete(key)
+        finally:
+            self._running.discard(key)
+            self._canceled.discard(key)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                if not self._loaded:
+                    await self._load()
+
+                now = time.time()
+                while self._heap and self._heap[0][0] <= now:
+                    expires_at, key = heapq.heappop(self._heap)
+                    entry = self._expiries.get(key)
+                    if entry is None or entry[0] != expires_at:
+                        # Canceled or rescheduled
+                        continue
+                    if key in self._running:
+                        # Rescheduled while the previous one is still running
+                        self._push(key, now + 1, entry[1])
+                        continue
+
+                    del self._expiries[key]
+                    self._running.add(key)
+                    asyncio.create_task(self._expire(key, *entry))
+
+                self._wakeup.clear()
+                timeout = self._heap[0][0] - now if self._heap else None
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except Exception as e:
+                from bot import logger
+
+                logger.error(f"Error in the expiry service: {e}")
+                await asyncio.sleep(15)
+
+    def stats(self) -> dict:
+        """
+        Returns the number of pending expiries per kind
+        """
+        pending = {}
+        for kind, _, _ in self._expiries:
+            pending[kind] = pending.get(kind, 0) + 1
+        return pending
+
+
+service = ExpiryService()
@@ -16,6 +16,7 @@
 import database_interaction as db
 import hikari
 import lightbulb
+import user_stats
 
 plugin = lightbulb.Plugin("Leave", "Removes a user from the databse if they leave")
 
@@ -23,9 +24,10 @@ plugin = lightbulb.Plugin("Leave", "Removes a user from the databse if they leav
 @plugin.listener(hikari.events.MemberDeleteEvent)
 async def leave(event: hikari.MemberDeleteEvent) -> None:
 
-    db.Users.delete_user_entry(user_id=event.user_id)
-    db.Messages.delete_messages_by_author(author_id=event.user_id)
-    db.Commands.delete_commands_by_user(user_id=event.user_id)
+    user_stats.buffer.discard(event.user_id)
+    await db.Users.delete_user_entry(user_id=event.user_id)
+    await db.Messages.delete_messages_by_author(author_id=event.user_id)
+    await db.Commands.delete_commands_by_user(user_id=event.user_id)
 
 
 def load(bot):
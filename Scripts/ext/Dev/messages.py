@@ -17,10 +17,12 @@ import random
 import re
 from datetime import datetime
 
+import channel_cache
 import config_reader as config
 import database_interaction as db
 import hikari
 import lightbulb
+import message_pipeline
 
 plugin = lightbulb.Plugin("Messages", "Manages message database entries")
 
@@ -70,17 +72,16 @@ sql_injection_responses = [
 ]
 
 
-@plugin.listener(hikari.events.MessageCreateEvent)
-async def message_create(event: hikari.MessageCreateEvent) -> None:
-    message = event.message
+async def log_message(context: message_pipeline.MessageContext) -> None:
+    """
+    Writes a new message to the message log, runs in the persist phase of the message pipeline
+    """
+    message = context.message
 
     # if message.guild_id != config.Bot.server:
     #    return
 
-    if message.author.is_bot or message.author.is_system:
-        return
-
-    content = await sanitize_content(message.content) if message.content else ""
+    content = context.content
 
     if message.attachments:
         attachments = True
@@ -89,7 +90,7 @@ async def message_create(event: hikari.MessageCreateEvent) -> None:
 
     created_at = datetime.utcnow().isoformat()
 
-    result = db.Messages.create_message_entry(
+    result = await db.Messages.create_message_entry(
         message.id,
         content,
         message.channel_id,
@@ -103,16 +104,21 @@ async def message_create(event: hikari.MessageCreateEvent) -> None:
 
         logger.error("There was an error while creating a new message entry.")
 
-    if message.content and detect_sql_injection(content):
+
+async def answer_sql_injection(context: message_pipeline.MessageContext) -> None:
+    """
+    Answers messages that look like SQL injections, runs in the react phase of the message pipeline
+    """
+    message = context.message
+
+    if context.content and detect_sql_injection(context.content):
         from bot import logger
 
         logger.warning(
             f"Potential SQL injection attempt detected in message: '{message.content}' by {message.author.username}({message.author.id})"
         )
 
-        await event.message.respond(
-            random.choice(sql_injection_responses), reply=message
-        )
+        await message.respond(random.choice(sql_injection_responses), reply=message)
 
 
 @plugin.listener(hikari.events.MessageUpdateEvent)
@@ -127,7 +133,7 @@ async def message_edit(event: hikari.events.MessageUpdateEvent) -> None:
 
     content = await sanitize_content(message.content) if message.content else ""
 
-    check = db.Messages.get_message_entry(message.id)
+    check = await db.Messages.get_message_entry(message.id)
 
     if check:
         # If multiple entries exist, get the one with the highest 'edited' value
@@ -146,7 +152,7 @@ async def message_edit(event: hikari.events.MessageUpdateEvent) -> None:
     else:
         attachments = False
 
-    result = db.Messages.create_message_edit_entry(
+    result = await db.Messages.create_message_edit_entry(
         message.id, content, message.channel_id, attachments, message.author.id
     )
 
@@ -173,10 +179,10 @@ async def message_delete(event: hikari.events.MessageDeleteEvent) -> None:
 
     # Old message is already handled in Scripts/AutoMod/events.py
     if event.old_message:
-        db.Messages.delete_message_entry(message)
+        await db.Messages.delete_message_entry(message)
         return
 
-    message = db.Messages.get_message_entry(message)
+    message = await db.Messages.get_message_entry(message)
 
     if message is None:
         return
@@ -193,7 +199,7 @@ async def message_delete(event: hikari.events.MessageDeleteEvent) -> None:
     else:
         author_str = author.mention
 
-    channel = await plugin.app.rest.fetch_channel(latest_entry["channel_id"])
+    channel = await channel_cache.resolver.fetch(plugin.app, latest_entry["channel_id"])
 
     embed = hikari.Embed(
         title="A message has been deleted.",
@@ -214,8 +220,12 @@ async def message_delete(event: hikari.events.MessageDeleteEvent) -> None:
 
 
 def load(bot):
+    message_pipeline.pipeline.register("persist", "message_log", log_message)
+    message_pipeline.pipeline.register("react", "sql_injection", answer_sql_injection)
     bot.add_plugin(plugin)
 
 
 def unload(bot):
+    message_pipeline.pipeline.unregister("message_log")
+    message_pipeline.pipeline.unregister("sql_injection")
     bot.remove(plugin)
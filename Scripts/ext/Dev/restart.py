@@ -20,6 +20,7 @@ import sys
 import config_reader as config
 import hikari
 import lightbulb
+import user_stats
 
 plugin = lightbulb.Plugin("Restart", "A restart command for admins")
 plugin.add_checks(lightbulb.has_role_permissions(hikari.Permissions.ADMINISTRATOR))
@@ -34,6 +35,7 @@ async def restart():
 
         logger.info("Bot restarts by command.")
 
+        await user_stats.buffer.flush()
         await plugin.bot.close()  # Stops the bot loop
         executable = sys.executable
 
@@ -15,11 +15,19 @@
 
 import asyncio
 
+import asset_registry
 import buttons
+import config_reader as config
+import database_interaction
+import expiry_service
 import hikari
+import http_client
 import lightbulb
+import message_retention
 import miru
 import timed_events
+import user_stats
+import Verification.Generators.image
 
 plugin = lightbulb.Plugin("startup", "Containing functions called at startup")
 
@@ -35,6 +43,22 @@ async def wait_until_initialized():
         await asyncio.sleep(1)
 
 
+@plugin.listener(hikari.StartingEvent)
+async def on_starting(event: hikari.StartingEvent):
+    """
+    Gets called before the bot connects.
+    """
+    from bot import logger
+
+    # Migrate the database before any event can use it
+    try:
+        await database_interaction.database.open()
+    except Exception as e:
+        logger.error(
+            f"An error occurred during startup while opening the database: {e}"
+        )
+
+
 @plugin.listener(hikari.StartedEvent)
 async def on_startup(event: hikari.StartedEvent):
     """
@@ -79,15 +103,44 @@ async def on_startup(event: hikari.StartedEvent):
     except Exception as e:
         logger.error(f"An error occurred during startup while starting views: {e}")
 
+    # Index the asset folders before the first command needs them
+    try:
+        count = await asyncio.to_thread(
+            asset_registry.registry.scan_tree, config.Paths.assets_folder
+        )
+        logger.info(f"Indexed {count} asset files")
+    except Exception as e:
+        logger.error(f"An error occurred during startup while indexing assets: {e}")
+
     await wait_until_initialized()
 
     # Running background tasks
     try:
         asyncio.create_task(timed_events.run_events(plugin.bot))
+        asyncio.create_task(user_stats.buffer.run())
+        asyncio.create_task(message_retention.retention.run())
+        asyncio.create_task(expiry_service.service.run())
+
+        if config.DatabaseBackups.enabled:
+            asyncio.create_task(database_interaction.backup.run())
+
+        if not config.Verification.disable_captcha:
+            # Render the captchas before a raid needs them
+            Verification.Generators.image.pool.refill()
     except Exception as e:
         logger.error(f"An error occurred during startup while starting timers: {e}")
 
 
+@plugin.listener(hikari.StoppedEvent)
+async def on_stopped(event: hikari.StoppedEvent):
+    """
+    Gets called when the bot has shut down.
+    """
+    await user_stats.buffer.flush()
+    await database_interaction.database.close()
+    await http_client.close()
+
+
 def load(bot):
     bot.add_plugin(plugin)
 
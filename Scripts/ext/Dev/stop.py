@@ -18,6 +18,7 @@ import config_reader as config
 import hikari
 import hikari.errors
 import lightbulb
+import user_stats
 
 plugin = lightbulb.Plugin("Stop", "A stop command for admins")
 plugin.add_checks(lightbulb.has_role_permissions(hikari.Permissions.ADMINISTRATOR))
@@ -42,6 +43,7 @@ async def stop_command(ctx: lightbulb.SlashContext) -> None:
             )
             logger.info(f"{ctx.author.id} executed /{ctx.command.name}")
             await plugin.bot.update_presence(status=hikari.Status.OFFLINE)
+            await user_stats.buffer.flush()
             await plugin.bot.close()
             logger.info("Bot shut down by command.")
 
@@ -15,55 +15,46 @@
 
 # hehe
 
-import re
-
 import bot_utils as utils
 import config_reader as config
 import hikari
-import hikari.errors
 import lightbulb
+import message_pipeline
 
 plugin = lightbulb.Plugin("69", "Does you message add up to 69?")
 
 
-async def extract_numbers(text: str) -> list:
-    # Use regular expression to match both integers and floating point numbers
-    numbers = re.findall(r"\d+\.\d+|\d+", text)
-    # Convert matched strings to float or int as needed
-    return [float(num) if "." in num else int(num) for num in numbers]
-
-
-@plugin.listener(hikari.GuildMessageCreateEvent)
-async def check(event: hikari.GuildMessageCreateEvent):
+async def check(context: message_pipeline.MessageContext):
+    """
+    Reacts to messages whose numbers add up to 69, runs in the react phase of the message pipeline
+    """
     if not config.Fun.enable_69:
         return
 
-    author = event.message.author
-    message = event.message
-    if author.is_bot or author.is_system:
+    message = context.message
+    if message.guild_id is None:
         return
 
-    content = message.content
-
-    if content:
-        numbers = await extract_numbers(content)
+    numbers = context.numbers
 
-        if numbers:
-            total = sum(numbers)
-            if total == 69:
-                await message.add_reaction(emoji="69:1320385142040035358")
+    if numbers:
+        total = sum(numbers)
+        if total == 69:
+            await message.add_reaction(emoji="69:1320385142040035358")
 
-                if config.Fun.enable_69_message and len(numbers) > 1:
-                    formatted_numbers = " + ".join(map(str, numbers))
+            if config.Fun.enable_69_message and len(numbers) > 1:
+                formatted_numbers = " + ".join(map(str, numbers))
 
-                    response = f"All of the numbers in your message add up to 69!:\n\n```{formatted_numbers} = 69```"
+                response = f"All of the numbers in your message add up to 69!:\n\n```{formatted_numbers} = 69```"
 
-                    await message.respond(response, mentions_reply=False, reply=message)
+                await message.respond(response, mentions_reply=False, reply=message)
 
 
 def load(bot):
+    message_pipeline.pipeline.register("react", "69", check)
     bot.add_plugin(plugin)
 
 
 def unload(bot):
+    message_pipeline.pipeline.unregister("69")
     bot.remove_plugin(plugin)
@@ -13,12 +13,10 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see https://www.gnu.org/licenses/.
 
-import json
-
-import aiohttp
 import bot_utils as utils
 import config_reader as config
 import hikari
+import http_client
 import lightbulb
 
 plugin = lightbulb.Plugin("advice", "Let me give you some useful advice!")
@@ -35,20 +33,19 @@ async def advice_command(ctx: lightbulb.SlashContext):
     url = "https://api.adviceslip.com/advice"
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = json.loads(await response.read())
-                    advice = data["slip"]["advice"]
-                    await ctx.respond(f"Here's some advice for you: {advice}")
-                else:
-                    from bot import logger
-
-                    logger.error(f"Failed to fetch advice: {response.status}")
-                    await ctx.respond(
-                        f"An error occurred!{await utils.error_fun()}",
-                        flags=hikari.MessageFlag.EPHEMERAL,
-                    )
+        response = await http_client.fetch(url)
+        if response.status == 200:
+            data = response.data
+            advice = data["slip"]["advice"]
+            await ctx.respond(f"Here's some advice for you: {advice}")
+        else:
+            from bot import logger
+
+            logger.error(f"Failed to fetch advice: {response.status}")
+            await ctx.respond(
+                f"An error occurred!{await utils.error_fun()}",
+                flags=hikari.MessageFlag.EPHEMERAL,
+            )
     except Exception as e:
         from bot import logger
 
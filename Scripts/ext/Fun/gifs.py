@@ -16,6 +16,7 @@
 import os
 import random
 
+import asset_registry
 import bot_utils as utils
 import config_reader as config
 import hikari
@@ -43,9 +44,8 @@ async def cat_command(ctx: lightbulb.SlashContext, type="Cats"):
     try:
         folder = os.path.join(config.Paths.assets_folder, "Gifs", type)
 
-        gif = await utils.choose_random_file(folder)
-
-        file = hikari.File(gif)
+        gif = asset_registry.registry.choose(folder)
+        file = await asset_registry.registry.attachment(gif)
         await ctx.respond(f"{nekos.textcat()}", attachment=file)
         return
     except Exception as e:
@@ -77,9 +77,8 @@ async def dog_command(ctx: lightbulb.SlashContext, type="Dogs"):
     try:
         folder = os.path.join(config.Paths.assets_folder, "Gifs", type)
 
-        gif = await utils.choose_random_file(folder)
-
-        file = hikari.File(gif)
+        gif = asset_registry.registry.choose(folder)
+        file = await asset_registry.registry.attachment(gif)
         await ctx.respond(file)
         return
     except Exception as e:
@@ -111,9 +110,8 @@ async def pig_command(ctx: lightbulb.SlashContext, type="Pig"):
     try:
         folder = os.path.join(config.Paths.assets_folder, "Gifs", type)
 
-        gif = await utils.choose_random_file(folder)
-
-        file = hikari.File(gif)
+        gif = asset_registry.registry.choose(folder)
+        file = await asset_registry.registry.attachment(gif)
         await ctx.respond(file)
         return
     except Exception as e:
@@ -205,9 +203,8 @@ async def kiss_command(ctx: lightbulb.SlashContext, type="Kiss"):
     try:
         folder = os.path.join(config.Paths.assets_folder, "Gifs", type)
 
-        gif = await utils.choose_random_file(folder)
-
-        file = hikari.File(gif)
+        gif = asset_registry.registry.choose(folder)
+        file = await asset_registry.registry.attachment(gif)
 
         emojis = [
             "💕",
@@ -324,8 +321,8 @@ async def hug_command(ctx: lightbulb.SlashContext, type="Hug"):
 
     try:
         folder = os.path.join(config.Paths.assets_folder, "Gifs", type)
-        gif = await utils.choose_random_file(folder)
-        file = hikari.File(gif)
+        gif = asset_registry.registry.choose(folder)
+        file = await asset_registry.registry.attachment(gif)
 
         responses = [
             "🤗 {0} gave {1} a warm hug 🤗",
@@ -417,9 +414,9 @@ async def slap_command(ctx: lightbulb.SlashContext, type="Slap"):
 
     try:
         folder = os.path.join(config.Paths.assets_folder, "Gifs", type)
-        gif = await utils.choose_random_file(folder)
-        file = hikari.File(gif)
-        if str(gif).endswith("yuzuki-mizusaka-nonoka-komiya.gif"):
+        gif = asset_registry.registry.choose(folder)
+        file = await asset_registry.registry.attachment(gif)
+        if gif.name == "yuzuki-mizusaka-nonoka-komiya.gif":
             await ctx.respond(
                 f"{ctx.author.mention} did not slap {user.mention}.\nI don't like violence! Hmpf!",
                 attachment=file,
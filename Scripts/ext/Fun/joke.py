@@ -16,10 +16,10 @@
 import random
 import re
 
-import aiohttp
 import bot_utils as utils
 import config_reader as config
 import hikari
+import http_client
 import lightbulb
 
 plugin = lightbulb.Plugin(
@@ -55,65 +55,63 @@ async def joke_command(ctx: lightbulb.SlashContext):
     url = "https://v2.jokeapi.dev/joke/Any?blacklistFlags=political,racist,sexist"
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-
-                    joke_category = data["category"]
-                    type = data["type"]
-
-                    if type == "twopart":
-                        setup = data["setup"]
-                        delivery = data["delivery"]
-                        joke_txt = f"{setup}\n||{delivery}||"
-                    elif type == "single":
-                        joke = data["joke"]
-                        joke_txt = joke
-                    elif data["error"] == "true":
-                        await ctx.respond(
-                            f"An error occurred in the joke API!{await utils.error_fun()}",
-                            flags=hikari.MessageFlag.EPHEMERAL,
-                        )
-                        return
-                    else:
-                        await ctx.respond(
-                            f"An error occurred!{await utils.error_fun()}",
-                            flags=hikari.MessageFlag.EPHEMERAL,
-                        )
-                        return
-
-                    txt = random.choice(
-                        [
-                            "Here's the joke",
-                            "Here's my joke for you",
-                            "Here's my joke",
-                            "Ready to crack up? Here it goes",
-                            "Time to sprinkle some laughter! Here's one for you",
-                            "Get ready for a dose of humor",
-                            "Knock, knock! Who's there? A joke just for you",
-                            "Hold onto your sides, here comes a good one",
-                            "Brace yourself for a burst of laughter",
-                            "Are you ready to LOL? Here we go"
-                            "Get your chuckle muscles ready",
-                            "Warning: hilarity incoming",
-                            "Incoming joke missile, prepare to laugh",
-                            "Ready for a dose of humor? Here it is",
-                            "Get set to ROFL",
-                            "Here's a little joke to lighten things up",
-                        ]
-                    )
-
-                    await ctx.respond(f"{txt}:\n\n{joke_txt}")
-
-                else:
-                    from bot import logger
-
-                    logger.error(f"Failed to fetch joke: {response.status}")
-                    await ctx.respond(
-                        f"An error occurred!{await utils.error_fun()}",
-                        flags=hikari.MessageFlag.EPHEMERAL,
-                    )
+        response = await http_client.fetch(url, params=params)
+        if response.status == 200:
+            data = response.data
+
+            joke_category = data["category"]
+            type = data["type"]
+
+            if type == "twopart":
+                setup = data["setup"]
+                delivery = data["delivery"]
+                joke_txt = f"{setup}\n||{delivery}||"
+            elif type == "single":
+                joke = data["joke"]
+                joke_txt = joke
+            elif data["error"] == "true":
+                await ctx.respond(
+                    f"An error occurred in the joke API!{await utils.error_fun()}",
+                    flags=hikari.MessageFlag.EPHEMERAL,
+                )
+                return
+            else:
+                await ctx.respond(
+                    f"An error occurred!{await utils.error_fun()}",
+                    flags=hikari.MessageFlag.EPHEMERAL,
+                )
+                return
+
+            txt = random.choice(
+                [
+                    "Here's the joke",
+                    "Here's my joke for you",
+                    "Here's my joke",
+                    "Ready to crack up? Here it goes",
+                    "Time to sprinkle some laughter! Here's one for you",
+                    "Get ready for a dose of humor",
+                    "Knock, knock! Who's there? A joke just for you",
+                    "Hold onto your sides, here comes a good one",
+                    "Brace yourself for a burst of laughter",
+                    "Are you ready to LOL? Here we go" "Get your chuckle muscles ready",
+                    "Warning: hilarity incoming",
+                    "Incoming joke missile, prepare to laugh",
+                    "Ready for a dose of humor? Here it is",
+                    "Get set to ROFL",
+                    "Here's a little joke to lighten things up",
+                ]
+            )
+
+            await ctx.respond(f"{txt}:\n\n{joke_txt}")
+
+        else:
+            from bot import logger
+
+            logger.error(f"Failed to fetch joke: {response.status}")
+            await ctx.respond(
+                f"An error occurred!{await utils.error_fun()}",
+                flags=hikari.MessageFlag.EPHEMERAL,
+            )
     except Exception as e:
         from bot import logger
 
@@ -13,10 +13,10 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see https://www.gnu.org/licenses/.
 
-import aiohttp
 import bot_utils as utils
 import config_reader as config
 import hikari
+import http_client
 import lightbulb
 
 plugin = lightbulb.Plugin("never_have_i_ever", "Play never have I ever")
@@ -50,23 +50,27 @@ async def would_you_rather_command(
     if not await utils.validate_command(ctx, nsfw=nsfw):
         return
 
-    async with aiohttp.ClientSession() as session:
-        async with session.get(
-            f"https://api.truthordarebot.xyz/api/nhie?rating={rating}"
-        ) as resp:
-            if resp.status != 200:
-                await ctx.respond("Failed to get a question. Please try again later.")
-                return
-            response = await resp.json()
-
-            if "question" not in response:
-                await ctx.respond("Unexpected response format. Please try again later.")
-                return
-
-            if language == "en":
-                question = response["question"]
-            else:
-                question = response["translations"][language]
+    try:
+        resp = await http_client.fetch(
+            "https://api.truthordarebot.xyz/api/nhie", params={"rating": rating}
+        )
+    except http_client.REQUEST_ERRORS:
+        await ctx.respond("Failed to get a question. Please try again later.")
+        return
+
+    if resp.status != 200:
+        await ctx.respond("Failed to get a question. Please try again later.")
+        return
+    response = resp.data
+
+    if "question" not in response:
+        await ctx.respond("Unexpected response format. Please try again later.")
+        return
+
+    if language == "en":
+        question = response["question"]
+    else:
+        question = response["translations"][language]
 
     embed = hikari.Embed(
         title=f"**Never have I ever:**",
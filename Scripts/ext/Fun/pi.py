@@ -18,33 +18,29 @@ todo: Pls organize...i have low standards but...this is atrocious
 # along with this program.  If not, see https://www.gnu.org/licenses/.
 
 import asyncio
+import io
 import json
 import os
 import random
-from collections import Counter
-from statistics import StatisticsError, mean, median, mode
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 import bot_utils as utils
 import config_reader as config
 import hikari
 import lightbulb
-
-# import numpy as np
-import matplotlib.pyplot as plt
+import matplotlib
+import numpy as np
+import pi_digits
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 
 plugin = lightbulb.Plugin("pi", "Pi related commands")
 
 
-pi_length = 1_000_000_000
-
-calculated_pi_length = None
-
-
 def formatted_number():
-    if calculated_pi_length is None:
-        return "{:,}".format(pi_length).replace(",", ".")
-    else:
-        return "{:,}".format(calculated_pi_length).replace(",", ".")
+    return "{:,}".format(pi_digits.engine.length).replace(",", ".")
 
 
 @plugin.command
@@ -58,60 +54,29 @@ async def searchpi_command(ctx: lightbulb.context.SlashContext, number) -> None:
     if not await utils.validate_command(ctx):
         return
 
-    pi_file = os.path.join(config.Paths.assets_folder, "Text", "pi.txt")
-
     number_str = str(number)
-    number_len = len(number_str)
-
-    # Define chunk size (10MB)
-    chunk_size = 10 * 1024 * 1024
 
     message = await ctx.respond("Searching...")
 
     try:
-        with open(pi_file, "r", encoding="utf-8") as f:
-            overlap = number_len - 1
-            position = 0
-            chunk = f.read(chunk_size)
-
-            while chunk:
-                # Search for the number in the current chunk
-                index = chunk.find(number_str)
-
-                if index != -1:
-                    await message.edit(
-                        f"The number {number_str} was found at position **{position + index}** of pi."
-                    )
-                    return
-
-                # Read the next chunk, including overlap
-                position += chunk_size - overlap
-                f.seek(position)
-                chunk = f.read(chunk_size)
-
-                # Combine the end of the previous chunk with the new chunk to handle overlaps
-                if len(chunk) > 0:
-                    combined_chunk = chunk[-overlap:] + chunk[:overlap]
-                    index = combined_chunk.find(number_str)
-                    if index != -1:
-                        # Adjust the index based on the actual position in the file
-                        await message.edit(
-                            f"The number {number_str} was found at position **{position - overlap + index}** of pi."
-                        )
-                        return
-
-            pi_jokes_file = os.path.join(
-                config.Paths.assets_folder, "Text", "pijokes.json"
+        position = await pi_digits.engine.search(number_str)
+
+        if position != -1:
+            await message.edit(
+                f"The number {number_str} was found at position **{position}** of pi."
             )
+            return
 
-            with open(pi_jokes_file, "r") as jf:
-                jokes = json.load(jf)
+        pi_jokes_file = os.path.join(config.Paths.assets_folder, "Text", "pijokes.json")
 
-            joke = random.choice(jokes)
+        with open(pi_jokes_file, "r") as jf:
+            jokes = json.load(jf)
 
-            await message.edit(
-                f"The number {number_str} was not found in the first {formatted_number()} digits of pi.\n\nHere's a joke about pi instead:\n{joke['setup']}\n||{joke['punchline']}||"
-            )
+        joke = random.choice(jokes)
+
+        await message.edit(
+            f"The number {number_str} was not found in the first {formatted_number()} digits of pi.\n\nHere's a joke about pi instead:\n{joke['setup']}\n||{joke['punchline']}||"
+        )
 
     except Exception as e:
         from bot import logger
@@ -147,36 +112,39 @@ async def pi_fact_command(ctx: lightbulb.context.SlashContext) -> None:
         )
 
 
-def get_segment_statistic(segment: int, total_digits: int):
-    str_segment = str(segment)
+# How many digits are shown in the message, longer segments are attached as a file
+SEGMENT_MESSAGE_LIMIT = 1500
 
-    frequency = {}
-    even_count = 0
-    odd_count = 0
-    positions = {}
-    total_gaps = 0
-    total_gap_count = 0
-    digits_list = []
+# How many rendered segments (statistics and chart) are cached
+SEGMENT_CACHE_SIZE = 64
 
-    for index, digit in enumerate(str_segment):
-        if digit in frequency:
-            frequency[digit] += 1
-            positions[digit].append(index)
-        else:
-            frequency[digit] = 1
-            positions[digit] = [index]
+# Renders the charts off the event loop
+chart_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="pi_chart")
 
-        if int(digit) % 2 == 0:
-            even_count += 1
-        else:
-            odd_count += 1
+segment_cache = OrderedDict()  # {(start, length): (segment, stats, chart)}
 
-    for digit in str_segment:
-        digits_list.append(int(digit))
 
-    sorted_frequency = dict(
-        sorted(frequency.items(), key=lambda item: item[1], reverse=True)
-    )
+def segment_digits(segment: str) -> np.ndarray:
+    """
+    Converts a string of digits to an array of digit values
+    """
+    return np.frombuffer(segment.encode("ascii"), dtype=np.uint8) - ord("0")
+
+
+def get_segment_statistic(segment: str, total_digits: int):
+    digits = segment_digits(segment)
+
+    counts = np.bincount(digits, minlength=10)
+    present, first_positions = np.unique(digits, return_index=True)
+    _, last_positions = np.unique(digits[::-1], return_index=True)
+    last_positions = len(digits) - 1 - last_positions
+
+    # Most frequent first, ties in the order the digits first appear
+    order = np.lexsort((first_positions, -counts[present]))
+    sorted_frequency = {str(present[i]): int(counts[present[i]]) for i in order}
+
+    even_count = int(counts[0::2].sum())
+    odd_count = int(counts[1::2].sum())
 
     formatted_string = "**Number stats:**\n"
     for digit, count in sorted_frequency.items():
@@ -190,13 +158,11 @@ def get_segment_statistic(segment: int, total_digits: int):
                 f"**{digit}**: *{count} times,* {percentage:.4f}% of segment\n"
             )
 
-    all_digits = set("0123456789")
-    present_digits = set(str_segment)
-    missing_digits = all_digits - present_digits
+    missing_digits = [str(digit) for digit in np.flatnonzero(counts == 0)]
 
     formatted_string += "\n**Missing Digits:**\n"
     if missing_digits:
-        formatted_string += f"{', '.join(sorted(missing_digits))}\n"
+        formatted_string += f"{', '.join(missing_digits)}\n"
     else:
         formatted_string += "None (all digits 0-9 are present)\n"
 
@@ -208,29 +174,24 @@ def get_segment_statistic(segment: int, total_digits: int):
         f"Odd digits: {odd_count} times, {odd_percentage:.2f}% of segment"
     )
 
-    mean_value = mean(digits_list)
-    median_value = median(digits_list)
-
-    try:
-        mode_value = mode(digits_list)
-    except StatisticsError:
-        mode_value = "No unique mode"
+    mean_value = float(digits.mean())
+    median_value = float(np.median(digits))
+    # The most frequent digit that appears first, like statistics.mode
+    mode_value = int(next(iter(sorted_frequency)))
 
     formatted_string += f"\n\n**Mean, Median, Mode:**\nMean: {mean_value:.2f}\n"
     formatted_string += f"Median: {median_value:.2f}\n"
     formatted_string += f"Mode: {mode_value}\n"
 
-    longest_repeating_sequence = find_longest_repeating_sequence(str_segment)
+    longest_repeating_sequence = find_longest_repeating_sequence(segment)
     formatted_string += (
         f"\n**Longest Repeating Sequence:**\n```{longest_repeating_sequence}```"
     )
 
+    # The gaps between the occurrences of a digit add up to its last minus its first position
     formatted_string += "\n**Gap Analysis:**\n"
-    for digit, pos_list in positions.items():
-        if len(pos_list) > 1:
-            gaps = [pos_list[i] - pos_list[i - 1] for i in range(1, len(pos_list))]
-            total_gaps += sum(gaps)
-            total_gap_count += len(gaps)
+    total_gaps = int((last_positions - first_positions).sum())
+    total_gap_count = int((counts[present] - 1).sum())
 
     if total_gap_count > 0:
         overall_avg_gap = total_gaps / total_gap_count
@@ -243,7 +204,7 @@ def get_segment_statistic(segment: int, total_digits: int):
     mean_around_4_5 = False
     even_percentage_around_50 = False
 
-    if isinstance(mode_value, int) and 3.5 <= mean_value <= 6.5:
+    if 3.5 <= mean_value <= 6.5:
         mean_around_4_5 = True
 
     if 40 <= even_percentage <= 60:
@@ -262,49 +223,92 @@ def get_segment_statistic(segment: int, total_digits: int):
 
 
 def find_longest_repeating_sequence(segment: str) -> str:
-    max_length = 0
-    longest_sequence = ""
-    current_sequence = segment[0]
+    digits = segment_digits(segment)
 
-    for i in range(1, len(segment)):
-        if segment[i] == segment[i - 1]:
-            current_sequence += segment[i]
-        else:
-            if len(current_sequence) > max_length:
-                max_length = len(current_sequence)
-                longest_sequence = current_sequence
-            current_sequence = segment[i]
+    # Start and length of every run of the same digit
+    run_starts = np.flatnonzero(np.diff(digits, prepend=np.uint8(255)))
+    run_lengths = np.diff(run_starts, append=len(digits))
+
+    # argmax returns the first of several equally long runs
+    longest = int(np.argmax(run_lengths))
+    return segment[run_starts[longest] : run_starts[longest] + run_lengths[longest]]
 
-    if len(current_sequence) > max_length:
-        longest_sequence = current_sequence
 
-    return longest_sequence
+def generate_pie_chart(segment: str) -> bytes:
+    """
+    Renders a pie chart of the digit frequencies
 
+    Uses the object-oriented matplotlib API, so it doesn't touch pyplot's global state
+    and can run in a worker thread.
 
-def generate_pie_chart(number, filename="pie_chart.png"):
-    number_str = str(number)
+    Returns:
+        bytes: The chart as a png
+    """
+    digits = segment_digits(segment)
 
-    digit_counts = Counter(number_str)
+    counts = np.bincount(digits, minlength=10)
+    present, first_positions = np.unique(digits, return_index=True)
+    # The digits in the order they first appear
+    labels = present[np.argsort(first_positions)]
 
-    labels = list(digit_counts.keys())
-    sizes = list(digit_counts.values())
-    colors = plt.cm.tab20c.colors
+    sizes = counts[labels]
+    colors = matplotlib.colormaps["tab20c"].colors
 
-    fig, ax = plt.subplots(figsize=(8, 8), facecolor="#171717")
+    fig = Figure(figsize=(8, 8), facecolor="#171717")
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
     wedges, texts, autotexts = ax.pie(
-        sizes, labels=labels, autopct="%1.1f%%", startangle=90, colors=colors
+        sizes,
+        labels=[str(label) for label in labels],
+        autopct="%1.1f%%",
+        startangle=90,
+        colors=colors,
     )
     ax.axis("equal")
 
-    plt.setp(texts, size=12, weight="bold", color="#e8e8e8")
-    plt.setp(autotexts, size=10, weight="bold", color="#0d0d0d")
+    for text in texts:
+        text.set(size=12, weight="bold", color="#e8e8e8")
+    for autotext in autotexts:
+        autotext.set(size=10, weight="bold", color="#0d0d0d")
 
-    plt.title("Frequency of Each Digit", fontsize=16, weight="bold", color="#e8e8e8")
+    ax.set_title("Frequency of Each Digit", fontsize=16, weight="bold", color="#e8e8e8")
 
     ax.set_facecolor("#171717")
 
-    plt.savefig(filename, bbox_inches="tight", facecolor=fig.get_facecolor())
-    plt.close(fig)
+    chart = io.BytesIO()
+    fig.savefig(chart, format="png", bbox_inches="tight", facecolor=fig.get_facecolor())
+    return chart.getvalue()
+
+
+async def render_segment(start: int, length: int) -> tuple:
+    """
+    Reads a segment and renders its statistics and chart, cached by (start, length)
+
+    Returns:
+        tuple: The segment (str), the statistics (str), the chart (png bytes)
+    """
+    key = (start, length)
+    cached = segment_cache.get(key)
+    if cached is not None:
+        segment_cache.move_to_end(key)
+        return cached
+
+    segment = await pi_digits.engine.read(start - 1, length)
+    segment = segment.replace(".", "")
+
+    loop = asyncio.get_running_loop()
+    stats, chart = await asyncio.gather(
+        loop.run_in_executor(
+            chart_executor, get_segment_statistic, segment, len(segment)
+        ),
+        loop.run_in_executor(chart_executor, generate_pie_chart, segment),
+    )
+
+    result = (segment, stats, chart)
+    segment_cache[key] = result
+    if len(segment_cache) > SEGMENT_CACHE_SIZE:
+        segment_cache.popitem(last=False)
+    return result
 
 
 # def transition_matrix(segment: str):
@@ -333,7 +337,7 @@ def generate_pie_chart(number, filename="pie_chart.png"):
     "The length of the segment",
     type=int,
     required=True,
-    max_value=1500,
+    max_value=100_000,
     min_value=1,
 )
 @lightbulb.command(
@@ -346,13 +350,7 @@ async def pi_segment_command(
     if not await utils.validate_command(ctx):
         return
 
-    pi_file = os.path.join(config.Paths.assets_folder, "Text", "pi.txt")
-
-    global calculated_pi_length
-    global pi_length
-
-    if calculated_pi_length:
-        pi_length = calculated_pi_length
+    pi_length = pi_digits.engine.length
 
     if start < 1 or start > (pi_length - 1):
         await ctx.respond(
@@ -370,21 +368,14 @@ async def pi_segment_command(
 
     try:
 
-        with open(pi_file, "r") as file:
-            file.seek(start - 1)
-            segment = file.read(length)
-            segment = segment.replace(".", "")
-            segment = int(segment)
+        segment, stats, chart = await render_segment(start, length)
 
-        stats = get_segment_statistic(segment, length)
-
-        stats_image_path = os.path.join(
-            config.Paths.data_folder,
-            "Generated Statistics",
-            f"{await utils.generate_id()}.png",
-        )
-
-        generate_pie_chart(segment, stats_image_path)
+        if not segment:
+            await ctx.respond(
+                "That segment doesn't contain any digits.",
+                flags=hikari.MessageFlag.EPHEMERAL,
+            )
+            return
 
         embed = hikari.Embed(
             title="Here are some statistics about your segment:", description=stats
@@ -399,13 +390,18 @@ async def pi_segment_command(
             hikari.File(os.path.join(config.Paths.assets_folder, "pi.png"))
         )
 
-        embed.set_image(hikari.File(stats_image_path))
+        embed.set_image(hikari.Bytes(chart, f"pi_{start}_{length}.png"))
 
-        await ctx.respond(
-            f"Your segment of pi at {start} is:\n```{segment}```", embed=embed
-        )
-
-        os.remove(stats_image_path)
+        if len(segment) <= SEGMENT_MESSAGE_LIMIT:
+            await ctx.respond(
+                f"Your segment of pi at {start} is:\n```{segment}```", embed=embed
+            )
+        else:
+            await ctx.respond(
+                f"Your segment of pi at {start} is attached.",
+                embed=embed,
+                attachment=hikari.Bytes(segment, f"pi_{start}_{length}.txt"),
+            )
 
     except Exception as e:
         from bot import logger
@@ -416,48 +412,34 @@ async def pi_segment_command(
         )
 
 
-async def count_characters_in_file(file_path, chunk_size=1024 * 1024):
-    """
-    Counts the number of characters in a file without loading the entire file into memory.
-
-    Args:
-        file_path (str): The path to the file.
-        chunk_size (int): The size of the chunks to read the file in bytes. Default is 1MB.
-
-    Returns:
-        int: The total number of characters in the file.
-    """
-    total_characters = 0
-
-    with open(file_path, "r") as file:
-        while True:
-            chunk = file.read(chunk_size)
-            if not chunk:
-                break
-            total_characters += len(chunk)
-
-    return total_characters
-
-
-async def count_pi():
-    global calculated_pi_length
-
-    from bot import logger
-
-    logger.info("Counting pi.txt")
-
-    pi_file = os.path.join(config.Paths.assets_folder, "Text", "pi.txt")
-    calculated_pi_length = await count_characters_in_file(pi_file)
+@plugin.listener(hikari.StartedEvent)
+async def on_started(event: hikari.StartedEvent) -> None:
+    try:
+        pi_digits.engine.ensure_metadata()
+        pi_digits.engine.ensure_index()
+    except Exception as e:
+        from bot import logger
 
-    logger.info("Finished counting pi.txt")
+        logger.error(f"An error occurred while preparing the pi search index: {e}")
 
 
 def load(bot):
+    from bot import logger
 
-    asyncio.run(count_pi())
+    start = time.perf_counter()
 
     bot.add_plugin(plugin)
 
+    # Only memory-maps the file and reads the metadata, nothing is counted
+    try:
+        pi_digits.engine.open()
+        metadata = pi_digits.engine.metadata
+        logger.info(
+            f"Loaded the pi plugin in {(time.perf_counter() - start) * 1000:.1f}ms ({formatted_number()} characters, search index {'ready' if metadata['index_version'] else 'missing'})"
+        )
+    except Exception as e:
+        logger.error(f"An error occurred while opening the pi file: {e}")
+
 
 def unload(bot):
     bot.remove(plugin)
@@ -16,10 +16,10 @@
 import random
 import re
 
-import aiohttp
 import bot_utils as utils
 import config_reader as config
 import hikari
+import http_client
 import lightbulb
 
 plugin = lightbulb.Plugin("Roast", "Send some roasts")
@@ -93,35 +93,32 @@ async def roast_command(ctx: lightbulb.SlashContext):
     url = "https://evilinsult.com/generate_insult.php"
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    insult = data["insult"]
-                    for word in config.Bot.censored_roast_words:
-                        insult = re.sub(
-                            r"\b" + re.escape(word) + r"\b",
-                            "*" * len(word),
-                            insult,
-                            flags=re.IGNORECASE,
-                        )
-                    if user.id == ctx.author.id:
-                        await ctx.respond(
-                            f"{ctx.author.mention} roasted themselves: **{insult}**",
-                            user_mentions=True,
-                        )
-                    else:
-                        await ctx.respond(
-                            f"{user.mention} **{insult}**", user_mentions=True
-                        )
-                else:
-                    from bot import logger
-
-                    logger.error(f"Failed to fetch insult: {response.status}")
-                    await ctx.respond(
-                        f"An error occurred!{await utils.error_fun()}",
-                        flags=hikari.MessageFlag.EPHEMERAL,
-                    )
+        response = await http_client.fetch(url, params=params)
+        if response.status == 200:
+            data = response.data
+            insult = data["insult"]
+            for word in config.Bot.censored_roast_words:
+                insult = re.sub(
+                    r"\b" + re.escape(word) + r"\b",
+                    "*" * len(word),
+                    insult,
+                    flags=re.IGNORECASE,
+                )
+            if user.id == ctx.author.id:
+                await ctx.respond(
+                    f"{ctx.author.mention} roasted themselves: **{insult}**",
+                    user_mentions=True,
+                )
+            else:
+                await ctx.respond(f"{user.mention} **{insult}**", user_mentions=True)
+        else:
+            from bot import logger
+
+            logger.error(f"Failed to fetch insult: {response.status}")
+            await ctx.respond(
+                f"An error occurred!{await utils.error_fun()}",
+                flags=hikari.MessageFlag.EPHEMERAL,
+            )
     except Exception as e:
         from bot import logger
 
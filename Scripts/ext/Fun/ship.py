@@ -13,6 +13,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see https://www.gnu.org/licenses/.
 
+import asyncio
 import hashlib
 import random
 
@@ -179,11 +180,9 @@ async def ship_command(
         return
 
     try:
-        user1_image_path = await image_manager.download_image(
-            str(user1.avatar_url), user1.id
-        )
-        user2_image_path = await image_manager.download_image(
-            str(user2.avatar_url), user2.id
+        user1_image_path, user2_image_path = await asyncio.gather(
+            image_manager.download_image(str(user1.avatar_url), user1.id),
+            image_manager.download_image(str(user2.avatar_url), user2.id),
         )
     except Exception as e:
         from bot import logger
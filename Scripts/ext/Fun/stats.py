@@ -20,10 +20,15 @@ import subprocess
 import time
 
 import bot_utils as utils
+import channel_cache
 import config_reader as config
 import hikari
+import http_client
 import lightbulb
+import message_pipeline
+import message_retention
 import miru
+import Verification.Generators.image
 
 plugin = lightbulb.Plugin("Stats", "Get fun stats on the bot")
 
@@ -94,6 +99,52 @@ async def stats_command(ctx: lightbulb.SlashContext):
         "Uptime:", f"I have been running for **{uptime_str}**", inline=False
     )
     embed.add_field("Latency:", f"{ctx.bot.heartbeat_latency * 1000:.0f}ms")
+    channel_stats = channel_cache.resolver.stats()
+    embed.add_field(
+        "Channel lookups:",
+        f"{channel_stats['gateway_hits'] + channel_stats['local_hits']} cached, {channel_stats['misses']} fetched ({channel_stats['hit_rate']:.0%} hit rate)",
+    )
+    captcha_stats = Verification.Generators.image.pool.stats()
+    embed.add_field(
+        "Captcha pool:",
+        f"{captcha_stats['depth']}/{captcha_stats['size']} ready, {captcha_stats['average_render_ms']:.0f}ms per captcha",
+    )
+    message_log_stats = message_retention.retention.stats()
+    if message_log_stats["table_rows"] is not None:
+        embed.add_field(
+            "Message log:",
+            f"{message_log_stats['table_rows']:,} messages ({message_log_stats['database_size'] / 1024 / 1024:.1f} MB database), {message_log_stats['rows_pruned']:,} pruned",
+        )
+    if message_pipeline.pipeline.processed:
+        stage_lines = [
+            f"{name}: {stage['average_ms']:.1f}ms average, 95% under {stage['p95_ms']:g}ms"
+            for name, stage in message_pipeline.pipeline.stats().items()
+        ]
+        embed.add_field(
+            "Message pipeline:",
+            f"{message_pipeline.pipeline.processed:,} messages\n"
+            + "\n".join(stage_lines),
+        )
+    http_stats = http_client.client.stats()
+    if http_stats["endpoints"]:
+        endpoint_lines = [
+            f"{endpoint}: {endpoint_stats['requests']:,} requests, {endpoint_stats['errors']:,} failed, {endpoint_stats['average_ms']:.0f}ms average"
+            for endpoint, endpoint_stats in sorted(
+                http_stats["endpoints"].items(),
+                key=lambda item: item[1]["requests"],
+                reverse=True,
+            )[:5]
+        ]
+        open_circuits = [
+            host for host, state in http_stats["circuits"].items() if state != "closed"
+        ]
+        if open_circuits:
+            endpoint_lines.append(f"Unavailable: {', '.join(open_circuits)}")
+        embed.add_field(
+            "External APIs:",
+            f"{http_stats['cache']['hits']:,} cached answers\n"
+            + "\n".join(endpoint_lines),
+        )
     embed.add_field("Platform:", f"I am running on '{platform.system()}'")
     embed.add_field(
         "Using:",
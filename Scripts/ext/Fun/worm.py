@@ -13,16 +13,13 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see https://www.gnu.org/licenses/.
 
-import asyncio
 import os
 
 import bot_utils as utils
 import buttons
 import config_reader as config
 import hikari
-import image_manager
 import lightbulb
-import vars
 from Worm import worm_simulator
 
 plugin = lightbulb.Plugin("Worm", "Worm matrix")
@@ -36,52 +33,53 @@ async def worm_command(ctx: lightbulb.SlashContext):
     if not await utils.validate_command(ctx):
         return
 
-    if vars.worm_is_running:
+    if worm_simulator.get_session(user_id=ctx.author.id) is not None:
+        await ctx.respond("You already have a worm running. Stop it first.")
+        return
+
+    session = worm_simulator.open_session(ctx.author.id)
+    if session is None:
         await ctx.respond(
-            "There's already a simulation running. And I don't have the ressources to simulate it twice, so you'll have to wait."
+            "There are already too many simulations running. I don't have the ressources to simulate more, so you'll have to wait."
         )
         return
 
-    vars.worm_is_running = True
-
-    view = buttons.Worm()
-
-    message = await ctx.respond("Initializing worm simulator...", components=view)
-
-    image_generator = worm_simulator.run_worm_simulator()
-
-    embed = hikari.Embed(
-        title="Worm simulator",
-        description="This is a digital simulation of the brain of the Caenorhabditis elegans worm. In 1963, Sydney Brenner proposed research into C. elegans primarily in neural development. The worm was the first organism to have it's connectome (neuronal 'wiring diagram') completed. This is a simulation of this diagram meaning every neuron and neuron connection is simulated here. (And surprisingly it is only 260 KB)\n\nThe matrix is one step closer.",
-    )
-    thumbnail = hikari.File(
-        os.path.join(config.Paths.assets_folder, "Caenorhabditis elegans.jpg")
-    )
-    embed.set_thumbnail(thumbnail)
-    embed.set_author(
-        name="Seth Miller",
-        url="https://heyseth.github.io",
-        icon="https://avatars.githubusercontent.com/u/8293842",
-    )
-    await message.edit(
-        embed=embed,
-        content="",
-    )
-
-    async for image in image_generator:
-        try:
-            file = hikari.File(image)
-            await message.edit(attachment=file)
-            await image_manager.delete(image)
-            await asyncio.sleep(2)
-        except Exception as e:
-            from bot import logger
-
-            logger.error(f"Error in /worm command: {e}")
-            await message.edit(
+    try:
+        view = buttons.Worm()
+
+        message = await ctx.respond("Initializing worm simulator...", components=view)
+        session.message_id = (await message.message()).id
+
+        embed = hikari.Embed(
+            title="Worm simulator",
+            description="This is a digital simulation of the brain of the Caenorhabditis elegans worm. In 1963, Sydney Brenner proposed research into C. elegans primarily in neural development. The worm was the first organism to have it's connectome (neuronal 'wiring diagram') completed. This is a simulation of this diagram meaning every neuron and neuron connection is simulated here. (And surprisingly it is only 260 KB)\n\nThe matrix is one step closer.",
+        )
+        thumbnail = hikari.File(
+            os.path.join(config.Paths.assets_folder, "Caenorhabditis elegans.jpg")
+        )
+        embed.set_thumbnail(thumbnail)
+        embed.set_author(
+            name="Seth Miller",
+            url="https://heyseth.github.io",
+            icon="https://avatars.githubusercontent.com/u/8293842",
+        )
+        await message.edit(
+            embed=embed,
+            content="",
+        )
+
+        async for frame in session.frames():
+            await message.edit(attachment=hikari.Bytes(frame, "worm.png"))
+    except Exception as e:
+        from bot import logger
+
+        logger.error(f"Error in /worm command: {e}")
+        if not session.stopped:
+            await ctx.edit_last_response(
                 f"An error occurred!{await utils.error_fun()}", components=[]
             )
-            return
+    finally:
+        worm_simulator.close_session(session)
 
 
 def load(bot):
@@ -13,10 +13,8 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see https://www.gnu.org/licenses/.
 
-import os
-
+import auto_mod
 import bot_utils as utils
-import config_reader as config
 import hikari
 import lightbulb
 
@@ -51,17 +49,15 @@ async def allow_url(ctx: lightbulb.SlashContext, url: str) -> None:
         )
         return
 
-    if url.count(".") > 1:
+    if url.startswith("www.") or "." not in url:
         await ctx.respond(
-            "Must be domain name only. For example: darkylmusic.com instead of https://example.darkylmusic.com or www.darkylmusic.com"
+            "Must be domain name only. For example: darkylmusic.com instead of www.darkylmusic.com"
         )
         return
 
-    allow_list_path = os.path.join(config.Paths.data_folder, "whitelisted_sites.txt")
-
     try:
-        with open(allow_list_path, "a") as file:
-            file.write(f"\n{url}")
+        # Subdomains are allowed automatically, suffixes like co.uk are kept (bbc.co.uk)
+        auto_mod.allowed_domains.add(url)
         await ctx.respond(f"The URL `{url}` has been added to the allow list.")
     except Exception as e:
         await ctx.respond(f"An error occurred while adding the URL: {e}")
@@ -17,10 +17,11 @@ import datetime
 import json
 import os
 
-import aiohttp
 import bot_utils as utils
+import bulk_operations
 import config_reader as config
 import hikari
+import http_client
 import lightbulb
 import vars
 from hikari import Permissions
@@ -36,20 +37,26 @@ roles_to_remove = [config.Bot.admin_role, config.Bot.mod_role]
 
 backup_path = os.path.join(config.Paths.data_folder, "Server Backups")
 backup_file_path = os.path.join(backup_path, f"{server}_server_backup.json")
+job_file_path = os.path.join(backup_path, f"{server}_lockdown_job.json")
 backup_data_memory = {}
 
 
 async def download_image(url, backup_file_path):
     """Helper function to download an image."""
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            if response.status == 200:
-                with open(backup_file_path, "wb") as f:
-                    f.write(await response.read())
-                return backup_file_path
-            else:
-                print(f"Failed to download image from {url}")
-                return None
+    try:
+        response = await http_client.fetch(
+            str(url), read="bytes", endpoint="Discord CDN"
+        )
+    except http_client.REQUEST_ERRORS:
+        response = None
+
+    if response is not None and response.status == 200:
+        with open(backup_file_path, "wb") as f:
+            f.write(response.data)
+        return backup_file_path
+    else:
+        print(f"Failed to download image from {url}")
+        return None
 
 
 async def create_backup():
@@ -118,25 +125,7 @@ async def create_backup():
     print("Backup data stored in memory successfully!")
 
 
-async def lockdown_channels(reason):
-    global backup_data_memory
-
-    guild_channels = await plugin.app.rest.fetch_guild_channels(server)
-
-    deny_perms_text = (
-        Permissions.SEND_MESSAGES
-        | Permissions.CREATE_PRIVATE_THREADS
-        | Permissions.CREATE_PUBLIC_THREADS
-        | Permissions.ADD_REACTIONS
-    )
-
-    deny_perms_voice = (
-        Permissions.CONNECT
-        | Permissions.SEND_MESSAGES
-        | Permissions.ADD_REACTIONS
-        | Permissions.READ_MESSAGE_HISTORY
-    )
-
+def build_lockdown_embed(reason: str) -> hikari.Embed:
     embed = hikari.Embed(
         title="🚨 Server Lockdown Activated 🚨",
         description="The Server is currently under lockdown.\nThis is to ensure the safety and security of our community. This action has been taken due to suspicious activity or a potential threat, such as a server raid or unauthorized actions by a server member. All channels are now read-only, and permissions have been restricted for all roles.",
@@ -173,113 +162,170 @@ async def lockdown_channels(reason):
     embed.set_footer(
         text="Thank you for your patience and understanding during this time. We aim to restore full functionality as soon as possible."
     )
+    return embed
+
+
+async def plan_channels(reason) -> list:
+    """
+    Plans the overwrite edits and lockdown messages for every text and voice channel
+
+    Returns:
+        list: The operations
+    """
+    guild_channels = await plugin.app.rest.fetch_guild_channels(server)
 
-    lockdown_messages = {}
+    deny_perms_text = (
+        Permissions.SEND_MESSAGES
+        | Permissions.CREATE_PRIVATE_THREADS
+        | Permissions.CREATE_PUBLIC_THREADS
+        | Permissions.ADD_REACTIONS
+    )
+
+    deny_perms_voice = (
+        Permissions.CONNECT
+        | Permissions.SEND_MESSAGES
+        | Permissions.ADD_REACTIONS
+        | Permissions.READ_MESSAGE_HISTORY
+    )
+
+    operations = []
 
     for channel in guild_channels:
-        if channel.type.name == "GUILD_TEXT" or channel.type.name == "GUILD_VOICE":
-            for overwrite in channel.permission_overwrites.values():
-                role_id = overwrite.id
-                # Skip if the overwrite is for @everyone
-                if role_id == server:
-                    continue
-
-                existing_allow = overwrite.allow if overwrite else Permissions.NONE
-                existing_deny = overwrite.deny if overwrite else Permissions.NONE
-
-                # Determine the new deny permissions based on channel type
-                if channel.type.name == "GUILD_TEXT":
-                    new_deny = existing_deny | deny_perms_text
-                elif channel.type.name == "GUILD_VOICE":
-                    new_deny = existing_deny | deny_perms_voice
-
-                # Keep the 'allow' permissions that do not contradict the new denies
-                new_allow = existing_allow & ~new_deny
-
-                # Update permissions for this role
-                await plugin.app.rest.edit_permission_overwrite(
-                    channel=channel.id,
-                    target=role_id,
-                    target_type=hikari.PermissionOverwriteType.ROLE,
-                    allow=new_allow,
-                    deny=new_deny,
-                    reason="Lockdown.",
-                )
-
-            # Apply lockdown to the @everyone role (server role)
-            existing_overwrite = next(
-                (
-                    po
-                    for po in channel.permission_overwrites.values()
-                    if po.id == server
-                ),
-                None,
+        if channel.type.name not in ("GUILD_TEXT", "GUILD_VOICE"):
+            continue
+
+        if channel.type.name == "GUILD_TEXT":
+            deny_perms = deny_perms_text
+        else:
+            deny_perms = deny_perms_voice
+
+        overwrites = dict(channel.permission_overwrites)
+        # Always lock the @everyone role (server role), even without an overwrite
+        if server not in overwrites:
+            overwrites[server] = hikari.PermissionOverwrite(
+                id=server, type=hikari.PermissionOverwriteType.ROLE
             )
-            existing_allow = (
-                existing_overwrite.allow if existing_overwrite else Permissions.NONE
+
+        for overwrite in overwrites.values():
+            new_deny = overwrite.deny | deny_perms
+            # Keep the 'allow' permissions that do not contradict the new denies
+            new_allow = overwrite.allow & ~new_deny
+
+            operations.append(
+                {
+                    "key": f"overwrite:{channel.id}:{overwrite.id}",
+                    "action": "edit_overwrite",
+                    "bucket": f"channel:{channel.id}",
+                    "channel_id": channel.id,
+                    "target_id": overwrite.id,
+                    "target_type": overwrite.type.name,
+                    "allow": new_allow.value,
+                    "deny": new_deny.value,
+                }
             )
-            existing_deny = (
-                existing_overwrite.deny if existing_overwrite else Permissions.NONE
+
+        if channel.type.name == "GUILD_TEXT":
+            operations.append(
+                {
+                    "key": f"message:{channel.id}",
+                    "action": "create_message",
+                    "bucket": f"channel:{channel.id}",
+                    "channel_id": channel.id,
+                    "reason": reason,
+                }
             )
 
-            if channel.type.name == "GUILD_TEXT":
-                new_deny = existing_deny | deny_perms_text
-            elif channel.type.name == "GUILD_VOICE":
-                new_deny = existing_deny | deny_perms_voice
+    return operations
 
-            # Keep the 'allow' permissions that do not contradict the new denies
-            new_allow = existing_allow & ~new_deny
-
-            # Update permissions for the @everyone role
-            await plugin.app.rest.edit_permission_overwrite(
-                channel=channel.id,
-                target=server,  # @everyone
-                target_type=hikari.PermissionOverwriteType.ROLE,
-                allow=new_allow,
-                deny=new_deny,
-                reason="Lockdown.",
-            )
 
-            if channel.type.name == "GUILD_TEXT":
-                message = await plugin.app.rest.create_message(channel.id, embed=embed)
-                lockdown_messages[str(channel.id)] = message.id
+async def get_member_roles() -> dict:
+    """
+    Returns the role IDs of every member, from the gateway cache if it has the members
 
-    if "messages" not in backup_data_memory:
-        backup_data_memory["messages"] = {}
+    Returns:
+        dict: {member_id: role_ids}
+    """
+    cached_members = plugin.app.cache.get_members_view_for_guild(server)
+    if cached_members:
+        return {
+            member_id: member.role_ids for member_id, member in cached_members.items()
+        }
 
-    backup_data_memory["messages"].update(lockdown_messages)
+    # The REST members already contain their role IDs
+    return {
+        member.id: member.role_ids
+        async for member in plugin.app.rest.fetch_members(server)
+    }
 
 
-async def lockdown_members():
-    global backup_data_memory
+async def plan_members() -> tuple:
+    """
+    Plans removing the critical roles from everyone who has them
+
+    Returns:
+        tuple: The operations and {member_id: [removed role IDs]}
+    """
+    operations = []
+    removed_roles = {}
+
+    for member_id, role_ids in (await get_member_roles()).items():
+        remove = [role_id for role_id in roles_to_remove if role_id in role_ids]
+        if not remove:
+            continue
+
+        removed_roles[str(member_id)] = remove
+        for role_id in remove:
+            operations.append(
+                {
+                    "key": f"role:{member_id}:{role_id}",
+                    "action": "remove_role",
+                    "bucket": f"member:{member_id}",
+                    "member_id": member_id,
+                    "role_id": role_id,
+                }
+            )
 
-    role_ids = roles_to_remove
+    return operations, removed_roles
 
-    members = await plugin.app.rest.fetch_members(server)
 
-    if "removed_roles" not in backup_data_memory:
-        backup_data_memory["removed_roles"] = {}
+async def edit_overwrite(operation: dict) -> None:
+    await plugin.app.rest.edit_permission_overwrite(
+        channel=operation["channel_id"],
+        target=operation["target_id"],
+        target_type=hikari.PermissionOverwriteType[operation["target_type"]],
+        allow=Permissions(operation["allow"]),
+        deny=Permissions(operation["deny"]),
+        reason="Lockdown.",
+    )
 
-    for member in members:
-        try:
-            current_roles = await member.fetch_roles()
 
-            # Extract role IDs from the Role objects
-            current_role_ids = {role.id for role in current_roles}
+async def create_message(operation: dict) -> int:
+    message = await plugin.app.rest.create_message(
+        operation["channel_id"], embed=build_lockdown_embed(operation["reason"])
+    )
 
-            roles_to_remove = current_role_ids.intersection(set(role_ids))
+    # Saved right away, so unlocking can delete the message even if the lockdown is interrupted
+    backup_data_memory.setdefault("messages", {})[
+        str(operation["channel_id"])
+    ] = message.id
+    await save_backup_to_file()
 
-            for role_id in roles_to_remove:
-                await member.remove_role(role_id, reason="Lockdown.")
+    return message.id
 
-                if str(member.id) not in backup_data_memory["removed_roles"]:
-                    backup_data_memory["removed_roles"][str(member.id)] = []
-                backup_data_memory["removed_roles"][str(member.id)].append(role_id)
 
-        except Exception as e:
-            from bot import logger
+async def remove_role(operation: dict) -> None:
+    await plugin.app.rest.remove_role_from_member(
+        server, operation["member_id"], operation["role_id"], reason="Lockdown."
+    )
 
-            logger.error(f"Error removing roles from member {member.id}: {e}")
+
+executor = bulk_operations.BulkExecutor(
+    {
+        "edit_overwrite": edit_overwrite,
+        "create_message": create_message,
+        "remove_role": remove_role,
+    }
+)
 
 
 async def save_backup_to_file():
@@ -300,6 +346,34 @@ async def save_backup_to_file():
         print(f"An unexpected error occurred while saving the backup: {e}")
 
 
+def load_backup_from_file():
+    global backup_data_memory
+
+    with open(backup_file_path, "r") as file:
+        backup_data_memory = json.load(file)
+
+
+async def prepare_job(reason) -> bulk_operations.BulkJob:
+    """
+    Backs up the server and plans the lockdown.
+    The backup is saved before anything is changed, so an interrupted lockdown can still be undone.
+    """
+    await create_backup()
+
+    channel_operations = await plan_channels(reason)
+    member_operations, removed_roles = await plan_members()
+
+    backup_data_memory["removed_roles"] = removed_roles
+    backup_data_memory["messages"] = {}
+    await save_backup_to_file()
+
+    job = bulk_operations.BulkJob(
+        job_file_path, "lockdown", channel_operations + member_operations
+    )
+    job.save()
+    return job
+
+
 @plugin.command
 @lightbulb.add_cooldown(3, 3, lightbulb.UserBucket)
 @lightbulb.app_command_permissions(hikari.Permissions.ADMINISTRATOR, dm_enabled=False)
@@ -316,20 +390,44 @@ async def lockdown_command(ctx: lightbulb.SlashContext, reason: str):
         await ctx.respond("Only Darkyl is allowed to do this.")
         return
 
-    message = await ctx.respond("Creating backup...")
-
-    await create_backup()
-
-    await message.edit("Going into lockdown...")
+    job = bulk_operations.BulkJob.load(job_file_path)
+    if job is not None:
+        # An earlier lockdown was interrupted, the server is already partly locked
+        message = await ctx.respond("Resuming the interrupted lockdown...")
+        load_backup_from_file()
+    else:
+        message = await ctx.respond("Creating backup...")
+        job = await prepare_job(reason)
 
-    await lockdown_channels(reason)
+    async def on_progress(done: int, failed: int, total: int) -> None:
+        await message.edit(f"Going into lockdown... {done}/{total} done")
 
-    await lockdown_members()
+    await executor.run(job, on_progress)
 
+    # Remember the lockdown messages, so unlocking can delete them
+    backup_data_memory.setdefault("messages", {}).update(
+        {
+            key.split(":")[1]: message_id
+            for key, message_id in job.results.items()
+            if key.startswith("message:")
+        }
+    )
     await save_backup_to_file()
 
     vars.lockdown = True
 
+    if job.failed:
+        from bot import logger
+
+        for key, error in job.failed.items():
+            logger.error(f"Error during lockdown ({key}): {error}")
+
+        await message.edit(
+            f"Server locked, but {len(job.failed)} of {job.total} changes failed. Run /lockdown again to retry them."
+        )
+        return
+
+    job.delete()
     await message.edit("Server locked.")
 
 
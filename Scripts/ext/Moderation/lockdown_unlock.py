@@ -18,6 +18,7 @@ import os
 
 import aiohttp
 import bot_utils as utils
+import bulk_operations
 import config_reader as config
 import hikari
 import lightbulb
@@ -34,159 +35,180 @@ server = config.Bot.server
 
 backup_path = os.path.join(config.Paths.data_folder, "Server Backups")
 backup_file_path = os.path.join(backup_path, f"{server}_server_backup.json")
+job_file_path = os.path.join(backup_path, f"{server}_unlock_job.json")
+lockdown_job_file_path = os.path.join(backup_path, f"{server}_lockdown_job.json")
 
 
-def load_backup_channels():
+def load_backup():
     with open(backup_file_path, "r") as file:
-        backup_data = json.load(file)
+        return json.load(file)
+
+
+def interrupted_lockdown_messages() -> dict:
+    """
+    Returns the lockdown messages an interrupted lockdown already posted
+
+    Returns:
+        dict: {channel_id: message_id}
+    """
+    job = bulk_operations.BulkJob.load(lockdown_job_file_path)
+    if job is None:
+        return {}
+    return {
+        key.split(":")[1]: message_id
+        for key, message_id in job.results.items()
+        if key.startswith("message:")
+    }
 
-    reconstructed_data = []
 
-    for channel in backup_data["channels"]:
-        # Reconstruct permission overwrites with explicit type mapping
-        reconstructed_overwrites = []
-        for overwrite in channel["permission_overwrites"]:
-            if overwrite["type"] == "ROLE":
-                permission_type = PermissionOverwriteType.ROLE
-            elif overwrite["type"] == "MEMBER":
-                permission_type = PermissionOverwriteType.MEMBER
-            else:
-                raise ValueError(
-                    f"Unexpected permission overwrite type: {overwrite['type']}"
-                )
-
-            reconstructed_overwrites.append(
-                PermissionOverwrite(
-                    id=overwrite["id"],
-                    type=permission_type,
-                    allow=Permissions(overwrite["allow"]),
-                    deny=Permissions(overwrite["deny"]),
-                )
+def reconstruct_overwrites(overwrites: list) -> list:
+    # Reconstruct permission overwrites with explicit type mapping
+    reconstructed_overwrites = []
+    for overwrite in overwrites:
+        if overwrite["type"] == "ROLE":
+            permission_type = PermissionOverwriteType.ROLE
+        elif overwrite["type"] == "MEMBER":
+            permission_type = PermissionOverwriteType.MEMBER
+        else:
+            raise ValueError(
+                f"Unexpected permission overwrite type: {overwrite['type']}"
             )
 
-        # Append the reconstructed channel data
-        reconstructed_data.append(
-            {
-                "id": channel["id"],
-                "name": channel["name"],
-                "type": channel["type"],
-                "parent_id": channel["parent_id"],
-                "permission_overwrites": reconstructed_overwrites,
-            }
+        reconstructed_overwrites.append(
+            PermissionOverwrite(
+                id=overwrite["id"],
+                type=permission_type,
+                allow=Permissions(overwrite["allow"]),
+                deny=Permissions(overwrite["deny"]),
+            )
         )
-
-    print("Backup loaded successfully!")
-    return reconstructed_data
+    return reconstructed_overwrites
 
 
-async def apply_backup_data_channels(reconstructed_data: list):
+def plan_restore(backup_data: dict) -> list:
+    """
+    Plans restoring the channels and roles and deleting the lockdown messages
 
-    channel_id_map = {
-        channel_data["id"]: channel_data for channel_data in reconstructed_data
-    }
+    Returns:
+        list: The operations
+    """
+    operations = []
 
-    for channel_data in reconstructed_data:
-        try:
-            channel = await plugin.app.rest.fetch_channel(channel_data["id"])
-        except hikari.NotFoundError:
-            channel = None
-
-        permission_overwrites = [
-            hikari.PermissionOverwrite(
-                id=overwrite.id,
-                type=overwrite.type,
-                allow=overwrite.allow,
-                deny=overwrite.deny,
-            )
-            for overwrite in channel_data["permission_overwrites"]
-        ]
+    channel_id_map = {channel["id"]: channel for channel in backup_data["channels"]}
 
+    for channel in backup_data["channels"]:
         # Check if parent_id exists and if it's valid
         category = None
-        if "parent_id" in channel_data:
-            parent_channel_data = channel_id_map.get(channel_data["parent_id"])
-            if parent_channel_data and parent_channel_data["type"] == "GUILD_CATEGORY":
-                category = parent_channel_data["id"]
-
-        if channel:
-            await plugin.app.rest.edit_channel(
-                channel.id,
-                name=channel_data["name"],
-                permission_overwrites=permission_overwrites,
-                parent_category=category,
-            )
-        else:
-            # Create channel based on type
-            if channel_data["type"] == "GUILD_TEXT":
-                await plugin.app.rest.create_guild_text_channel(
-                    server,
-                    name=channel_data["name"],
-                    permission_overwrites=permission_overwrites,
-                    category=category,
-                )
-            elif channel_data["type"] == "GUILD_VOICE":
-                await plugin.app.rest.create_guild_voice_channel(
-                    server,
-                    name=channel_data["name"],
-                    permission_overwrites=permission_overwrites,
-                    category=category,
-                )
-            elif channel_data["type"] == "GUILD_CATEGORY":
-                await plugin.app.rest.create_guild_category(
-                    server,
-                    name=channel_data["name"],
-                    permission_overwrites=permission_overwrites,
-                )
-
-    print("Backup data applied successfully!")
-
-
-async def apply_backup_data_roles():
-    with open(backup_file_path, "r") as file:
-        data = json.load(file)
+        parent_channel_data = channel_id_map.get(channel.get("parent_id"))
+        if parent_channel_data and parent_channel_data["type"] == "GUILD_CATEGORY":
+            category = parent_channel_data["id"]
 
-    # Extract the removed roles data
-    removed_roles = data.get("removed_roles", {})
+        operations.append(
+            {
+                "key": f"channel:{channel['id']}",
+                "action": "restore_channel",
+                "bucket": f"channel:{channel['id']}",
+                "channel": channel,
+                "category": category,
+            }
+        )
 
-    for user_id, role_ids in removed_roles.items():
+    for user_id, role_ids in backup_data.get("removed_roles", {}).items():
         for role_id in role_ids:
-            try:
-                await plugin.app.rest.add_role_to_member(
-                    server, user_id, role_id, reason="Restoring from lockdown."
-                )
-            except Exception as e:
-                from bot import logger
+            operations.append(
+                {
+                    "key": f"role:{user_id}:{role_id}",
+                    "action": "add_role",
+                    "bucket": f"member:{user_id}",
+                    "user_id": int(user_id),
+                    "role_id": role_id,
+                }
+            )
 
-                logger.error(f"Error adding role {role_id} to user {user_id}: {e}")
+    for channel_id, message_id in backup_data.get("messages", {}).items():
+        operations.append(
+            {
+                "key": f"message:{channel_id}",
+                "action": "delete_message",
+                # After the channel is restored, so members can't write in between
+                "bucket": f"channel:{channel_id}",
+                "channel_id": int(channel_id),
+                "message_id": message_id,
+            }
+        )
+
+    return operations
 
 
-async def clean_up_messages():
+async def restore_channel(operation: dict) -> None:
+    channel_data = operation["channel"]
+    category = operation["category"]
+    permission_overwrites = reconstruct_overwrites(
+        channel_data["permission_overwrites"]
+    )
+
     try:
-        with open(backup_file_path, "r") as f:
-            data = json.load(f)
-    except FileNotFoundError:
-        print(f"Error: The file at {backup_file_path} was not found.")
-        return
-    except json.JSONDecodeError:
-        print("Error: Failed to decode JSON from the backup file.")
-        return
+        channel = await plugin.app.rest.fetch_channel(channel_data["id"])
+    except hikari.NotFoundError:
+        channel = None
+
+    if channel:
+        await plugin.app.rest.edit_channel(
+            channel.id,
+            name=channel_data["name"],
+            permission_overwrites=permission_overwrites,
+            parent_category=category,
+        )
+    else:
+        # Create channel based on type
+        if channel_data["type"] == "GUILD_TEXT":
+            await plugin.app.rest.create_guild_text_channel(
+                server,
+                name=channel_data["name"],
+                permission_overwrites=permission_overwrites,
+                category=category,
+            )
+        elif channel_data["type"] == "GUILD_VOICE":
+            await plugin.app.rest.create_guild_voice_channel(
+                server,
+                name=channel_data["name"],
+                permission_overwrites=permission_overwrites,
+                category=category,
+            )
+        elif channel_data["type"] == "GUILD_CATEGORY":
+            await plugin.app.rest.create_guild_category(
+                server,
+                name=channel_data["name"],
+                permission_overwrites=permission_overwrites,
+            )
 
-    messages = data.get("messages", {})
-    if not messages:
-        print("No messages found in the backup data.")
-        return
 
-    for channel_id, message_id in messages.items():
-        try:
-            await plugin.app.rest.delete_message(channel_id, message_id)
-        except Exception as e:
-            from bot import logger
+async def add_role(operation: dict) -> None:
+    await plugin.app.rest.add_role_to_member(
+        server,
+        operation["user_id"],
+        operation["role_id"],
+        reason="Restoring from lockdown.",
+    )
 
-            logger.error(
-                f"Error deleting message {message_id} in channel {channel_id}: {e}"
-            )
 
-    print("Message cleanup completed.")
+async def delete_message(operation: dict) -> None:
+    try:
+        await plugin.app.rest.delete_message(
+            operation["channel_id"], operation["message_id"]
+        )
+    except hikari.NotFoundError:
+        # Already deleted
+        pass
+
+
+executor = bulk_operations.BulkExecutor(
+    {
+        "restore_channel": restore_channel,
+        "add_role": add_role,
+        "delete_message": delete_message,
+    }
+)
 
 
 @plugin.command
@@ -202,17 +224,44 @@ async def lockdown_command(ctx: lightbulb.SlashContext):
         await ctx.respond("Only Darkyl is allowed to do this.")
         return
 
-    message = await ctx.respond("Restoring...")
+    job = bulk_operations.BulkJob.load(job_file_path)
+    if job is not None:
+        message = await ctx.respond("Resuming the interrupted restore...")
+    else:
+        message = await ctx.respond("Restoring...")
+        try:
+            backup_data = load_backup()
+        except FileNotFoundError:
+            await message.edit("There is no backup to restore.")
+            return
+        backup_data.setdefault("messages", {}).update(interrupted_lockdown_messages())
+        job = bulk_operations.BulkJob(
+            job_file_path, "unlock", plan_restore(backup_data)
+        )
 
-    reconstructed_data = load_backup_channels()
-    await apply_backup_data_channels(reconstructed_data)
+    # An interrupted lockdown must not be resumed after unlocking
+    if os.path.exists(lockdown_job_file_path):
+        os.remove(lockdown_job_file_path)
 
-    await apply_backup_data_roles()
+    async def on_progress(done: int, failed: int, total: int) -> None:
+        await message.edit(f"Restoring... {done}/{total} done")
 
-    await clean_up_messages()
+    await executor.run(job, on_progress)
 
     vars.lockdown = False
 
+    if job.failed:
+        from bot import logger
+
+        for key, error in job.failed.items():
+            logger.error(f"Error while restoring from lockdown ({key}): {error}")
+
+        await message.edit(
+            f"Restored, but {len(job.failed)} of {job.total} changes failed. Run /unlock again to retry them."
+        )
+        return
+
+    job.delete()
     await message.edit("Restoring successful.")
 
 
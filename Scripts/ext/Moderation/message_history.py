@@ -41,7 +41,7 @@ async def message_history_command(ctx: lightbulb.SlashContext, message_id: int)
     if not await utils.validate_command(ctx):
         return
 
-    result = db.Messages.get_message_entry(message_id)
+    result = await db.Messages.get_message_entry(message_id)
 
     if result is None:
         await ctx.respond(
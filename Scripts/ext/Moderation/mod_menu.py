@@ -13,16 +13,15 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see https://www.gnu.org/licenses/.
 
-import json
 import os
 from datetime import datetime, timezone
 
 import bot_utils as utils
 import buttons
-import config_reader as config
 import database_interaction
 import dateutil
 import dateutil.parser
+import document_store
 import hikari
 import hikari.errors
 import image_manager
@@ -90,10 +89,10 @@ async def mod_menu_command(ctx: lightbulb.SlashContext, user: hikari.User):
         value=f"Until: {utils.format_dt(user.communication_disabled_until()) if user.communication_disabled_until() is not None else '-'}",
     )
 
-    stats = database_interaction.Users.get_user_entry(user_id=user.id)
+    stats = await database_interaction.Users.get_user_entry(user_id=user.id)
 
     if stats:
-        (id, msg_count, xp, level, cmds_used, reported, been_reported, nsfw_opt_out) = (
+        id, msg_count, xp, level, cmds_used, reported, been_reported, nsfw_opt_out = (
             stats
         )
 
@@ -111,61 +110,42 @@ async def mod_menu_command(ctx: lightbulb.SlashContext, user: hikari.User):
     roles = ", ".join(roles_list) if roles_list else "`-`"
     embed.add_field("**• Roles:**", value=f"{roles}")
 
-    warnings_file = os.path.join(config.Paths.data_folder, "Database", "warnings.json")
-
-    if os.path.exists(warnings_file):
-        with open(warnings_file, "r") as file:
-            warnings_data = json.load(file)
-            user_warnings = warnings_data.get(str(user.id), [])
-            if user_warnings:
-                warnings_text = "\n\n".join(
-                    [f"`{warning}`" for warning in user_warnings]
-                )
-                embed.add_field("**• Warnings:**", value=warnings_text)
-            else:
-                embed.add_field("**• Warnings:**", value="No warnings")
+    user_warnings = await document_store.warnings.get(user.id, [])
+    if user_warnings:
+        warnings_text = "\n\n".join([f"`{warning}`" for warning in user_warnings])
+        embed.add_field("**• Warnings:**", value=warnings_text)
     else:
-        embed.add_field("**• Warnings:**", value="Couldn't find the warnings database.")
+        embed.add_field("**• Warnings:**", value="No warnings")
 
     if stats:
         embed.add_field("**• Reported user:**", value=reported)
         embed.add_field("**• Been reported:**", value=been_reported)
 
-    reports_file = os.path.join(config.Paths.data_folder, "Database", "reports.json")
-
-    if os.path.exists(reports_file):
-        with open(reports_file, "r") as file:
-            reports_data = json.load(file)
-            user_reports = reports_data.get(str(user.id), {})
-            if user_reports:
-                reasons = user_reports.get("reasons", {})
-                if reasons:
-                    reasons_text = ""
-                    for reason, details in reasons.items():
-                        reporter = details.get("reporter")
-                        if reporter.isdigit():
-                            reporter_user = await ctx.app.rest.fetch_user(reporter)
-                            reporter_mention = f"{reporter_user.mention}"
-                        else:
-                            reporter_mention = reporter
-                        reasons_text += f"`{reason}`\nBy {reporter_mention}\n\n"
-                    embed.add_field(
-                        "**• Reports:**",
-                        value=reasons_text.strip() or "No reports for this user",
-                    )
-                else:
-                    embed.add_field("**• Reports:**", value="No reports for this user")
+    user_reports = await document_store.reports.get(user.id, {})
+    reasons = user_reports.get("reasons", {})
+    if reasons:
+        reasons_text = ""
+        for reason, details in reasons.items():
+            reporter = details.get("reporter")
+            if reporter.isdigit():
+                reporter_user = await ctx.app.rest.fetch_user(reporter)
+                reporter_mention = f"{reporter_user.mention}"
             else:
-                embed.add_field("**• Reports:**", value="No reports for this user")
+                reporter_mention = reporter
+            reasons_text += f"`{reason}`\nBy {reporter_mention}\n\n"
+        embed.add_field(
+            "**• Reports:**",
+            value=reasons_text.strip() or "No reports for this user",
+        )
     else:
-        embed.add_field("**• Reports:**", value="Couldn't find the reports database.")
+        embed.add_field("**• Reports:**", value="No reports for this user")
 
     if banner is not None:
         embed.set_image(user.banner_url)
 
     embeds = [embed]
 
-    all_messages = database_interaction.Messages.get_messages_by_author(user.id)
+    all_messages = await database_interaction.Messages.get_messages_by_author(user.id)
 
     if all_messages is not None:
 
@@ -232,7 +212,7 @@ async def mod_menu_command(ctx: lightbulb.SlashContext, user: hikari.User):
 
             embeds.append(msg_embed)
 
-    commands = database_interaction.Commands.get_commands_by_user(user.id)
+    commands = await database_interaction.Commands.get_commands_by_user(user.id)
 
     if commands is not None:
         commands.sort(key=lambda m: datetime.fromisoformat(m["used_at"]))
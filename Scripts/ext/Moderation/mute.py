@@ -13,18 +13,48 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see https://www.gnu.org/licenses/.
 
+import time
+
 import bot_utils as utils
 import config_reader as config
+import expiry_service
 import hikari
+import hikari.errors
 import lightbulb
 
 plugin = lightbulb.Plugin("mute", "Handles muting and umuting a member")
 plugin.add_checks(lightbulb.has_role_permissions(hikari.Permissions.MODERATE_MEMBERS))
 
 
+async def unmute(guild_id: int, user_id: int, data: dict) -> None:
+    """
+    Lifts a timed mute, called by the expiry service when it runs out
+    """
+    try:
+        await plugin.app.rest.remove_role_from_member(
+            guild_id, user_id, config.Bot.muted_role, reason="Mute expired"
+        )
+        await plugin.app.rest.add_role_to_member(
+            guild_id, user_id, config.Bot.verified_role, reason="Mute expired"
+        )
+    except hikari.errors.NotFoundError:
+        # The user left the server
+        pass
+
+
+expiry_service.service.register("mute", unmute)
+
+
 @plugin.command()
 @lightbulb.add_cooldown(3, 3, lightbulb.UserBucket)
 @lightbulb.option("user", "The user you want to mute", hikari.Member, required=True)
+@lightbulb.option(
+    "duration",
+    "How long should the mute last? (e.g., 2d3h) Leave empty to mute until unmuted.",
+    str,
+    required=False,
+    default=None,
+)
 @lightbulb.app_command_permissions(
     hikari.Permissions.MODERATE_MEMBERS, dm_enabled=False
 )
@@ -32,10 +62,21 @@ plugin.add_checks(lightbulb.has_role_permissions(hikari.Permissions.MODERATE_MEM
     "mute", "Mute a user.", auto_defer=True, pass_options=True, ephemeral=True
 )
 @lightbulb.implements(lightbulb.SlashCommand)
-async def mute_command(ctx: lightbulb.SlashContext, user: hikari.Member) -> None:
+async def mute_command(
+    ctx: lightbulb.SlashContext, user: hikari.Member, duration: str
+) -> None:
     if not await utils.validate_command(ctx):
         return
 
+    mute_duration = None
+    if duration:
+        mute_duration = utils.parse_duration(duration)
+        if mute_duration is None:
+            await ctx.respond(
+                "Invalid duration format. Please use a format like '2d3h'."
+            )
+            return
+
     muted_role = config.Bot.muted_role
     verified_role = config.Bot.verified_role
 
@@ -47,6 +88,17 @@ async def mute_command(ctx: lightbulb.SlashContext, user: hikari.Member) -> None
 
     await user.add_role(muted_role, reason=f"Muted by {ctx.author.username}")
     await user.remove_role(verified_role, reason=f"Muted by {ctx.author.username}")
+
+    if mute_duration:
+        expires_at = time.time() + mute_duration
+        await expiry_service.service.schedule("mute", ctx.guild_id, user.id, expires_at)
+        await ctx.respond(
+            f"{user.mention} has been muted until <t:{int(expires_at)}:R>."
+        )
+        return
+
+    # A permanent mute must not be lifted by an earlier timed mute running out
+    await expiry_service.service.cancel("mute", ctx.guild_id, user.id)
     await ctx.respond(f"{user.mention} has been muted.")
 
 
@@ -69,6 +121,9 @@ async def unmute_command(ctx: lightbulb.SlashContext, user: hikari.Member) -> No
 
     roles = await user.fetch_roles()
 
+    # A timed mute must not run out after the user was unmuted
+    await expiry_service.service.cancel("mute", ctx.guild_id, user.id)
+
     if any(role.id == muted_role for role in roles):
         await user.remove_role(muted_role, reason=f"Unmuted by {ctx.author.username}")
         await user.add_role(verified_role, reason=f"Unmuted by {ctx.author.username}")
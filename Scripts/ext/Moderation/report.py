@@ -13,13 +13,11 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see https://www.gnu.org/licenses/.
 
-import json
-import os
-
 import bot_utils as utils
 import buttons
 import config_reader as config
 import database_interaction
+import document_store
 import hikari
 import hikari.errors
 import lightbulb
@@ -96,31 +94,19 @@ async def report_command(ctx: lightbulb.SlashContext):
             flags=hikari.MessageFlag.EPHEMERAL,
         )
 
-        database_path = os.path.join(
-            config.Paths.data_folder, "Database", "reports.json"
-        )
-        report_data = {}
-
-        if os.path.exists(database_path) and os.path.getsize(database_path) > 0:
-            with open(database_path, "r") as file:
-                try:
-                    report_data = json.load(file)
-                except json.JSONDecodeError:
-                    pass
-
         user_id = str(user.id)
-        if user_id not in report_data:
-            report_data[user_id] = {"reasons": {}}
 
-        report_data[user_id]["reasons"][reason] = {
-            "reporter": str(ctx.author.id),
-            "report_message": message.id,
-        }
+        def add_report(report):
+            report = report or {"reasons": {}}
+            report["reasons"][reason] = {
+                "reporter": str(ctx.author.id),
+                "report_message": message.id,
+            }
+            return report
 
-        with open(database_path, "w") as file:
-            json.dump(report_data, file, indent=4)
+        await document_store.reports.update(user_id, add_report)
 
-        database_interaction.Users.update_user_entry(
+        await database_interaction.Users.update_user_entry(
             user_id, increment=True, been_reported=1
         )
 
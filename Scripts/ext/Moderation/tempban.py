@@ -13,14 +13,10 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see https://www.gnu.org/licenses/.
 
-import asyncio
-import json
-import os
-import re
-from datetime import datetime, timedelta, timezone
+import time
 
 import bot_utils as utils
-import config_reader as config
+import expiry_service
 import hikari
 import hikari.errors
 import lightbulb
@@ -28,46 +24,19 @@ import lightbulb
 plugin = lightbulb.Plugin("TempBan", "Bans a user temporarily")
 plugin.add_checks(lightbulb.has_role_permissions(hikari.Permissions.BAN_MEMBERS))
 
-BAN_DATA_FILE = os.path.join(config.Paths.data_folder, "Database", "bans.json")
-
-
-def load_ban_data():
-    if os.path.exists(BAN_DATA_FILE):
-        with open(BAN_DATA_FILE, "r") as f:
-            try:
-                return json.load(f)
-            except json.JSONDecodeError:
-                return {}
-    return {}
-
-
-def save_ban_data(data):
-    with open(BAN_DATA_FILE, "w") as f:
-        json.dump(data, f, indent=4)
 
+async def unban(guild_id: int, user_id: int, data: dict) -> None:
+    """
+    Lifts a tempban, called by the expiry service when it runs out
+    """
+    try:
+        await plugin.bot.application.app.rest.unban_user(guild=guild_id, user=user_id)
+    except (hikari.errors.ForbiddenError, hikari.errors.NotFoundError):
+        # No permission to unban the user, or the user was already unbanned
+        pass
 
-async def load_active_bans():
-    ban_data = load_ban_data()
-    current_time = datetime.now(timezone.utc).timestamp()
-    tasks = []
-    for guild_id, bans in ban_data.items():
-        for user_id, ban_info in bans.items():
-            unban_time = ban_info["unban_time"]
-            if unban_time > current_time:
-                duration = unban_time - current_time
-                tasks.append(schedule_unban(int(guild_id), int(user_id), duration))
-            else:
-                try:
-                    await plugin.bot.application.app.rest.unban_user(
-                        guild=int(guild_id), user=int(user_id)
-                    )
-                except hikari.errors.ForbiddenError:
-                    pass
-                except Exception as e:
-                    from bot import logger
 
-                    logger.error(f"An error occurred while unbanning the user: {e}")
-    await asyncio.gather(*tasks)
+expiry_service.service.register("tempban", unban)
 
 
 @plugin.command
@@ -142,7 +111,7 @@ async def tempban_command(
         }
 
         message_timer = time_durations.get(delete_messages, 0)
-        ban_duration = parse_duration(duration)
+        ban_duration = utils.parse_duration(duration)
 
         if ban_duration is None:
             await ctx.respond(
@@ -169,19 +138,10 @@ async def tempban_command(
             "User has been banned successfully.", flags=hikari.MessageFlag.EPHEMERAL
         )
 
-        # Save ban data
-        ban_data = load_ban_data()
-        if str(ctx.guild_id) not in ban_data:
-            ban_data[str(ctx.guild_id)] = {}
-        ban_data[str(ctx.guild_id)][str(user.id)] = {
-            "unban_time": (
-                datetime.utcnow() + timedelta(seconds=ban_duration)
-            ).timestamp()
-        }
-        save_ban_data(ban_data)
-
         # Schedule the unban
-        await schedule_unban(ctx.guild_id, user.id, ban_duration)
+        await expiry_service.service.schedule(
+            "tempban", ctx.guild_id, user.id, time.time() + ban_duration
+        )
 
     except KeyError:
         await ctx.respond(
@@ -197,91 +157,6 @@ async def tempban_command(
         )
 
 
-def parse_duration(duration: str) -> int:
-    """
-    Parses a duration string (e.g., '1y2d3h29m2s') and returns the total duration in seconds.
-
-    Args:
-        duration (str): The duration string to parse.
-
-    Returns:
-        int: The total duration in seconds.
-    """
-    time_units = {
-        "y": 31536000,  # years
-        "d": 86400,  # days
-        "h": 3600,  # hours
-        "m": 60,  # minutes
-        "s": 1,  # seconds
-    }
-
-    total_seconds = 0
-    matches = re.findall(r"(\d+)([ydhms])", duration)
-    for value, unit in matches:
-        if unit in time_units:
-            total_seconds += int(value) * time_units[unit]
-        else:
-            return None
-
-    return total_seconds if total_seconds > 0 else None
-
-
-async def schedule_unban(guild_id, user_id, duration):
-    await asyncio.sleep(duration)
-    try:
-        await plugin.bot.application.app.rest.unban_user(guild=guild_id, user=user_id)
-        # Remove the ban entry from the data file
-        ban_data = load_ban_data()
-        if str(guild_id) in ban_data and str(user_id) in ban_data[str(guild_id)]:
-            del ban_data[str(guild_id)][str(user_id)]
-            if not ban_data[str(guild_id)]:
-                del ban_data[str(guild_id)]
-            save_ban_data(ban_data)
-    except hikari.errors.ForbiddenError:
-        # Handle the case where the bot does not have permission to unban the user
-        pass
-    except Exception as e:
-        from bot import logger
-
-        logger.error(f"An error occurred while unbanning the user: {e}")
-
-
-@plugin.listener(hikari.StartedEvent)
-async def on_started(event):
-    ban_data = load_ban_data()
-    current_time = datetime.now(timezone.utc).timestamp()
-    tasks = []
-
-    for guild_id, bans in ban_data.items():
-        for user_id, ban_info in bans.items():
-            unban_time = ban_info["unban_time"]
-            if unban_time > current_time:
-                duration = unban_time - current_time
-                tasks.append(schedule_unban(int(guild_id), int(user_id), duration))
-            else:
-                try:
-                    await plugin.bot.application.app.rest.unban_user(
-                        guild=int(guild_id), user=int(user_id)
-                    )
-                    # Remove the ban entry from the data file
-                    if (
-                        str(guild_id) in ban_data
-                        and str(user_id) in ban_data[str(guild_id)]
-                    ):
-                        del ban_data[str(guild_id)][str(user_id)]
-                        if not ban_data[str(guild_id)]:
-                            del ban_data[str(guild_id)]
-                        save_ban_data(ban_data)
-                except hikari.errors.ForbiddenError:
-                    pass
-                except Exception as e:
-                    from bot import logger
-
-                    logger.error(f"An error occurred while unbanning the user: {e}")
-
-    await asyncio.gather(*tasks)
-
-
 def load(bot):
     bot.add_plugin(plugin)
 
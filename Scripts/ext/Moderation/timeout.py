@@ -17,6 +17,7 @@ import datetime
 
 import bot_utils as utils
 import config_reader as config
+import expiry_service
 import hikari
 import hikari.errors
 import lightbulb
@@ -25,6 +26,19 @@ plugin = lightbulb.Plugin("timeout", "Timeout a user")
 plugin.add_checks(lightbulb.has_role_permissions(hikari.Permissions.MODERATE_MEMBERS))
 
 
+async def timeout_ended(guild_id: int, user_id: int, data: dict) -> None:
+    """
+    Logs the end of a timeout, called by the expiry service.
+    Discord lifts the timeout itself.
+    """
+    from bot import Logging
+
+    await Logging.log_message(f"The timeout of <@{user_id}> has ended.")
+
+
+expiry_service.service.register("timeout", timeout_ended)
+
+
 @plugin.command()
 @lightbulb.add_cooldown(3, 3, lightbulb.UserBucket)
 @lightbulb.app_command_permissions(
@@ -114,6 +128,18 @@ async def timeout_command(
         )
         return
 
+    try:
+        if then > now:
+            await expiry_service.service.schedule(
+                "timeout", ctx.guild_id, user.id, then.timestamp()
+            )
+        else:
+            await expiry_service.service.cancel("timeout", ctx.guild_id, user.id)
+    except Exception as e:
+        from bot import logger
+
+        logger.error(f"Error while scheduling the end of a timeout: {e}")
+
     try:
         if days == 0 and hours == 0 and minutes == 0 and seconds == 0:
             await ctx.respond(
@@ -1,8 +1,5 @@
-import json
-import os
-
 import bot_utils as utils
-import config_reader as config
+import document_store
 import hikari
 import hikari.errors
 import lightbulb
@@ -29,34 +26,18 @@ async def warn_command(
     Processing:
         Retrieve provided information
         Fetch the user
-        Read the existing warnings
-        Add the new reason
-        Update the file
+        Add the new reason to the user's warnings
         Check if the user is to be banned or kicked
         Perform these actions, respond with success if not
     """
     try:
-        # Load existing data from the JSON file if it exists and is not empty
-        database_path = os.path.join(
-            config.Paths.data_folder, "Database", "warnings.json"
-        )
-        data = {}
-
-        if os.path.exists(database_path) and os.path.getsize(database_path) > 0:
-            with open(database_path, "r") as file:
-                data = json.load(file)
-
         user_id = str(user.id)
 
-        if user_id in data:
-            data[user_id].append(reason)
-        else:
-            data[user_id] = [reason]
-
-        with open(database_path, "w") as file:
-            json.dump(data, file, indent=4)
+        warnings = await document_store.warnings.update(
+            user_id, lambda reasons: (reasons or []) + [reason]
+        )
 
-        warnings_count = len(data.get(user_id, []))
+        warnings_count = len(warnings)
 
         if 2 < warnings_count < 4:
             await plugin.bot.rest.kick_user(
@@ -104,9 +85,7 @@ async def clear_warnings_command(ctx: lightbulb.SlashContext):
 
     Processing:
         It fetches the provided user
-        Reads the existing entries
         Deletes all warnings
-        Writes the updated file
         Responds
     """
 
@@ -120,29 +99,12 @@ async def clear_warnings_command(ctx: lightbulb.SlashContext):
 
         user_id = str(user.id)
 
-        database_path = os.path.join(
-            config.Paths.data_folder, "Database", "warnings.json"
-        )
-        if os.path.exists(database_path) and os.path.getsize(database_path) > 0:
-            with open(database_path, "r") as file:
-                try:
-                    data = json.load(file)
-                except json.JSONDecodeError:
-                    data = {}
-        else:
-            data = {}
-
-        if user_id in data:
-            del data[user_id]
-        else:
+        if not await document_store.warnings.delete(user_id):
             await ctx.respond(
                 f"{user.mention} has no warnings.", flags=hikari.MessageFlag.EPHEMERAL
             )
             return
 
-        with open(database_path, "w") as file:
-            json.dump(data, file, indent=4)
-
         await ctx.respond(
             f"Successfully removed all warnings for {user.username}",
             flags=hikari.MessageFlag.EPHEMERAL,
@@ -176,9 +138,7 @@ async def clear_warnings_command(ctx: lightbulb.SlashContext):
 
     Processing:
         It fetches the provided user
-        Reads the existing entries
         Deletes all warnings
-        Writes the updated file
         Responds
     """
 
@@ -189,30 +149,13 @@ async def clear_warnings_command(ctx: lightbulb.SlashContext):
 
     try:
 
-        database_path = os.path.join(
-            config.Paths.data_folder, "Database", "warnings.json"
-        )
-        if os.path.exists(database_path) and os.path.getsize(database_path) > 0:
-            with open(database_path, "r") as file:
-                try:
-                    data = json.load(file)
-                except json.JSONDecodeError:
-                    data = {}
-        else:
-            data = {}
-
-        if user_id in data:
-            del data[user_id]
-        else:
+        if not await document_store.warnings.delete(user_id):
             await ctx.respond(
                 f"The user '{user_id}' has no warnings.",
                 flags=hikari.MessageFlag.EPHEMERAL,
             )
             return
 
-        with open(database_path, "w") as file:
-            json.dump(data, file, indent=4)
-
         await ctx.respond(
             f"Successfully removed all warnings for '{user_id}'",
             flags=hikari.MessageFlag.EPHEMERAL,
@@ -1,32 +1,16 @@
 import os
 
+import audio_processing
 import bot_utils as utils
 import config_reader as config
 import hikari
 import lightbulb
-import numpy as np
-import soundfile as sf
-from scipy.fftpack import fft, ifft
 
 plugin = lightbulb.Plugin(
     "Music Spectral Rotation", "Rotate an audio file in the spectral domain."
 )
 
 
-def rotate_signal(signal, flip):
-    if flip:
-        signal = signal[::-1]
-
-    x = np.concatenate((signal, signal[1:][::-1]))
-    rotSig = ifft(x)
-    rotSig = np.real(rotSig[: len(rotSig) // 2 + 1])  # Extract real part
-
-    energy_ratio = np.sqrt(np.sum(np.abs(signal) ** 2) / np.sum(np.abs(rotSig) ** 2))
-    rotSig *= energy_ratio
-
-    return rotSig
-
-
 @plugin.command
 @lightbulb.add_cooldown(3, 3, lightbulb.UserBucket)
 @lightbulb.option("file", "The audio file to rotate", type=hikari.OptionType.ATTACHMENT)
@@ -66,41 +50,9 @@ async def spectral_rotation_command(
         await file.save(input_path)
 
         try:
-            signal, sample_rate = sf.read(input_path, dtype="float64")
-        except Exception as e:
-            from bot import logger
-
-            await ctx.respond(
-                f"Error while reading the audio file: {e}", ephemeral=True
-            )
-            logger.error(f"Error while reading the audio file: {e}")
-            return
-
-        if signal.ndim not in [1, 2]:
-            await ctx.respond(
-                "Only mono and stereo audio files are supported.", ephemeral=True
-            )
-            return
-
-        if signal.ndim == 1:
-            rot_signal = rotate_signal(signal, flip)
-        else:
-            rot_signal = np.column_stack(
-                (rotate_signal(signal[:, 0], flip), rotate_signal(signal[:, 1], flip))
-            )
-
-        sf.write(
-            output_path,
-            rot_signal.astype(np.float64),
-            sample_rate,
-            format="WAV",
-            subtype="FLOAT",
-        )
-
-        if (
-            os.path.getsize(output_path) > 25 * 1024 * 1024
-        ):  # Check if the file is larger than 25 MB
-            await ctx.respond("The rotated audio file is too large to send.")
+            await audio_processing.rotate_file_async(input_path, output_path, flip)
+        except audio_processing.AudioError as e:
+            await ctx.respond(str(e), ephemeral=True)
             return
 
         await ctx.respond(
@@ -13,12 +13,12 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see https://www.gnu.org/licenses/.
 
-import json
 import os
 
 import bot_utils as utils
 import buttons
 import config_reader as config
+import document_store
 import hikari
 import image_manager
 import lightbulb
@@ -67,7 +67,10 @@ async def confess_command(ctx: lightbulb.SlashContext, text: str, image: hikari.
             return
 
         image_path = await image_manager.download_image(
-            image.url, id, os.path.join(config.Paths.data_folder, "Downloaded Content")
+            image.url,
+            id,
+            os.path.join(config.Paths.data_folder, "Downloaded Content"),
+            cache=False,
         )
 
         if image_path is None:
@@ -103,24 +106,10 @@ async def confess_command(ctx: lightbulb.SlashContext, text: str, image: hikari.
         components=view,
     )
 
-    db_path = os.path.join(config.Paths.data_folder, "Database", "confessions.json")
-
-    if os.path.exists(db_path):
-        try:
-            with open(db_path, "r") as file:
-                confessions = json.load(file)
-        except json.JSONDecodeError:
-            confessions = {}
-    else:
-        confessions = {}
-
     if image_path is None:
         image_path = "None"
 
-    confessions[id] = [text, message.id, str(image_path)]
-
-    with open(db_path, "w") as file:
-        json.dump(confessions, file, indent=4)
+    await document_store.confessions.set(id, [text, message.id, str(image_path)])
 
     await ctx.respond(
         f"Your confession has been submitted with the ID *{id}*. A moderator will either approve or deny the confession. This may take a little time.",
@@ -17,10 +17,10 @@ import os
 import re
 from io import BytesIO
 
-import aiohttp
 import bot_utils as utils
 import config_reader as config
 import hikari
+import http_client
 import lightbulb
 import PIL
 import segno
@@ -120,7 +120,7 @@ async def qrcode_command(
 
         import image_manager
 
-        image = await image_manager.download_image(image.url, id)
+        image = await image_manager.download_image(image.url, id, cache=False)
 
         if image_extension == ".gif":
             # Gifs take longer, so some immediate feedback is probably nice
@@ -148,16 +148,19 @@ async def qrcode_command(
             )
             return
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(icon.url) as resp:
-                if resp.status == 200:
-                    icon_bytes = await resp.read()
-                    icon_img = Image.open(BytesIO(icon_bytes))
-                else:
-                    await ctx.respond(
-                        f"Couldn't download your icon. Error code: {resp.status}"
-                    )
-                    return
+        try:
+            resp = await http_client.fetch(
+                icon.url, read="bytes", endpoint="Discord CDN"
+            )
+        except http_client.REQUEST_ERRORS:
+            await ctx.respond("Couldn't download your icon. Please try again later.")
+            return
+
+        if resp.status == 200:
+            icon_img = Image.open(BytesIO(resp.data))
+        else:
+            await ctx.respond(f"Couldn't download your icon. Error code: {resp.status}")
+            return
 
     try:
         qrcode = await QRCode.generate_qrcode(
@@ -14,6 +14,7 @@
 # along with this program.  If not, see https://www.gnu.org/licenses/.
 
 import asyncio
+import heapq
 import re
 from datetime import datetime, timedelta
 
@@ -53,6 +54,129 @@ timezones = [
     "NZST",
 ]
 
+
+class ReminderScheduler:
+    """
+    Keeps the upcoming reminders in a min-heap ordered by their UTC due time
+    and sleeps exactly until the next one is due.
+
+    Only reminders due within the horizon are loaded, the rest are picked up
+    when the horizon is reached.
+    """
+
+    def __init__(self, horizon: timedelta = timedelta(hours=6)) -> None:
+        """
+        Args:
+            horizon (timedelta): How far ahead reminders are loaded into memory
+        """
+        self.horizon = horizon
+
+        self._heap = []  # [(due, id)]
+        self._reminders = {}  # {id: reminder}
+        self._delivering = set()
+        self._loaded_until = None
+        self._wakeup = asyncio.Event()
+        # Keeps reminders from being added or canceled while the heap is reloaded
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _due(reminder: dict) -> datetime:
+        due = datetime.fromisoformat(reminder["reminder_time"])
+        if due.tzinfo is None:
+            due = due.replace(tzinfo=pytz.utc)
+        return due.astimezone(pytz.utc)
+
+    def _push(self, reminder: dict) -> None:
+        self._reminders[reminder["id"]] = reminder
+        heapq.heappush(self._heap, (self._due(reminder), reminder["id"]))
+
+    async def _load(self) -> bool:
+        async with self._lock:
+            until = datetime.now(pytz.utc) + self.horizon
+            reminders = await db.Reminders.read_upcoming(until.isoformat())
+            if reminders is None:
+                return False
+
+            self._heap = []
+            self._reminders = {}
+            for reminder in reminders:
+                if reminder["id"] not in self._delivering:
+                    self._push(reminder)
+            self._loaded_until = until
+            return True
+
+    async def add(self, reminder: dict) -> None:
+        """
+        Schedules a newly created reminder
+        """
+        async with self._lock:
+            if self._loaded_until is None or self._due(reminder) >= self._loaded_until:
+                # Picked up by the next load
+                return
+
+            self._push(reminder)
+            self._wakeup.set()
+
+    async def cancel(self, reminder_id: str) -> None:
+        """
+        Unschedules a reminder, its heap entry is skipped when it comes up
+        """
+        async with self._lock:
+            self._reminders.pop(reminder_id, None)
+
+    async def _deliver(self, reminder: dict) -> None:
+        try:
+            await execute_reminder(reminder)
+            await db.Reminders.complete_reminder(reminder["id"])
+        except Exception as e:
+            from bot import logger
+
+            logger.error(f"Error while delivering reminder {reminder['id']}: {e}")
+        finally:
+            self._delivering.discard(reminder["id"])
+
+    async def run(self) -> None:
+        while True:
+            try:
+                now = datetime.now(pytz.utc)
+
+                if self._loaded_until is None or now >= self._loaded_until:
+                    if not await self._load():
+                        # Try again later
+                        await asyncio.sleep(15)
+                        continue
+
+                while self._heap and self._heap[0][0] <= now:
+                    _, reminder_id = heapq.heappop(self._heap)
+                    reminder = self._reminders.pop(reminder_id, None)
+                    if reminder is None:
+                        # Canceled
+                        continue
+
+                    self._delivering.add(reminder_id)
+                    asyncio.create_task(self._deliver(reminder))
+
+                next_wakeup = self._loaded_until
+                if self._heap:
+                    next_wakeup = min(next_wakeup, self._heap[0][0])
+
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(
+                        self._wakeup.wait(),
+                        timeout=max(0, (next_wakeup - now).total_seconds()),
+                    )
+                except asyncio.TimeoutError:
+                    pass
+            except Exception as e:
+                from bot import logger
+
+                logger.error(f"Error in the reminder scheduler: {e}")
+                await asyncio.sleep(15)
+
+
+scheduler = ReminderScheduler()
+
 time_formats = {
     r"(?:(\d+)d)?\s*(?:(\d+)h)?\s*(?:(\d+)m)?": "relative",  # e.g., "1d 2h 15m"
     r"(\d{1,2})\.(\d{1,2})\.(\d{2}|\d{4}) (\d{1,2}):(\d{2})": "absolute_24h",  # e.g., "24.07.2024 13:07"
@@ -150,7 +274,7 @@ async def set_reminder_command(
         )
         return
 
-    db.Reminders.create_entry(
+    created = await db.Reminders.create_entry(
         id=id,
         user_id=ctx.author.id,
         reminder_time=reminder_time_iso,
@@ -160,6 +284,23 @@ async def set_reminder_command(
         dm=dm,
     )
 
+    if not created:
+        await ctx.respond("An error occurred while saving your reminder.")
+        return
+
+    await scheduler.add(
+        {
+            "id": id,
+            "user_id": ctx.author.id,
+            "reminder_time": reminder_time_iso,
+            "message": message,
+            "channel_id": ctx.channel_id,
+            "timezone": timezone,
+            "status": 0,
+            "dm": int(dm),
+        }
+    )
+
     # await schedule_reminder(ctx, delay, message)
     await ctx.respond(
         f"Reminder set for {utils.format_dt(reminder_time, 'f')}: '{message}'"
@@ -179,7 +320,7 @@ async def list_reminders_command(ctx: lightbulb.SlashContext) -> None:
     if not await utils.validate_command(ctx):
         return
 
-    reminders = db.Reminders.read_reminders(ctx.author.id, active=True)
+    reminders = await db.Reminders.read_reminders(ctx.author.id, active=True)
 
     if reminders == []:
         await ctx.respond("No active reminders found.")
@@ -216,51 +357,15 @@ async def cancel_reminder_command(ctx: lightbulb.SlashContext, id: str) -> None:
     if not await utils.validate_command(ctx):
         return
 
-    result = db.Reminders.cancel_reminder(id)
+    result = await db.Reminders.cancel_reminder(id)
 
     if result:
+        await scheduler.cancel(id)
         await ctx.respond("Successfully deleted.")
     else:
         await ctx.respond("Couldn't delete your reminder. Double check the id.")
 
 
-async def check_reminders():
-    while True:
-        try:
-            now_utc = datetime.utcnow()
-            # now_utc_iso = now_utc.isoformat()
-
-            reminders = db.Reminders.read_reminders(active=True)
-
-            for reminder in reminders:
-                reminder_time_utc = datetime.fromisoformat(reminder["reminder_time"])
-
-                # Convert reminder_time from UTC to user’s timezone
-                user_timezone_str = reminder["timezone"]
-                try:
-                    user_timezone = pytz.timezone(user_timezone_str)
-                except pytz.UnknownTimeZoneError:
-                    continue
-
-                reminder_time_user_timezone = reminder_time_utc.replace(
-                    tzinfo=pytz.utc
-                ).astimezone(user_timezone)
-                now_user_timezone = now_utc.replace(tzinfo=pytz.utc).astimezone(
-                    user_timezone
-                )
-
-                if reminder_time_user_timezone <= now_user_timezone:
-                    await execute_reminder(reminder)
-
-                    db.Reminders.complete_reminder(reminder["id"])
-
-            await asyncio.sleep(15)
-        except Exception as e:
-            from bot import logger
-
-            logger.error(f"Error during check_reminders: {e}")
-
-
 async def execute_reminder(reminder):
     dm = bool(reminder["dm"])
 
@@ -310,7 +415,7 @@ async def wait_until_initialized():
 async def on_startup(event: hikari.StartedEvent):
     await wait_until_initialized()
 
-    asyncio.create_task(check_reminders())
+    asyncio.create_task(scheduler.run())
 
 
 def load(bot):
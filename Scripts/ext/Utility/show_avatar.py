@@ -16,6 +16,7 @@
 import bot_utils as utils
 import config_reader as config
 import hikari
+import image_manager
 import lightbulb
 
 plugin = lightbulb.Plugin(
@@ -41,9 +42,18 @@ async def show_avatar_command(ctx: lightbulb.SlashContext, target: hikari.User):
     if not await utils.validate_command(ctx):
         return
 
-    await ctx.respond(
-        f"Here is {target.mention}'s Avatar:", attachment=target.display_avatar_url
-    )
+    avatar_url = target.display_avatar_url
+
+    # Send the cached bytes if possible instead of letting hikari download the avatar again
+    avatar = await image_manager.fetch_image(avatar_url)
+    if avatar is not None:
+        attachment = hikari.Bytes(
+            avatar, str(avatar_url).split("?")[0].rsplit("/", 1)[-1]
+        )
+    else:
+        attachment = avatar_url
+
+    await ctx.respond(f"Here is {target.mention}'s Avatar:", attachment=attachment)
 
 
 def load(bot):
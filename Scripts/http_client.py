@@ -0,0 +1,436 @@
+# Copyright (C) 2024  Darkyl
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see https://www.gnu.org/licenses/.
+
+import asyncio
+import copy
+import random
+import time
+import typing as t
+from collections import OrderedDict
+from urllib.parse import urlsplit
+
+import aiohttp
+
+"""
+The HTTP client shared by the whole bot.
+
+Reusing one session keeps connections (and their TLS handshakes) alive
+between requests instead of opening a new connection for every download.
+
+Requests made with fetch() also get:
+
+    retries: Timeouts, connection errors and 5xx answers are retried with backoff
+    circuit breakers: After FAILURE_THRESHOLD failures in a row a host is
+        skipped for RESET_TIMEOUT seconds, fetch() raises CircuitOpenError
+        right away instead of waiting for another timeout
+    caching: Successful answers can be cached for cache_ttl seconds
+    metrics: The number of requests, errors and the latency per endpoint
+        (host and path without the query, unless the caller names it)
+
+All of it lives in an HttpClient, so a separate client can be pointed at a
+local stub server.
+"""
+
+# Default timeouts in seconds
+TIMEOUT = aiohttp.ClientTimeout(total=30, connect=10, sock_read=15)
+
+# Connection pool limits
+CONNECTION_LIMIT = 100
+CONNECTION_LIMIT_PER_HOST = 10
+
+# How often a failed request is repeated
+RETRIES = 1
+
+# Seconds before the first retry, doubled for every further one
+BACKOFF = 0.5
+
+# Failures in a row after which a host is skipped
+FAILURE_THRESHOLD = 5
+
+# Seconds a host is skipped before it is tried again
+RESET_TIMEOUT = 60
+
+# Most answers kept in the response cache
+CACHE_ENTRIES = 256
+
+READERS = ("json", "text", "bytes")
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised instead of sending a request to a host that keeps failing
+    """
+
+    def __init__(self, host: str, retry_in: float) -> None:
+        super().__init__(f"{host} is unavailable, retrying in {retry_in:.0f}s")
+        self.host = host
+        self.retry_in = retry_in
+
+
+# What fetch() raises when a request failed, for call sites that treat all of them alike
+REQUEST_ERRORS = (aiohttp.ClientError, asyncio.TimeoutError, CircuitOpenError)
+
+
+class Response(t.NamedTuple):
+    status: int
+    data: t.Any  # The parsed body, None if the status isn't 200
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        reset_timeout: float = RESET_TIMEOUT,
+    ) -> None:
+        """
+        Args:
+            failure_threshold (int): Failures in a row after which the circuit opens
+            reset_timeout (float): Seconds the circuit stays open before one request is let through
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def retry_in(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(self.reset_timeout - (time.monotonic() - self.opened_at), 0.0)
+
+    def allow(self) -> bool:
+        """
+        Returns if a request may be sent. While half-open, only one request at a time is let through.
+        """
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half-open" and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def release(self) -> None:
+        """
+        Lets the next request through after a request that neither succeeded nor failed, e.g. was cancelled
+        """
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = CACHE_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self._entries = (
+            OrderedDict()
+        )  # {key: (expires at, data)}, least recently used first
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Returns the cached data, None if there is none or it expired
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key, data, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class EndpointStats:
+    def __init__(self) -> None:
+        self.requests = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, milliseconds: float, error: bool) -> None:
+        self.requests += 1
+        self.errors += error
+        self.total_ms += milliseconds
+        self.max_ms = max(self.max_ms, milliseconds)
+
+
+class HttpClient:
+    def __init__(
+        self,
+        timeout: aiohttp.ClientTimeout = TIMEOUT,
+        limit: int = CONNECTION_LIMIT,
+        limit_per_host: int = CONNECTION_LIMIT_PER_HOST,
+        retries: int = RETRIES,
+        backoff: float = BACKOFF,
+        failure_threshold: int = FAILURE_THRESHOLD,
+        reset_timeout: float = RESET_TIMEOUT,
+        cache_entries: int = CACHE_ENTRIES,
+    ) -> None:
+        """
+        Args:
+            timeout (aiohttp.ClientTimeout): Default timeouts of all requests
+            limit (int): Most open connections
+            limit_per_host (int): Most open connections to one host
+            retries (int): How often a failed request is repeated by default
+            backoff (float): Seconds before the first retry, doubled for every further one
+            failure_threshold (int): Failures in a row after which a host is skipped
+            reset_timeout (float): Seconds a host is skipped
+            cache_entries (int): Most answers kept in the response cache
+        """
+        self.timeout = timeout
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.retries = retries
+        self.backoff = backoff
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.cache = ResponseCache(cache_entries)
+
+        self._session = None
+        self._breakers = {}  # {host: CircuitBreaker}
+        self._endpoints = {}  # {endpoint: EndpointStats}
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """
+        Returns the shared session, creating it on first use
+
+        Must be called from within the running event loop.
+        """
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=self.timeout,
+                connector=aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    ttl_dns_cache=300,
+                ),
+            )
+        return self._session
+
+    async def close(self) -> None:
+        """
+        Closes the shared session
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def breaker(self, host: str) -> CircuitBreaker:
+        breaker = self._breakers.get(host)
+        if breaker is None:
+            breaker = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            self._breakers[host] = breaker
+        return breaker
+
+    def _endpoint_stats(self, endpoint: str) -> EndpointStats:
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = EndpointStats()
+            self._endpoints[endpoint] = stats
+        return stats
+
+    async def _send(self, method: str, url: str, params, read: str, **kwargs):
+        async with self.get_session().request(
+            method, url, params=params, **kwargs
+        ) as response:
+            if response.status != 200:
+                return Response(response.status, None)
+            if read == "json":
+                # Some APIs don't send application/json
+                data = await response.json(content_type=None)
+            elif read == "text":
+                data = await response.text()
+            else:
+                data = await response.read()
+            return Response(response.status, data)
+
+    async def fetch(
+        self,
+        url: str,
+        *,
+        method: str = "GET",
+        params: dict = None,
+        read: str = "json",
+        cache_ttl: float = None,
+        retries: int = None,
+        endpoint: str = None,
+        **kwargs,
+    ) -> Response:
+        """
+        Sends a request through the circuit breaker of its host
+
+        Args:
+            url (str): The url
+            method (str): The HTTP method, only GET requests are retried
+            params (dict): Query parameters
+            read (str): How the body is read, one of "json", "text" and "bytes"
+            cache_ttl (float): Seconds a successful answer is cached, None to not cache it
+            retries (int): How often the request is repeated after a failure, the client's default if None
+            endpoint (str): The name of the request in the metrics, host and path if None
+            **kwargs: Passed on to aiohttp, e.g. timeout or headers
+        Returns:
+            Response: The status and the body, the body is None if the status isn't 200
+        Raises:
+            CircuitOpenError: If the host failed too often recently
+            aiohttp.ClientError, asyncio.TimeoutError: If the last try failed
+        """
+        if read not in READERS:
+            raise ValueError(f"Unknown reader '{read}', expected one of {READERS}")
+
+        parts = urlsplit(url)
+        host = parts.netloc
+        stats = self._endpoint_stats(endpoint or host + parts.path)
+
+        cache_key = None
+        if cache_ttl is not None and method == "GET":
+            cache_key = (url, tuple(sorted((params or {}).items())), read)
+            data = self.cache.get(cache_key)
+            if data is not None:
+                stats.cache_hits += 1
+                return Response(200, copy.deepcopy(data))
+
+        breaker = self.breaker(host)
+        if retries is None:
+            retries = self.retries
+        if method != "GET":
+            retries = 0
+
+        for attempt in range(retries + 1):
+            if not breaker.allow():
+                raise CircuitOpenError(host, breaker.retry_in())
+
+            start = time.perf_counter()
+            try:
+                response = await self._send(method, url, params, read, **kwargs)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                stats.record((time.perf_counter() - start) * 1000, error=True)
+                breaker.record_failure()
+                if attempt == retries:
+                    raise
+            except BaseException:
+                # The host answered, but the body couldn't be parsed or the command was cancelled
+                stats.record((time.perf_counter() - start) * 1000, error=True)
+                breaker.release()
+                raise
+            else:
+                failed = response.status >= 500
+                stats.record((time.perf_counter() - start) * 1000, error=failed)
+                if not failed:
+                    # A 4xx is the caller's mistake, not the host being down
+                    breaker.record_success()
+                    if cache_key is not None and response.status == 200:
+                        self.cache.set(
+                            cache_key, copy.deepcopy(response.data), cache_ttl
+                        )
+                    return response
+
+                breaker.record_failure()
+                if attempt == retries:
+                    return response
+
+            # Jitter, so retries of many commands don't arrive at once
+            await asyncio.sleep(self.backoff * 2**attempt * random.uniform(0.5, 1.5))
+
+    def stats(self) -> dict:
+        """
+        Returns the metrics of every endpoint and the state of the circuit breakers
+
+        Returns:
+            dict: {"endpoints": {endpoint: {"requests", "errors", "cache_hits", "average_ms", "max_ms"}},
+                   "circuits": {host: state}, "cache": {"entries", "hits", "misses"}}
+        """
+        return {
+            "endpoints": {
+                endpoint: {
+                    "requests": stats.requests,
+                    "errors": stats.errors,
+                    "cache_hits": stats.cache_hits,
+                    "average_ms": (
+                        stats.total_ms / stats.requests if stats.requests else 0.0
+                    ),
+                    "max_ms": stats.max_ms,
+                }
+                for endpoint, stats in self._endpoints.items()
+            },
+            "circuits": {
+                host: breaker.state for host, breaker in self._breakers.items()
+            },
+            "cache": {
+                "entries": len(self.cache),
+                "hits": self.cache.hits,
+                "misses": self.cache.misses,
+            },
+        }
+
+
+client = HttpClient()
+
+
+def get_session() -> aiohttp.ClientSession:
+    """
+    Returns the session of the shared client
+    """
+    return client.get_session()
+
+
+async def fetch(url: str, **kwargs) -> Response:
+    """
+    Sends a request with the shared client, see HttpClient.fetch
+    """
+    return await client.fetch(url, **kwargs)
+
+
+async def close() -> None:
+    """
+    Closes the session of the shared client
+    """
+    await client.close()
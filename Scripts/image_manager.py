@@ -13,15 +13,149 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see https://www.gnu.org/licenses/.
 
+import asyncio
+import io
 import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 import bot_utils as utils
 import config_reader as config
-import requests
+import http_client
 from PIL import Image, ImageDraw, ImageFilter, ImageFont, ImageOps
 
+# Downloads larger than this are aborted
+MAX_IMAGE_SIZE = 16 * 1024 * 1024
 
-async def download_image(image_url, id, path=None):
+# How many bytes are read from the connection at once
+CHUNK_SIZE = 64 * 1024
+
+
+class ImageCache:
+    """
+    A bounded LRU cache for downloaded images.
+
+    Discord's CDN urls contain the avatar (or banner) hash, so the url works as the key:
+    a user changing their avatar gets a new url instead of a stale cache entry.
+    """
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            max_entries (int): How many images are kept at most
+            max_bytes (int): How many bytes are kept at most
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._images = OrderedDict()  # {url: bytes}, least recently used first
+        self._size = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        data = self._images.get(key)
+        if data is None:
+            self.misses += 1
+            return None
+
+        self._images.move_to_end(key)
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+
+        old = self._images.pop(key, None)
+        if old is not None:
+            self._size -= len(old)
+
+        self._images[key] = data
+        self._size += len(data)
+
+        while len(self._images) > self.max_entries or self._size > self.max_bytes:
+            _, evicted = self._images.popitem(last=False)
+            self._size -= len(evicted)
+
+
+avatar_cache = ImageCache()
+
+# {url: Future} of downloads that are currently running
+_in_flight = {}
+
+
+async def _download(url: str) -> bytes:
+    session = http_client.get_session()
+    async with session.get(url) as response:
+        if response.status != 200:
+            return None
+
+        if (response.content_length or 0) > MAX_IMAGE_SIZE:
+            raise ValueError(f"Image is larger than {MAX_IMAGE_SIZE} bytes")
+
+        data = bytearray()
+        async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+            data.extend(chunk)
+            if len(data) > MAX_IMAGE_SIZE:
+                raise ValueError(f"Image is larger than {MAX_IMAGE_SIZE} bytes")
+        return bytes(data)
+
+
+async def fetch_image(image_url, cache: bool = True):
+    """
+    Downloads an image into memory
+
+    Args:
+        image_url: The url of the image
+        cache (bool): If the image should be served from and stored in the avatar cache
+    Returns:
+        bytes: The image
+        None: The download failed
+    """
+    url = str(image_url)
+
+    try:
+        if not cache:
+            return await _download(url)
+
+        data = avatar_cache.get(url)
+        if data is not None:
+            return data
+
+        # Several commands asking for the same image at once share one download
+        task = _in_flight.get(url)
+        if task is None:
+            task = asyncio.ensure_future(_download(url))
+            _in_flight[url] = task
+            task.add_done_callback(lambda _: _in_flight.pop(url, None))
+
+        data = await asyncio.shield(task)
+        if data is not None:
+            avatar_cache.put(url, data)
+        return data
+    except Exception as e:
+        from bot import logger
+
+        logger.error(f"Error while downloading an image: {e}")
+        return None
+
+
+async def download_image(image_url, id, path=None, cache: bool = True):
+    """
+    Downloads an image and saves it to disk
+
+    Args:
+        image_url: The url of the image
+        id: The file name without extension
+        path (str): The folder to save the image in (defaults to the download folder)
+        cache (bool): If the avatar cache should be used
+    Returns:
+        str: The path to the image
+        None: An error occurred
+    """
 
     clean_image_url = str(image_url).split("?")[0]  # Remove the ?size=4096 from the url
 
@@ -48,14 +182,14 @@ async def download_image(image_url, id, path=None):
     else:
         image_path = os.path.join(path, f"{id}.{file_extention}")
 
-    response = requests.get(image_url)
-    if response.status_code == 200:
-        with open(image_path, "wb") as file:
-            file.write(response.content)
-        return image_path
-    else:
+    data = await fetch_image(image_url, cache=cache)
+    if data is None:
         return None
 
+    with open(image_path, "wb") as file:
+        file.write(data)
+    return image_path
+
 
 async def gif_to_png(gif_file) -> str:
     gif_image = Image.open(gif_file)
@@ -84,18 +218,45 @@ async def resize_image(image_path, res=500):
         logger.error(f"Error resizing image: {e}")
 
 
-async def make_card(
-    background_path, scale_factor=config.Join.welcome_card_scale_factor
-):
-    background = Image.open(background_path)
-    overlay = Image.open(config.Join.overlay_path)
+# Renders images off the event loop. Pillow releases the GIL while resizing and encoding,
+# so several cards can be rendered at the same time.
+_render_pool = ThreadPoolExecutor(
+    max_workers=min(4, os.cpu_count() or 1), thread_name_prefix="image"
+)
+
+_overlay_lock = threading.Lock()
+_overlay = None  # (path, mtime, decoded overlay)
+
+
+def _get_overlay(path: str) -> Image.Image:
+    """
+    Returns the decoded welcome card overlay, loading it only when the file changed
+    """
+    global _overlay
+
+    mtime = os.stat(path).st_mtime_ns
+    with _overlay_lock:
+        if _overlay is None or _overlay[0] != path or _overlay[1] != mtime:
+            with Image.open(path) as overlay:
+                _overlay = (path, mtime, overlay.convert("RGBA"))
+        return _overlay[2]
+
+
+def _render_welcome_card(
+    avatar: bytes, scale_factor: float, res: int, overlay_path: str
+) -> io.BytesIO:
+    overlay = _get_overlay(overlay_path)
+
+    with Image.open(io.BytesIO(avatar)) as image:
+        # Only the first frame of animated avatars is used
+        image.seek(0)
+        background = image.convert("RGBA").resize((res, res))
 
     overlay_width, overlay_height = overlay.size
     canvas = Image.new("RGBA", (overlay_width, overlay_height), (0, 0, 0, 0))
 
-    bg_width, bg_height = background.size
-    new_bg_width = int(bg_width * scale_factor)
-    new_bg_height = int(bg_height * scale_factor)
+    new_bg_width = int(res * scale_factor)
+    new_bg_height = int(res * scale_factor)
 
     background = background.resize((new_bg_width, new_bg_height))
 
@@ -108,7 +269,34 @@ async def make_card(
 
     canvas.paste(overlay, (0, 0), overlay)
 
-    canvas.save(background_path)
+    card = io.BytesIO()
+    canvas.save(card, format="PNG")
+    card.seek(0)
+    return card
+
+
+async def render_welcome_card(
+    avatar: bytes, scale_factor=config.Join.welcome_card_scale_factor, res=500
+) -> io.BytesIO:
+    """
+    Renders a welcome card in memory
+
+    Args:
+        avatar (bytes): The avatar of the new member (png, jpg or gif)
+        scale_factor (float): How big the avatar is compared to its resized resolution
+        res (int): The resolution the avatar is resized to before scaling
+    Returns:
+        io.BytesIO: The card as a png
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _render_pool,
+        _render_welcome_card,
+        avatar,
+        scale_factor,
+        res,
+        config.Join.overlay_path,
+    )
 
 
 async def delete(image: str) -> bool:
@@ -14,16 +14,15 @@
 # along with this program.  If not, see https://www.gnu.org/licenses/.
 
 import asyncio
-import json
 import os
-import random
 
 import bot_utils as utils
 import config_reader as config
-import database_interaction
+import document_store
 import hikari
 import hikari.errors
 import image_manager
+import user_stats
 
 
 async def new_member(member: hikari.Member, bot):
@@ -32,27 +31,18 @@ async def new_member(member: hikari.Member, bot):
     Sends the welcome card.
 
     Processing:
-        Downloads the avatar of the new user
-        Converts to png if it is a gif
-        Resizes the image to a set size
-        Generates the card
+        Downloads the avatar of the new user (or takes it from the avatar cache)
+        Renders the card in memory, off the event loop
         Sends the welcome card and message
     """
-    pfp_link = member.avatar_url
+    avatar = await image_manager.fetch_image(member.display_avatar_url)
 
-    pfp_path = await image_manager.download_image(image_url=pfp_link, id=member.id)
-
-    if pfp_path is None:
+    if avatar is None:
         return None
 
-    if str(pfp_path).endswith("gif"):
-        pfp_path = await image_manager.gif_to_png(pfp_path)
-
-    await image_manager.resize_image(pfp_path)
+    card = await image_manager.render_welcome_card(avatar)
 
-    await image_manager.make_card(pfp_path)
-
-    file = hikari.File(pfp_path)
+    file = hikari.Bytes(card, f"{member.id}.png")
 
     await bot.application.app.rest.create_message(
         config.Join.channel,
@@ -61,9 +51,6 @@ async def new_member(member: hikari.Member, bot):
         user_mentions=True,
     )
 
-    if not await image_manager.delete(pfp_path):
-        return
-
 
 async def warn_member(user_id: int, reason: str) -> bool:
     """
@@ -77,26 +64,11 @@ async def warn_member(user_id: int, reason: str) -> bool:
         False: If something went wrong (usually missing permissions)
     """
     try:
-        database_path = os.path.join(
-            config.Paths.data_folder, "Database", "warnings.json"
+        warnings = await document_store.warnings.update(
+            user_id, lambda reasons: (reasons or []) + [reason]
         )
-        data = {}
-
-        if os.path.exists(database_path) and os.path.getsize(database_path) > 0:
-            with open(database_path, "r") as file:
-                data = json.load(file)
-
-        user_id = str(user_id)
-
-        if user_id in data:
-            data[user_id].append(reason)
-        else:
-            data[user_id] = [reason]
 
-        with open(database_path, "w") as file:
-            json.dump(data, file, indent=4)
-
-        warnings_count = len(data.get(user_id, []))
+        warnings_count = len(warnings)
 
         if (
             (config.AutoMod.kick_threshold - 2)
@@ -146,7 +118,8 @@ async def update_user_stats(
     user_id: int, msg: bool, cmd: bool, rep: bool, extra_xp: int = 0
 ):
     """
-    Updates the user stats database
+    Updates the user stats database.
+    The increments are buffered and written in batches by user_stats.buffer
 
     Args:
         user_id (int): The User ID of the account that should be added
@@ -157,19 +130,9 @@ async def update_user_stats(
     """
 
     try:
-        if database_interaction.Users.update_user_entry(
-            user_id=int(user_id),
-            increment=True,
-            msg_count=int(msg),
-            cmds_used=int(cmd),
-            reported=int(rep),
-        ):
-            try:
-                await update_xp(user_id=int(user_id), report=rep, add_xp=extra_xp)
-            except Exception as e:
-                from bot import logger
-
-                logger.error(f"An error occurred while trying to update_xp: {e}")
+        user_stats.buffer.add(
+            user_id=int(user_id), msg=msg, cmd=cmd, rep=rep, extra_xp=extra_xp
+        )
     except Exception as e:
         from bot import logger
 
@@ -195,7 +158,7 @@ async def get_level_from_xp(xp):
         return None
 
 
-async def level_increase(level, user_id, bot):
+async def level_increase(level, user_id):
     try:
         embed = hikari.Embed(
             title="Level increase", description=f"<@{user_id}> is now level {level}!"
@@ -210,58 +173,3 @@ async def level_increase(level, user_id, bot):
         from bot import logger
 
         logger.error(f"Error during level increase message (level_increase()): {e}")
-
-
-async def update_xp(user_id: int, report: bool, add_xp: int = 0) -> bool:
-    """
-    A function for updating the XP.
-
-    Args:
-        user_id (int). The ID of the user
-        report (bool): If the cause for the xp increase is a report
-        add_xp (int): Add additional XP
-    """
-
-    user_data = database_interaction.Users.get_user_entry(user_id=user_id)
-
-    if user_data:
-        (
-            id,
-            msg_count,
-            current_xp,
-            last_level,
-            cmds_used,
-            reported,
-            been_reported,
-            nsfw_opt_out,
-        ) = user_data
-    else:
-        from bot import logger
-
-        logger.error("During update_xp: User entry not found or error occurred.")
-
-    random_xp = random.randint(0, 5)
-
-    xp = int(current_xp + random_xp + add_xp)
-
-    level = await get_level_from_xp(xp)
-    if level is None:
-        return
-
-    if config.Bot.level_updates_enabled:
-        if level > last_level:
-            level_increase(level, user_id)
-
-    database_interaction.Users.update_user_entry(
-        user_id=user_id,
-        increment=False,
-        msg_count=msg_count,
-        xp=xp,
-        level=level,
-        cmds_used=cmds_used,
-        reported=reported,
-        been_reported=been_reported,
-        nsfw_opt_out=nsfw_opt_out,
-    )
-
-    return
@@ -0,0 +1,212 @@
+# Copyright (C) 2024  Darkyl
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see https://www.gnu.org/licenses/.
+
+import functools
+import re
+import time
+from bisect import bisect_left
+
+import auto_mod
+import channel_cache
+import config_reader as config
+import hikari
+
+"""
+Processes every new message in one ordered pipeline.
+
+Plugins register stages instead of listening to MessageCreateEvent themselves.
+The stages run one after another in the order of their phase:
+
+    moderate: AutoMod, may delete the message
+    persist: Writes the message to the message log
+    react: Replies and reactions (69, SQL injection)
+    stats: User stats and XP
+
+Bots and system messages are filtered out before any stage runs. The channel is
+resolved once and the content is parsed once into a MessageContext that all
+stages share. When a stage deletes the message, it stops the pipeline, so the
+later stages never see it.
+
+The time every stage takes is recorded in a histogram.
+"""
+
+PHASES = ("moderate", "persist", "react", "stats")
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+NUMBER_PATTERN = re.compile(r"\d+\.\d+|\d+")
+
+
+class MessageContext:
+    def __init__(self, event: hikari.MessageCreateEvent, channel) -> None:
+        """
+        Args:
+            event (hikari.MessageCreateEvent): The event of the message
+            channel: The resolved channel of the message
+        """
+        self.event = event
+        self.message = event.message
+        self.author = event.author
+        self.channel = channel
+        self.channel_type = channel.type
+
+        self.is_dm = self.channel_type == hikari.ChannelType.DM
+        self.is_guild_text = self.channel_type == hikari.ChannelType.GUILD_TEXT
+        self.in_server = self.message.guild_id == config.Bot.server
+        self.nsfw = bool(getattr(channel, "is_nsfw", False))
+
+        self.content = self.message.content.strip() if self.message.content else ""
+
+        self.stopped = False
+        self.deleted = False
+
+    @functools.cached_property
+    def urls(self) -> list:
+        """
+        The host names of the links in the message
+        """
+        return auto_mod.parse_hostnames(self.content)
+
+    @functools.cached_property
+    def numbers(self) -> list:
+        """
+        The integers and floats in the message
+        """
+        return [
+            float(number) if "." in number else int(number)
+            for number in NUMBER_PATTERN.findall(self.content)
+        ]
+
+    def stop(self, deleted: bool = False) -> None:
+        """
+        Skips the remaining stages
+
+        Args:
+            deleted (bool): If the message was deleted
+        """
+        self.stopped = True
+        self.deleted = self.deleted or deleted
+
+
+class LatencyHistogram:
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last bucket is everything above
+        self.count = 0
+        self.total = 0.0
+        self.errors = 0
+
+    def record(self, milliseconds: float) -> None:
+        self.counts[bisect_left(self.buckets, milliseconds)] += 1
+        self.count += 1
+        self.total += milliseconds
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Returns the upper bound of the bucket that contains a percentile, inf if it's above the last one
+        """
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bucket, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bucket
+        return float("inf")
+
+
+class MessagePipeline:
+    def __init__(self) -> None:
+        self._stages = []  # [(phase index, registration order, name, function)]
+        self._histograms = {}  # {name: LatencyHistogram}
+        self._registered = 0
+
+        self.processed = 0
+        self.stopped = 0
+
+    def register(self, phase: str, name: str, function) -> None:
+        """
+        Adds a stage, replacing the stage with the same name
+
+        Args:
+            phase (str): One of PHASES, decides when the stage runs
+            name (str): A unique name, used for the latency stats
+            function: An async function taking the MessageContext
+        """
+        if phase not in PHASES:
+            raise ValueError(f"Unknown phase '{phase}', expected one of {PHASES}")
+
+        self.unregister(name)
+        self._registered += 1
+        self._stages.append((PHASES.index(phase), self._registered, name, function))
+        self._stages.sort(key=lambda stage: stage[:2])
+        self._histograms.setdefault(name, LatencyHistogram())
+
+    def unregister(self, name: str) -> None:
+        self._stages = [stage for stage in self._stages if stage[2] != name]
+
+    async def process(self, event: hikari.MessageCreateEvent) -> None:
+        """
+        Runs all stages for a new message
+        """
+        if event.author.is_bot or event.author.is_system:
+            return
+
+        channel = await channel_cache.resolver.fetch(event.app, event.channel_id)
+        context = MessageContext(event, channel)
+        self.processed += 1
+
+        for _, _, name, function in self._stages:
+            histogram = self._histograms[name]
+            start = time.perf_counter()
+            try:
+                await function(context)
+            except Exception as e:
+                histogram.errors += 1
+                from bot import logger
+
+                logger.error(f"Error in the '{name}' message stage: {e}")
+            histogram.record((time.perf_counter() - start) * 1000)
+
+            if context.stopped:
+                self.stopped += 1
+                return
+
+    def stats(self) -> dict:
+        """
+        Returns the latency of every stage
+
+        Returns:
+            dict: {name: {"count", "errors", "average_ms", "p50_ms", "p95_ms", "p99_ms"}}
+        """
+        stats = {}
+        for _, _, name, _ in self._stages:
+            histogram = self._histograms[name]
+            stats[name] = {
+                "count": histogram.count,
+                "errors": histogram.errors,
+                "average_ms": (
+                    histogram.total / histogram.count if histogram.count else 0.0
+                ),
+                "p50_ms": histogram.percentile(0.5),
+                "p95_ms": histogram.percentile(0.95),
+                "p99_ms": histogram.percentile(0.99),
+            }
+        return stats
+
+
+pipeline = MessagePipeline()
@@ -0,0 +1,310 @@
+# Copyright (C) 2024  Darkyl
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see https://www.gnu.org/licenses/.
+
+import asyncio
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+import config_reader as config
+import database_interaction
+
+"""
+Keeps the message log in the database bounded.
+
+Messages older than their channel's retention and edit versions beyond the
+configured maximum are written to compressed monthly archive files and then
+deleted. The work is split into small batches, each in its own short
+transaction, with a pause in between so other queries aren't held up.
+
+Message IDs are Discord snowflakes, which contain the time the message was sent.
+That lets old messages be found with a range scan over the primary key.
+"""
+
+# Milliseconds between the Unix epoch and the Discord epoch (2015-01-01)
+DISCORD_EPOCH = 1420070400000
+
+# How often the retention pass runs, in seconds
+INTERVAL = 60 * 60
+
+# How many rows are read and deleted per transaction
+BATCH_SIZE = 500
+
+# Pause between two batches, in seconds
+BATCH_PAUSE = 0.05
+
+COLUMNS = (
+    "msg_id",
+    "content",
+    "channel_id",
+    "attachments",
+    "author",
+    "edited",
+    "created_at",
+)
+
+
+def snowflake_from_time(moment: datetime) -> int:
+    """
+    Returns the smallest snowflake that could have been created at a given time
+    """
+    return max(int(moment.timestamp() * 1000) - DISCORD_EPOCH, 0) << 22
+
+
+def time_from_snowflake(snowflake: int) -> datetime:
+    return datetime.fromtimestamp(
+        ((snowflake >> 22) + DISCORD_EPOCH) / 1000, tz=timezone.utc
+    )
+
+
+class MessageRetention:
+    def __init__(
+        self,
+        retention_days: int = config.MessageLog.retention_days,
+        channel_retention_days: dict = config.MessageLog.channel_retention_days,
+        max_versions: int = config.MessageLog.max_versions,
+        archive_folder: str = config.MessageLog.archive_folder,
+        archive: bool = config.MessageLog.archive,
+    ) -> None:
+        """
+        Args:
+            retention_days (int): How many days messages are kept, 0 keeps them forever
+            channel_retention_days (dict): {channel_id: days} overriding the default for a channel
+            max_versions (int): How many versions of an edited message are kept
+            archive_folder (str): Where the archive files are written
+            archive (bool): Whether pruned messages are archived or just deleted
+        """
+        self.retention_days = retention_days
+        self.channel_retention_days = {
+            int(channel_id): days
+            for channel_id, days in (channel_retention_days or {}).items()
+        }
+        self.max_versions = max_versions
+        self.archive_folder = archive_folder
+        self.archive = archive
+
+        self.rows_pruned = 0
+        self.versions_pruned = 0
+        self.last_run = None
+        self.last_duration = 0.0
+        self.table_rows = None
+        self.database_size = None
+
+    def _retention(self, channel_id) -> int:
+        return self.channel_retention_days.get(channel_id, self.retention_days)
+
+    def _scan_cutoff(self, now: datetime):
+        """
+        Returns the newest message ID that could be expired in any channel, None if nothing expires
+        """
+        days = [
+            days
+            for days in (self.retention_days, *self.channel_retention_days.values())
+            if days > 0
+        ]
+        if not days:
+            return None
+        return snowflake_from_time(now - timedelta(days=min(days)))
+
+    def _is_expired(self, row: tuple, now: datetime) -> bool:
+        days = self._retention(row[3])
+        return days > 0 and row[1] < snowflake_from_time(now - timedelta(days=days))
+
+    def _write_archive(self, rows: list) -> None:
+        """
+        Appends rows to the archive file of the month they were sent in.
+        Every append is a complete gzip member, so the files stay readable even if the bot stops mid-write.
+        """
+        months = {}
+        for row in rows:
+            month = time_from_snowflake(row[0]).strftime("%Y-%m")
+            months.setdefault(month, []).append(row)
+
+        os.makedirs(self.archive_folder, exist_ok=True)
+        for month, month_rows in months.items():
+            path = os.path.join(self.archive_folder, f"messages-{month}.jsonl.gz")
+            with gzip.open(path, "at", encoding="utf-8") as file:
+                for row in month_rows:
+                    file.write(json.dumps(dict(zip(COLUMNS, row))) + "\n")
+
+    async def _archive_and_delete(self, rows: list) -> int:
+        """
+        Archives rows (rowid first, then COLUMNS) and deletes them.
+        Rows are only deleted once they were archived.
+        """
+        if self.archive:
+            await asyncio.to_thread(self._write_archive, [row[1:] for row in rows])
+
+        rowids = [(row[0],) for row in rows]
+
+        def query(connection):
+            with connection:
+                connection.executemany("DELETE FROM messages WHERE rowid = ?", rowids)
+
+        await database_interaction.database.run(query)
+        return len(rows)
+
+    async def _prune_expired(self, now: datetime) -> int:
+        cutoff = self._scan_cutoff(now)
+        if cutoff is None:
+            return 0
+
+        columns = ", ".join(COLUMNS)
+
+        def query(connection, after):
+            # Seek over the primary key from the last message of the previous batch
+            return connection.execute(
+                f"""
+                SELECT rowid, {columns} FROM messages
+                WHERE msg_id < ? AND (msg_id, edited) > (?, ?)
+                ORDER BY msg_id, edited
+                LIMIT ?
+                """,
+                (cutoff, *after, BATCH_SIZE),
+            ).fetchall()
+
+        pruned = 0
+        after = (-1, -1)
+        while True:
+            rows = await database_interaction.database.run(query, after)
+            if not rows:
+                return pruned
+
+            # Channels with a longer retention are skipped
+            expired = [row for row in rows if self._is_expired(row, now)]
+            if expired:
+                pruned += await self._archive_and_delete(expired)
+
+            after = (rows[-1][1], rows[-1][6])
+            await asyncio.sleep(BATCH_PAUSE)
+
+    async def _prune_versions(self) -> int:
+        columns = ", ".join(COLUMNS)
+
+        def find(connection, after):
+            # A message has too many versions if one of them is numbered max_versions or higher
+            return [
+                row[0]
+                for row in connection.execute(
+                    """
+                    SELECT DISTINCT msg_id FROM messages
+                    WHERE edited > 0 AND edited >= ? AND msg_id > ?
+                    ORDER BY msg_id
+                    LIMIT ?
+                    """,
+                    (self.max_versions, after, BATCH_SIZE),
+                )
+            ]
+
+        def read(connection, msg_ids):
+            rows = []
+            for msg_id in msg_ids:
+                # Everything but the newest max_versions versions
+                rows.extend(
+                    connection.execute(
+                        f"""
+                        SELECT rowid, {columns} FROM messages
+                        WHERE msg_id = ? AND edited <= (
+                            SELECT MAX(edited) FROM messages WHERE msg_id = ?
+                        ) - ?
+                        """,
+                        (msg_id, msg_id, self.max_versions),
+                    )
+                )
+            return rows
+
+        pruned = 0
+        after = -1
+        while True:
+            msg_ids = await database_interaction.database.run(find, after)
+            if not msg_ids:
+                return pruned
+
+            rows = await database_interaction.database.run(read, msg_ids)
+            if rows:
+                pruned += await self._archive_and_delete(rows)
+
+            after = msg_ids[-1]
+            await asyncio.sleep(BATCH_PAUSE)
+
+    async def _update_size(self) -> None:
+        def query(connection):
+            rows = connection.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+            page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+            page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+            return rows, page_count * page_size
+
+        self.table_rows, self.database_size = await database_interaction.database.run(
+            query
+        )
+
+    async def prune(self) -> dict:
+        """
+        Runs one retention pass
+
+        Returns:
+            dict: The number of expired messages and old versions that were pruned
+        """
+        start = time.perf_counter()
+        now = datetime.now(timezone.utc)
+
+        versions = await self._prune_versions()
+        expired = await self._prune_expired(now)
+        await self._update_size()
+
+        self.versions_pruned += versions
+        self.rows_pruned += versions + expired
+        self.last_run = now
+        self.last_duration = time.perf_counter() - start
+
+        return {"expired": expired, "versions": versions}
+
+    async def run(self) -> None:
+        """
+        Runs the retention pass in the background, once per INTERVAL
+        """
+        while True:
+            try:
+                result = await self.prune()
+
+                from bot import logger
+
+                if result["expired"] or result["versions"]:
+                    logger.info(
+                        f"Pruned {result['expired']} expired messages and {result['versions']} old message versions in {self.last_duration:.1f}s"
+                    )
+            except Exception as e:
+                from bot import logger
+
+                logger.error(f"Error while pruning the message log: {e}")
+
+            await asyncio.sleep(INTERVAL)
+
+    def stats(self) -> dict:
+        """
+        Returns the size of the message log and how many rows were pruned since startup
+        """
+        return {
+            "table_rows": self.table_rows,
+            "database_size": self.database_size,
+            "rows_pruned": self.rows_pruned,
+            "versions_pruned": self.versions_pruned,
+            "last_run": self.last_run,
+        }
+
+
+retention = MessageRetention()
@@ -0,0 +1,431 @@
+# Copyright (C) 2024  Darkyl
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see https://www.gnu.org/licenses/.
+
+import asyncio
+import hashlib
+import json
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import config_reader as config
+import numpy as np
+
+"""
+Searches the digits of pi.
+
+pi.txt is memory-mapped instead of being read in chunks. A prebuilt index
+stores where every INDEX_DIGITS long digit sequence occurs first, so most
+searches (and every search for a number that doesn't occur) are answered
+with a few array lookups. Longer numbers are verified against the file,
+starting at the earliest position the index allows.
+
+Positions are offsets into pi.txt, counting from 0.
+"""
+
+PI_PATH = os.path.join(config.Paths.assets_folder, "Text", "pi.txt")
+INDEX_PATH = os.path.join(config.Paths.data_folder, "Pi", "pi_index.npy")
+
+# Sidecar file with the checksum of pi.txt, so it only has to be computed once
+METADATA_PATH = os.path.join(config.Paths.data_folder, "Pi", "pi.json")
+
+# Increase when the index format changes
+INDEX_VERSION = 1
+
+# Length of the digit sequences in the index (10^8 entries, 400 MB on disk)
+INDEX_DIGITS = 8
+
+# Marks a sequence that doesn't occur in the file
+NOT_FOUND = np.iinfo(np.uint32).max
+
+# How many digits are processed at once while building the index
+BUILD_CHUNK_SIZE = 4 * 1024 * 1024
+
+# How many bytes are hashed at once while computing the checksum
+CHECKSUM_CHUNK_SIZE = 16 * 1024 * 1024
+
+
+def _meta_path(index_path: str) -> str:
+    return os.path.splitext(index_path)[0] + ".json"
+
+
+def _digit_range(data) -> tuple:
+    """
+    Returns the start and end offset of the digits after the decimal point
+    """
+    start = data.find(b".", 0, 16) + 1
+    end = len(data)
+    while end > start and data[end - 1 : end] in (b"\n", b"\r", b" "):
+        end -= 1
+    return start, end
+
+
+def build_index(pi_path: str, index_path: str, digits: int = INDEX_DIGITS) -> None:
+    """
+    Builds the first occurrence index for a pi file
+
+    Args:
+        pi_path (str): The pi file
+        index_path (str): Where the index is saved (.npy, a .json file with its metadata is saved next to it)
+        digits (int): The length of the indexed digit sequences
+    """
+    stat = os.stat(pi_path)
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+
+    temp_path = index_path + ".tmp"
+    with open(pi_path, "rb") as file, mmap.mmap(
+        file.fileno(), 0, access=mmap.ACCESS_READ
+    ) as data:
+        start, end = _digit_range(data)
+
+        first = np.lib.format.open_memmap(
+            temp_path, mode="w+", dtype=np.uint32, shape=(10**digits,)
+        )
+        first[:] = NOT_FOUND
+
+        # Every position where a full sequence starts
+        for chunk_start in range(start, end - digits + 1, BUILD_CHUNK_SIZE):
+            count = min(BUILD_CHUNK_SIZE, end - digits + 1 - chunk_start)
+            chunk = np.frombuffer(
+                data, dtype=np.uint8, count=count + digits - 1, offset=chunk_start
+            ) - np.uint8(ord("0"))
+            if (chunk > 9).any():
+                raise ValueError("pi file contains characters that aren't digits")
+
+            values = np.zeros(count, dtype=np.uint32)
+            for i in range(digits):
+                values *= 10
+                values += chunk[i : i + count]
+
+            # Only sequences that weren't seen in an earlier chunk are new
+            new = first[values] == NOT_FOUND
+            values, positions = np.unique(values[new], return_index=True)
+            first[values] = np.flatnonzero(new)[positions] + chunk_start
+
+        first.flush()
+        del first
+
+    os.replace(temp_path, index_path)
+    with open(_meta_path(index_path), "w") as file:
+        json.dump(
+            {
+                "version": INDEX_VERSION,
+                "digits": digits,
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "start": start,
+                "end": end,
+            },
+            file,
+        )
+
+
+class PiSearchEngine:
+    def __init__(
+        self,
+        pi_path: str = PI_PATH,
+        index_path: str = INDEX_PATH,
+        metadata_path: str = METADATA_PATH,
+        cache_size: int = 1024,
+    ) -> None:
+        """
+        Args:
+            pi_path (str): The pi file
+            index_path (str): The index file
+            metadata_path (str): The sidecar file with the checksum
+            cache_size (int): How many search results are cached
+        """
+        self.pi_path = pi_path
+        self.index_path = index_path
+        self.metadata_path = metadata_path
+        self.cache_size = cache_size
+
+        # One worker each for searches, the index build and the checksum
+        self._executor = ThreadPoolExecutor(max_workers=3, thread_name_prefix="pi")
+        self._lock = threading.Lock()
+        self._build_task = None
+        self._checksum_task = None
+
+        self._file = None
+        self._data = None
+        self._stat = None
+        self._end = 0
+        self._checksum = None
+        self._index = None
+        self._meta = None
+
+        self._cache = OrderedDict()  # {number: position}
+
+    def _open(self) -> None:
+        """
+        Memory-maps the pi file and loads the index and the checksum if they are up to date.
+        Nothing is read from the file itself, so this is instant.
+        """
+        stat = os.stat(self.pi_path)
+        if self._stat is not None and (
+            (stat.st_size, stat.st_mtime_ns)
+            == (self._stat.st_size, self._stat.st_mtime_ns)
+        ):
+            return
+
+        self.close()
+
+        self._file = open(self.pi_path, "rb")
+        if stat.st_size:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._data = b""
+        self._stat = stat
+        self._end = _digit_range(self._data)[1]
+        self._cache.clear()
+        self._load_index()
+        self._load_checksum()
+
+    def _load_index(self) -> None:
+        try:
+            with open(_meta_path(self.index_path), "r") as file:
+                meta = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return
+
+        if (
+            meta.get("version") != INDEX_VERSION
+            or meta.get("size") != self._stat.st_size
+            or meta.get("mtime_ns") != self._stat.st_mtime_ns
+        ):
+            return
+
+        self._index = np.load(self.index_path, mmap_mode="r")
+        self._meta = meta
+
+    def _load_checksum(self) -> None:
+        try:
+            with open(self.metadata_path, "r") as file:
+                metadata = json.load(file)
+        except (FileNotFoundError, ValueError):
+            return
+
+        if metadata.get("size") == self._stat.st_size and (
+            metadata.get("mtime_ns") == self._stat.st_mtime_ns
+        ):
+            self._checksum = metadata.get("sha256")
+
+    def open(self) -> None:
+        """
+        Memory-maps the pi file, reopening it if it changed
+        """
+        with self._lock:
+            self._open()
+
+    def close(self) -> None:
+        # The mmap isn't closed explicitly, a search might still be using it.
+        # It is closed once the last reference is gone.
+        if self._file is not None:
+            self._file.close()
+        self._file = self._data = self._stat = self._index = self._meta = None
+        self._checksum = None
+        self._end = 0
+
+    @property
+    def length(self) -> int:
+        """
+        The number of characters in the pi file (including the "3."), taken from its size
+        """
+        with self._lock:
+            self._open()
+            return self._end
+
+    @property
+    def metadata(self) -> dict:
+        """
+        Returns the length, the checksum (None until computed) and the loaded index version
+        """
+        with self._lock:
+            self._open()
+            return {
+                "length": self._end,
+                "checksum": self._checksum,
+                "index_version": INDEX_VERSION if self._index is not None else None,
+            }
+
+    def _read(self, start: int, length: int) -> str:
+        with self._lock:
+            self._open()
+            return self._data[start : start + length].decode("ascii")
+
+    async def read(self, start: int, length: int) -> str:
+        """
+        Reads characters from the shared memory-mapped pi file
+
+        Args:
+            start (int): The offset of the first character, counting from 0
+            length (int): How many characters are read
+        Returns:
+            str: The characters
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._read, start, length)
+
+    @staticmethod
+    def _search_index(index, meta: dict, data, number: str) -> int:
+        digits, start, end = meta["digits"], meta["start"], meta["end"]
+        length = len(number)
+
+        if length >= digits:
+            # Every occurrence starts at or after the first occurrence of each of its sequences
+            lower_bound = start
+            for offset in range(length - digits + 1):
+                first = int(index[int(number[offset : offset + digits])])
+                if first == NOT_FOUND:
+                    return -1
+                lower_bound = max(lower_bound, first - offset)
+
+            encoded = number.encode()
+            if data[lower_bound : lower_bound + length] == encoded:
+                return lower_bound
+            return data.find(encoded, lower_bound + 1)
+
+        # The first occurrence of a short number is the first of all sequences starting with it
+        scale = 10 ** (digits - length)
+        value = int(number)
+        first = int(index[value * scale : (value + 1) * scale].min())
+        position = -1 if first == NOT_FOUND else first
+
+        # Before the digits ("3.") and the last few digits aren't covered by the index
+        encoded = number.encode()
+        head = data.find(encoded, 0, start + length - 1)
+        if head != -1:
+            return head
+        tail = data.find(encoded, max(start, end - digits + 1))
+        if position == -1 or (tail != -1 and tail < position):
+            return tail
+        return position
+
+    def _search(self, number: str) -> int:
+        with self._lock:
+            self._open()
+
+            position = self._cache.get(number)
+            if position is not None:
+                self._cache.move_to_end(number)
+                return position
+
+            index, meta, data = self._index, self._meta, self._data
+
+        # Searched without holding the lock, a scan can take a while
+        if index is not None:
+            position = self._search_index(index, meta, data, number)
+        else:
+            position = data.find(number.encode())
+
+        with self._lock:
+            self._cache[number] = position
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return position
+
+    async def search(self, number: str) -> int:
+        """
+        Finds the first occurrence of a number in pi
+
+        Args:
+            number (str): The digits to search for
+        Returns:
+            int: The position in the pi file, -1 if the number wasn't found
+        """
+        if not number.isdigit():
+            return -1
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._search, number)
+
+    def _build(self) -> None:
+        from bot import logger
+
+        logger.info("Building the pi search index")
+        try:
+            build_index(self.pi_path, self.index_path)
+        except Exception as e:
+            logger.error(f"Error while building the pi search index: {e}")
+            return
+
+        with self._lock:
+            # Reopen the file with the new index on the next search
+            self._stat = None
+        logger.info("Finished building the pi search index")
+
+    def _compute_checksum(self) -> None:
+        from bot import logger
+
+        try:
+            with self._lock:
+                self._open()
+                stat = self._stat
+
+            checksum = hashlib.sha256()
+            with open(self.pi_path, "rb") as file:
+                while chunk := file.read(CHECKSUM_CHUNK_SIZE):
+                    checksum.update(chunk)
+
+            os.makedirs(os.path.dirname(self.metadata_path), exist_ok=True)
+            with open(self.metadata_path, "w") as file:
+                json.dump(
+                    {
+                        "size": stat.st_size,
+                        "mtime_ns": stat.st_mtime_ns,
+                        "sha256": checksum.hexdigest(),
+                    },
+                    file,
+                )
+
+            with self._lock:
+                if self._stat is stat:
+                    self._checksum = checksum.hexdigest()
+        except Exception as e:
+            logger.error(f"Error while computing the pi file checksum: {e}")
+
+    def ensure_metadata(self) -> None:
+        """
+        Computes the checksum in the background if the sidecar file is missing or outdated
+        """
+        with self._lock:
+            self._open()
+            if self._checksum is not None:
+                return
+            if self._checksum_task is not None and not self._checksum_task.done():
+                return
+
+            self._checksum_task = self._executor.submit(self._compute_checksum)
+
+    def ensure_index(self) -> None:
+        """
+        Builds the index in the background if it is missing or outdated.
+        Until it is ready, searches scan the memory-mapped file.
+        """
+        with self._lock:
+            self._open()
+            if self._index is not None:
+                return
+            if self._build_task is not None and not self._build_task.done():
+                return
+            if self._stat.st_size < INDEX_DIGITS:
+                return
+
+            self._build_task = self._executor.submit(self._build)
+
+
+engine = PiSearchEngine()
@@ -0,0 +1,137 @@
+# Copyright (C) 2024  Darkyl
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see https://www.gnu.org/licenses/.
+
+import asyncio
+import random
+from bisect import bisect_right
+
+import config_reader as config
+import database_interaction
+
+"""
+A write-behind buffer for the user stats.
+
+Messages and commands only add their increments to memory.
+The increments are written to the database in a single transaction
+every few seconds or once enough of them have piled up.
+"""
+
+# Sorted list of the xp needed for each level
+LEVEL_THRESHOLDS = sorted(config.Level.leve_from_xp_mapping.values())
+
+
+def level_from_xp(xp: int) -> int:
+    """
+    Calculates the level for a total amount of xp
+    """
+    return bisect_right(LEVEL_THRESHOLDS, int(xp))
+
+
+class StatsBuffer:
+    def __init__(self, flush_interval: float = 10, flush_events: int = 250) -> None:
+        """
+        Args:
+            flush_interval (float): How many seconds pass at most between two flushes
+            flush_events (int): After how many recorded events a flush is triggered early
+        """
+        self.flush_interval = flush_interval
+        self.flush_events = flush_events
+
+        # {user_id: [msg_count, xp, cmds_used, reported]}
+        self._pending = {}
+        self._events = 0
+        self._lock = asyncio.Lock()
+        self._flush_task = None
+
+    def add(
+        self, user_id: int, msg: bool, cmd: bool, rep: bool, extra_xp: int = 0
+    ) -> None:
+        """
+        Records an event for a user
+
+        Args:
+            user_id (int): The ID of the user
+            msg (bool): If the event was triggered by a message
+            cmd (bool): If the event was triggered by a command
+            rep (bool): If the event was triggered by a report
+            extra_xp (int): If the user should be rewarded extra XP
+        """
+        entry = self._pending.setdefault(int(user_id), [0, 0, 0, 0])
+        entry[0] += int(msg)
+        entry[1] += random.randint(0, 5) + int(extra_xp)
+        entry[2] += int(cmd)
+        entry[3] += int(rep)
+
+        self._events += 1
+        if self._events >= self.flush_events and (
+            self._flush_task is None or self._flush_task.done()
+        ):
+            self._flush_task = asyncio.create_task(self.flush())
+
+    def discard(self, user_id: int) -> None:
+        """
+        Drops the pending increments of a user, for example when they left the server
+        """
+        self._pending.pop(int(user_id), None)
+
+    async def flush(self) -> None:
+        """
+        Writes all pending increments to the database and announces level ups
+        """
+        async with self._lock:
+            if not self._pending:
+                return
+
+            pending, self._pending = self._pending, {}
+            self._events = 0
+
+            increments = [
+                (user_id, msg_count, xp, cmds_used, reported)
+                for user_id, (msg_count, xp, cmds_used, reported) in pending.items()
+            ]
+
+            level_ups = await database_interaction.Users.apply_stat_increments(
+                increments, level_from_xp
+            )
+
+            if level_ups is None:
+                # Keep the increments so they are written with the next flush
+                for user_id, values in pending.items():
+                    entry = self._pending.setdefault(user_id, [0, 0, 0, 0])
+                    for i, value in enumerate(values):
+                        entry[i] += value
+                return
+
+        if config.Bot.level_updates_enabled:
+            from member_managment import level_increase
+
+            for user_id, level in level_ups:
+                await level_increase(level, user_id)
+
+    async def run(self) -> None:
+        """
+        Flushes the buffer periodically
+        """
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                from bot import logger
+
+                logger.error(f"An error occurred while flushing the user stats: {e}")
+
+
+buffer = StatsBuffer()
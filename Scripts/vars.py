@@ -15,6 +15,5 @@
 
 raid = False  # If there is a raid happening
 captcha_enabled = False  # If captchas are enabled
-worm_is_running = False  # If a worm simulation is currently running
 
 lockdown = False  # If there is a lockdown happening
@@ -0,0 +1,197 @@
+# Copyright (C) 2024  Darkyl
+
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see https://www.gnu.org/licenses/.
+
+import os
+import time
+from collections import deque
+
+"""
+A word list matcher used by the AutoMod.
+
+All word lists of a folder are compiled into one Aho-Corasick automaton,
+so a message is scanned once no matter how many words are on the lists.
+"""
+
+# Characters that are commonly used to disguise letters
+LEETSPEAK_TABLE = str.maketrans(
+    {
+        "0": "o",
+        "1": "i",
+        "3": "e",
+        "4": "a",
+        "5": "s",
+        "7": "t",
+        "8": "b",
+        "@": "a",
+        "$": "s",
+        "!": "i",
+        "|": "l",
+    }
+)
+
+
+class WordFilter:
+    def __init__(
+        self,
+        folder: str,
+        whole_words: bool = False,
+        leetspeak: bool = False,
+        check_interval: float = 5,
+    ) -> None:
+        """
+        Args:
+            folder (str): The folder containing the word lists (one word per line)
+            whole_words (bool): Only match words that aren't part of a longer word
+            leetspeak (bool): Normalise leetspeak before matching (e.g. "h3ll0" -> "hello")
+            check_interval (float): How many seconds pass at most before the folder is checked for changes
+        """
+        self.folder = folder
+        self.whole_words = whole_words
+        self.leetspeak = leetspeak
+        self.check_interval = check_interval
+
+        self._signature = None
+        self._last_check = 0.0
+
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [()]
+
+    def normalize(self, text: str) -> str:
+        text = text.lower()
+        if self.leetspeak:
+            # Every character is replaced by exactly one character, so positions stay the same
+            text = text.translate(LEETSPEAK_TABLE)
+        return text
+
+    def _read_signature(self) -> tuple:
+        """
+        Returns the names and modification times of all word lists
+        """
+        if not os.path.isdir(self.folder):
+            return ()
+
+        with os.scandir(self.folder) as entries:
+            return tuple(
+                sorted(
+                    (entry.name, entry.stat().st_mtime_ns)
+                    for entry in entries
+                    if entry.is_file()
+                )
+            )
+
+    def _load_words(self, signature: tuple) -> list[str]:
+        words = []
+        for filename, _ in signature:
+            with open(
+                os.path.join(self.folder, filename), "r", encoding="utf-8"
+            ) as file:
+                words.extend(line.strip() for line in file if line.strip())
+        return words
+
+    def _build(self, words: list[str]) -> None:
+        """
+        Builds the automaton from a list of words
+        """
+        goto = [{}]
+        output = [[]]
+
+        for word in words:
+            normalized = self.normalize(word)
+            node = 0
+            for char in normalized:
+                next_node = goto[node].get(char)
+                if next_node is None:
+                    next_node = len(goto)
+                    goto[node][char] = next_node
+                    goto.append({})
+                    output.append([])
+                node = next_node
+            if node:
+                output[node].append((word, len(normalized)))
+
+        # Link every node to the longest suffix that is also a prefix of a word
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, next_node in goto[node].items():
+                queue.append(next_node)
+
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                fail[next_node] = goto[state].get(char, 0)
+
+                output[next_node].extend(output[fail[next_node]])
+
+        self._goto = goto
+        self._fail = fail
+        self._output = [tuple(matches) for matches in output]
+
+    def reload(self, force: bool = False) -> None:
+        """
+        Rebuilds the automaton if a word list was added, removed or modified
+        """
+        signature = self._read_signature()
+        if force or signature != self._signature:
+            self._build(self._load_words(signature))
+            self._signature = signature
+
+    def _maybe_reload(self) -> None:
+        now = time.monotonic()
+        if self._signature is None or now - self._last_check >= self.check_interval:
+            self._last_check = now
+            self.reload()
+
+    def find_all(self, content: str) -> list[str]:
+        """
+        Finds all listed words in a text
+
+        Args:
+            content (str): The text to search
+        Returns:
+            list(str): The matched words in the order they appear, without duplicates
+        """
+        self._maybe_reload()
+
+        lowered = content.lower()
+        text = lowered.translate(LEETSPEAK_TABLE) if self.leetspeak else lowered
+        goto, fail, output = self._goto, self._fail, self._output
+
+        matches = {}
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            for word, length in output[state]:
+                if word in matches:
+                    continue
+                # Check the boundaries before the leetspeak translation, so "word!" still ends at the "!"
+                if self.whole_words and not self._is_whole_word(
+                    lowered, index - length + 1, index + 1
+                ):
+                    continue
+                matches[word] = None
+
+        return list(matches)
+
+    @staticmethod
+    def _is_whole_word(text: str, start: int, end: int) -> bool:
+        return (start == 0 or not text[start - 1].isalnum()) and (
+            end == len(text) or not text[end].isalnum()
+        )